@@ -3,7 +3,7 @@ import logging
 import datetime as dt
 from functools import wraps
 from typing import Optional, List, Dict, Any
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_compress import Compress
@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 import jwt as pyjwt
 import json
 import time
+import bisect
 
 load_dotenv()
 
@@ -22,6 +23,24 @@ Compress(app)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret-change-me")
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///ai_trader.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# Server databases (Postgres via DATABASE_URL) get a pool sized for the web
+# threads of a worker; SQLite gets WAL mode and pragmas on connect instead
+if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "8")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "4")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",    # readers and the writer don't block each other
+    "PRAGMA synchronous=NORMAL",  # durable with WAL, far fewer fsyncs
+    "PRAGMA busy_timeout=5000",   # wait for a lock instead of failing at once
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",   # ~20 MB page cache per connection
+)
 
 # CORS: allow your Next.js dev server; tighten in production
 CORS(app, resources={r"/api/*": {"origins": [os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")]}},
@@ -30,10 +49,10 @@ CORS(app, resources={r"/api/*": {"origins": [os.getenv("FRONTEND_ORIGIN", "http:
 
 # Optional separate models module
 try:
-    from models import db, Trade, Position, EquitySnapshot  # type: ignore
+    from models import db, Trade, Position, EquitySnapshot, PnlSummary, EquityRollup  # type: ignore
     db.init_app(app)
 except Exception:
-    Trade = Position = EquitySnapshot = None  # type: ignore
+    Trade = Position = EquitySnapshot = PnlSummary = EquityRollup = None  # type: ignore
     db = SQLAlchemy(app)
 
 logging.basicConfig(
@@ -42,6 +61,98 @@ logging.basicConfig(
 )
 logger = logging.getLogger("api")
 
+from instrumentation import (start_scope, end_scope, current_scope, record, timer, count,  # noqa: E402
+                             ENABLED as INSTRUMENTATION_ENABLED)
+import metrics  # noqa: E402
+import jobs  # noqa: E402
+import tasks  # noqa: E402
+import paper_state  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+
+# === Instrumentation ===
+# Each request collects its phase timings (backtest, optimizer, DB ...); the
+# heavy endpoints return them as "timings" when asked with ?timings=1 or
+# {"timings": true} in the JSON body.
+@app.before_request
+def _start_timings():
+    g.request_started = time.perf_counter()
+    # The URL rule, not the path, so ids in URLs don't multiply the series
+    g.route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.request_started(g.route)
+    if INSTRUMENTATION_ENABLED:
+        g.timings = start_scope()
+
+
+@app.after_request
+def _response_status(response):
+    g.status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _end_timings(exc=None):
+    started = g.pop("timings", None)
+    if started is not None:
+        scope, token = started
+        record(f"api.{request.endpoint or 'unknown'}", time.perf_counter() - scope.started)
+        end_scope(token)
+    if "request_started" in g:
+        metrics.request_finished(g.route, request.method, g.get("status", 500),
+                                 time.perf_counter() - g.request_started)
+
+
+def _sqlite_pragmas(engine):
+    """Apply SQLITE_PRAGMAS to every new connection of a SQLite `engine`."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _time_queries(engine):
+    """Record every SQL statement on `engine` as phase db.query."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        record("db.query", time.perf_counter() - conn.info["query_started"].pop())
+
+
+def _with_timings(body: dict) -> dict:
+    scope = current_scope()
+    if scope is None:
+        return body
+    payload = request.get_json(silent=True) if request.is_json else None
+    wanted = request.args.get("timings") or (isinstance(payload, dict) and payload.get("timings"))
+    if wanted and str(wanted).lower() not in ("0", "false"):
+        body["timings"] = scope.as_dict()
+    return body
+
+
+# === Job pool ===
+# Backtests, optimizer runs, walk-forward and Monte Carlo run in jobs.py's
+# bounded process pool; when its queue is full the request gets 429 at once
+# (or after JOB_WAIT_SECONDS) instead of tying up a web worker.
+def job_admitted(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            with jobs.admit():
+                return fn(*args, **kwargs)
+        except jobs.Busy as e:
+            response = jsonify({"message": str(e)})
+            response.headers["Retry-After"] = str(max(1, int(jobs.JOB_WAIT_SECONDS) or 5))
+            return response, 429
+    return wrapper
+
 
 # === DB Models ===
 class User(db.Model):
@@ -58,14 +169,45 @@ class User(db.Model):
         return check_password_hash(self.password_hash, password)
 
 
+# Schema changes are an explicit step (`flask --app api init-db`), not an
+# import side effect, so worker boot never touches the database
+def init_db():
+    """Apply the Alembic migrations (migrations/versions) to the app's database."""
+    from alembic import command
+    from alembic.config import Config
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    with app.app_context(), db.engine.begin() as connection:
+        config.attributes.update(connection=connection, metadata=db.metadata)
+        command.upgrade(config, "head")
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create or upgrade the schema."""
+    init_db()
+    print("✅ Database schema up to date")
+
+
 with app.app_context():
-    db.create_all()
+    _sqlite_pragmas(db.engine)
+    if INSTRUMENTATION_ENABLED:
+        _time_queries(db.engine)
+
 
 @app.get("/api/health")
 def health():
     return jsonify(ok=True)
 
 
+@app.get("/api/metrics")
+def metrics_endpoint():
+    """Prometheus text format, summed over all gunicorn workers."""
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return jsonify({"message": "Missing or invalid token"}), 401
+    return app.response_class(metrics.exposition(), content_type=metrics.CONTENT_TYPE)
+
+
 # === Auth helpers ===
 def create_jwt(user_id: int) -> str:
     payload = {
@@ -130,9 +272,11 @@ def _cache_get(key: str):
     try:
         ts, val = _cache.get(key, (0, None))
         if time.time() - ts < _CACHE_TTL:
+            count("api_cache.hit")
             return val
     except Exception:
         pass
+    count("api_cache.miss")
     return None
 
 def _cache_set(key: str, val: any):
@@ -142,41 +286,224 @@ def _cache_set(key: str, val: any):
         pass
 
 
+# === Equity rollups ===
+# Snapshots are one per candle; long ranges are charted from hourly or daily
+# OHLC buckets of the equity instead, rebuilt whenever the snapshots are
+# ingested. /api/equity?resolution=auto (the default) picks the finest tier
+# that fits the requested range in EQUITY_MAX_POINTS points.
+EQUITY_MAX_POINTS = int(os.getenv("EQUITY_MAX_POINTS", "5000"))
+ROLLUP_TIERS = {"1h": dt.timedelta(hours=1), "1d": dt.timedelta(days=1)}  # each rolled up from the one before
+RESOLUTIONS = ("raw",) + tuple(ROLLUP_TIERS)
+_EPOCH = dt.datetime(1970, 1, 1)
+
+
+def _rollup(rows, step: dt.timedelta) -> list:
+    """[bucket, open, high, low, close, points] per `step` bucket of (time, open, high, low,
+    close, points) rows in time order; a raw snapshot is (time, v, v, v, v, 1)."""
+    out = []
+    for t, o, h, l, c, n in rows:
+        bucket = t - (t - _EPOCH) % step
+        if out and out[-1][0] == bucket:
+            last = out[-1]
+            last[2], last[3], last[4], last[5] = max(last[2], h), min(last[3], l), c, last[5] + n
+        else:
+            out.append([bucket, o, h, l, c, n])
+    return out
+
+
+def _refresh_equity_rollups(strategy: str, curve=None) -> bool:
+    """Rebuild the EquityRollup tiers of `strategy` from `curve` ((times, equities) just
+    ingested, in time order) or else from its snapshots. True when it has any."""
+    if EquityRollup is None or EquitySnapshot is None:
+        return False
+    for key in [k for k in _cache if k.startswith(f"equity:{strategy}:")]:
+        _cache.pop(key, None)
+    try:
+        with timer("db.equity_rollups"):
+            if curve is None:
+                curve = ([], [])
+                q = (db.session.query(EquitySnapshot.time, EquitySnapshot.equity)  # type: ignore
+                     .filter_by(strategy=strategy).order_by(EquitySnapshot.time.asc(), EquitySnapshot.id.asc()))  # type: ignore
+                for t, v in q.yield_per(10_000):
+                    curve[0].append(t)
+                    curve[1].append(v)
+            tiers, rows = {}, ((t, v, v, v, v, 1) for t, v in zip(*curve))
+            for resolution, step in ROLLUP_TIERS.items():
+                rows = tiers[resolution] = _rollup(rows, step)
+            db.session.query(EquityRollup).filter_by(strategy=strategy).delete()  # type: ignore
+            records = [{"strategy": strategy, "resolution": resolution, "bucket": b, "open": float(o),
+                        "high": float(h), "low": float(l), "close": float(c), "points": int(n)}
+                       for resolution, buckets in tiers.items() for b, o, h, l, c, n in buckets]
+            if records:
+                db.session.execute(db.insert(EquityRollup), records)  # type: ignore
+            db.session.commit()
+            return bool(records)
+    except Exception as e:
+        logger.warning("Equity rollups for %s failed: %s", strategy, e)
+        db.session.rollback()
+        return False
+
+
+def _equity_resolution(strategy: str, start, end) -> str:
+    """Finest tier with at most EQUITY_MAX_POINTS points between `start` and `end` (None: open)."""
+    q = db.session.query(db.func.count(), db.func.sum(EquityRollup.points)).filter(  # type: ignore
+        EquityRollup.strategy == strategy, EquityRollup.resolution == "1h")  # type: ignore
+    if start is not None:
+        q = q.filter(EquityRollup.bucket > start - ROLLUP_TIERS["1h"])  # type: ignore
+    if end is not None:
+        q = q.filter(EquityRollup.bucket <= end)  # type: ignore
+    hours, raw = q.one()
+    if (raw or 0) <= EQUITY_MAX_POINTS:
+        return "raw"
+    return "1h" if hours <= EQUITY_MAX_POINTS else "1d"
+
+
+def _equity_point(resolution: str, t, o, h, l, c) -> dict:
+    if resolution == "raw":
+        return {"t": str(t), "v": float(c)}
+    return {"t": str(t), "v": float(c), "o": float(o), "h": float(h), "l": float(l)}
+
+
+def _time_arg(name: str):
+    """Naive UTC datetime of query parameter `name`, or None; ValueError if unparseable."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    import pandas as pd  # type: ignore
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.to_pydatetime()
+
+
 @app.get("/api/equity")
 @token_required
 def equity():
+    """Equity curve of a strategy: raw snapshots ({t, v}) or hourly/daily buckets ({t, v=close,
+    o, h, l}), optionally limited to ?from=&to=."""
     strategy = request.args.get("strategy", "RSI_EMA")
-    ck = f"equity:{strategy}"
+    resolution = (request.args.get("resolution") or "auto").lower()
+    if resolution not in ("auto",) + RESOLUTIONS:
+        return jsonify({"message": f"resolution must be one of auto, {', '.join(RESOLUTIONS)}"}), 400
+    try:
+        start, end = _time_arg("from"), _time_arg("to")
+    except ValueError as e:
+        return jsonify({"message": f"Invalid from/to: {e}"}), 400
+    ck = f"equity:{strategy}:{resolution}:{start}:{end}"
     cached = _cache_get(ck)
     if cached is not None:
-        return jsonify({"points": cached})
+        return jsonify(cached)
     # Prefer DB if available
     if EquitySnapshot is not None:
         try:
-            snaps = (
-                EquitySnapshot.query.filter_by(strategy=strategy)  # type: ignore
-                .order_by(EquitySnapshot.time.asc())  # type: ignore
-                .all()
-            )
-            if snaps:
-                points = [{"t": str(s.time), "v": float(s.equity)} for s in snaps]
-                _cache_set(ck, points)
-                return jsonify({"points": points})
+            chosen = resolution
+            if EquityRollup is not None and resolution != "raw":
+                # Snapshots ingested before rollups existed get them on first use
+                if db.session.query(EquityRollup.bucket).filter_by(strategy=strategy).first() is None:  # type: ignore
+                    _refresh_equity_rollups(strategy)
+                if resolution == "auto":
+                    chosen = _equity_resolution(strategy, start, end)
+            elif resolution == "auto":
+                chosen = "raw"
+            if chosen == "raw":
+                q = db.session.query(EquitySnapshot.time, EquitySnapshot.equity).filter_by(strategy=strategy)  # type: ignore
+                column = EquitySnapshot.time  # type: ignore
+            else:
+                q = (db.session.query(EquityRollup.bucket, EquityRollup.open, EquityRollup.high,  # type: ignore
+                                      EquityRollup.low, EquityRollup.close)  # type: ignore
+                     .filter_by(strategy=strategy, resolution=chosen))
+                column = EquityRollup.bucket  # type: ignore
+            if start is not None:
+                q = q.filter(column >= start)
+            if end is not None:
+                q = q.filter(column <= end)
+            rows = q.order_by(column.asc()).all()
+            if rows:
+                if chosen == "raw":
+                    points = [{"t": str(t), "v": float(v)} for t, v in rows]
+                else:
+                    points = [_equity_point(chosen, *row) for row in rows]
+                payload = {"points": points, "resolution": chosen}
+                _cache_set(ck, payload)
+                return jsonify(payload)
         except Exception as e:
             logger.warning("Equity from DB failed: %s", e)
-    # Fallback to logs
+    # Fallback to logs (rolled up in memory)
     try:
         from strategy_loader import load_strategy_class  # type: ignore
         strategy_class = load_strategy_class(strategy)
         logs_dir = f"logs/{strategy_class.__name__}"
         import pandas as pd  # type: ignore
         eq_df = pd.read_csv(f"{logs_dir}/equity.csv")
-        points = [{"t": str(r.time), "v": float(r.equity)} for r in eq_df.itertuples()]  # type: ignore
-        _cache_set(ck, points)
-        return jsonify({"points": points})
+        times = pd.to_datetime(eq_df["time"])
+        keep = pd.Series(True, index=eq_df.index)
+        if start is not None:
+            keep &= times >= start
+        if end is not None:
+            keep &= times <= end
+        rows = [(t, v, v, v, v, 1) for t, v in zip(times[keep], eq_df["equity"][keep])]
+        tiers = {"raw": rows}
+        for name, step in ROLLUP_TIERS.items():
+            rows = tiers[name] = _rollup(rows, step)
+        chosen = resolution if resolution != "auto" else next(
+            (r for r in RESOLUTIONS if len(tiers[r]) <= EQUITY_MAX_POINTS), RESOLUTIONS[-1])
+        payload = {"points": [_equity_point(chosen, *row[:5]) for row in tiers[chosen]], "resolution": chosen}
+        _cache_set(ck, payload)
+        return jsonify(payload)
     except Exception as e:
         logger.warning("Equity from logs failed: %s", e)
-        return jsonify({"points": []})
+        return jsonify({"points": [], "resolution": "raw" if resolution == "auto" else resolution})
+
+
+# === PnL summary ===
+# /api/pnl reads one PnlSummary row per strategy; the ingestion paths rewrite
+# it from the data they just stored instead of every request scanning snapshots.
+PNL_WINDOW = dt.timedelta(hours=24)
+
+
+def _pct_change(start: Optional[float], end: Optional[float]) -> float:
+    return (end - start) / start * 100.0 if start and end is not None else 0.0
+
+
+def _refresh_pnl_summary(strategy: str, curve=None, trade_count: Optional[int] = None):
+    """Rewrite the PnlSummary row of `strategy`. `curve` ((times, equities) in time order)
+    and `trade_count` are what was just ingested; parts not given are read with indexed
+    queries. Returns the row, or None without equity snapshots."""
+    if PnlSummary is None or EquitySnapshot is None:
+        return None
+    _cache.pop(f"pnl:{strategy}", None)
+    try:
+        with timer("db.pnl_summary"):
+            if curve is not None and len(curve[0]):
+                times, values = curve
+                before = bisect.bisect_right(times, times[-1] - PNL_WINDOW) - 1
+                first, last, window_equity = (times[0], values[0]), (times[-1], values[-1]), values[max(before, 0)]
+            else:
+                # Ties on time (the final close shares the last candle's time) go by insertion order
+                snaps = EquitySnapshot.query.filter_by(strategy=strategy)  # type: ignore
+                head = snaps.order_by(EquitySnapshot.time.asc(), EquitySnapshot.id.asc()).first()  # type: ignore
+                if head is None:
+                    db.session.query(PnlSummary).filter_by(strategy=strategy).delete()  # type: ignore
+                    db.session.commit()
+                    return None
+                tail = snaps.order_by(EquitySnapshot.time.desc(), EquitySnapshot.id.desc()).first()  # type: ignore
+                before = (snaps.filter(EquitySnapshot.time <= tail.time - PNL_WINDOW)  # type: ignore
+                          .order_by(EquitySnapshot.time.desc(), EquitySnapshot.id.desc()).first())  # type: ignore
+                first, last, window_equity = (head.time, head.equity), (tail.time, tail.equity), (before or head).equity
+            if trade_count is None:
+                trade_count = Trade.query.filter_by(strategy=strategy).count() if Trade is not None else 0  # type: ignore
+            open_positions = Position.query.filter_by(strategy=strategy).count() if Position is not None else 0  # type: ignore
+            summary = db.session.merge(PnlSummary(  # type: ignore
+                strategy=strategy, first_time=first[0], first_equity=float(first[1]),
+                last_time=last[0], last_equity=float(last[1]), equity_24h=float(window_equity),
+                trade_count=int(trade_count), open_positions=int(open_positions), updated_at=dt.datetime.utcnow(),
+            ))
+            db.session.commit()
+            return summary
+    except Exception as e:
+        logger.warning("PnL summary for %s failed: %s", strategy, e)
+        db.session.rollback()
+        return None
 
 
 @app.get("/api/pnl")
@@ -187,26 +514,18 @@ def pnl():
     cached = _cache_get(ck)
     if cached is not None:
         return jsonify(cached)
-    # Prefer DB
-    if EquitySnapshot is not None:
+    # Prefer DB: the strategy's summary row (built once from the snapshots if
+    # they were ingested before summaries existed)
+    if PnlSummary is not None:
         try:
-            snaps = (
-                EquitySnapshot.query.filter_by(strategy=strategy)  # type: ignore
-                .order_by(EquitySnapshot.time.asc())  # type: ignore
-                .all()
-            )
-            if snaps:
-                start_eq = float(snaps[0].equity)
-                end_eq = float(snaps[-1].equity)
-                change_pct = ((end_eq - start_eq) / start_eq * 100.0) if start_eq else 0.0
-                trade_count = 0
-                if Trade is not None:
-                    trade_count = Trade.query.filter_by(strategy=strategy).count()  # type: ignore
+            summary = db.session.get(PnlSummary, strategy) or _refresh_pnl_summary(strategy)  # type: ignore
+            if summary is not None:
                 payload = {
-                    "balance": f"${end_eq:,.2f}",
-                    "change24h": f"{change_pct:.2f}%",
-                    "openPositions": 0,
-                    "tradeCount": trade_count,
+                    "balance": f"${summary.last_equity:,.2f}",
+                    "change24h": f"{_pct_change(summary.equity_24h, summary.last_equity):.2f}%",
+                    "totalChange": f"{_pct_change(summary.first_equity, summary.last_equity):.2f}%",
+                    "openPositions": summary.open_positions,
+                    "tradeCount": summary.trade_count,
                 }
                 _cache_set(ck, payload)
                 return jsonify(payload)
@@ -221,7 +540,11 @@ def pnl():
         eq_df = pd.read_csv(f"{logs_dir}/equity.csv")
         start_eq = float(eq_df.iloc[0]["equity"]) if not eq_df.empty else 0.0
         end_eq = float(eq_df.iloc[-1]["equity"]) if not eq_df.empty else 0.0
-        change_pct = ((end_eq - start_eq) / start_eq * 100.0) if start_eq else 0.0
+        window_eq = start_eq
+        if not eq_df.empty:
+            times = pd.to_datetime(eq_df["time"])
+            before = int(times.searchsorted(times.iloc[-1] - PNL_WINDOW, side="right")) - 1
+            window_eq = float(eq_df["equity"].iloc[max(before, 0)])
         try:
             tr_df = pd.read_csv(f"{logs_dir}/backtester.csv")
             trade_count = len(tr_df)
@@ -229,7 +552,8 @@ def pnl():
             trade_count = 0
         payload = {
             "balance": f"${end_eq:,.2f}",
-            "change24h": f"{change_pct:.2f}%",
+            "change24h": f"{_pct_change(window_eq, end_eq):.2f}%",
+            "totalChange": f"{_pct_change(start_eq, end_eq):.2f}%",
             "openPositions": 0,
             "tradeCount": trade_count,
         }
@@ -237,21 +561,26 @@ def pnl():
         return jsonify(payload)
     except Exception as e:
         logger.warning("PnL from logs failed: %s", e)
-        return jsonify({"balance": "$0.00", "change24h": "0.00%", "openPositions": 0, "tradeCount": 0})
+        return jsonify({"balance": "$0.00", "change24h": "0.00%", "totalChange": "0.00%", "openPositions": 0,
+                        "tradeCount": 0})
 
 
 @app.get("/api/trades")
 @token_required
 def trades():
     strategy = request.args.get("strategy", "RSI_EMA")
-    ck = f"trades:{strategy}"
+    symbol = (request.args.get("symbol") or "").upper()  # optional: one symbol's trades
+    ck = f"trades:{strategy}:{symbol}"
     cached = _cache_get(ck)
     if cached is not None:
         return jsonify({"rows": cached})
     # Prefer DB
     if Trade is not None:
         try:
-            q = Trade.query.filter_by(strategy=strategy).order_by(Trade.time.desc()).limit(200)  # type: ignore
+            q = Trade.query.filter_by(strategy=strategy)  # type: ignore
+            if symbol:
+                q = q.filter_by(symbol=symbol)
+            q = q.order_by(Trade.time.desc()).limit(200)  # type: ignore
             rows = []
             for t in q.all():  # type: ignore
                 rows.append({
@@ -304,8 +633,83 @@ def positions():
     return jsonify({"rows": rows})
 
 
+@app.get("/api/strategies")
+@token_required
+def strategies():
+    """Registered strategies with their parameters, defaults, grid and warm-up."""
+    from strategy_loader import list_strategy_names, strategy_metadata  # type: ignore
+    rows = []
+    for name in list_strategy_names():
+        try:
+            rows.append(strategy_metadata(name))
+        except Exception as e:
+            logger.warning("Strategy metadata for %s failed: %s", name, e)
+    return jsonify({"rows": rows})
+
+
+# --- Backtest ingestion (also timed by benchmark.py) ---
+def _ingest_equity(strategy: str, equity_points: list) -> Optional[tuple]:
+    """Replace the strategy's equity snapshots; returns the stored curve (times, values), None on failure."""
+    if EquitySnapshot is None:
+        return None
+    try:
+        # clear previous snapshots for this strategy to avoid duplication
+        db.session.query(EquitySnapshot).filter_by(strategy=strategy).delete()  # type: ignore
+        import pandas as pd  # type: ignore
+        times, values = [], []
+        for p in equity_points:
+            snap = EquitySnapshot(strategy=strategy, time=pd.to_datetime(p["t"]), equity=float(p["v"]))  # type: ignore
+            db.session.add(snap)
+            times.append(snap.time)
+            values.append(snap.equity)
+        db.session.commit()
+        return times, values
+    except Exception as e:
+        logger.warning("Failed to ingest equity snapshots: %s", e)
+        db.session.rollback()
+        return None
+
+
+def _ingest_trades(strategy: str, symbol: str, trades_rows: list) -> Optional[int]:
+    """Replace the strategy's trades; returns how many were stored, None on failure."""
+    try:
+        logger.info(f"Saving {len(trades_rows)} trades for strategy {strategy}")
+        # naive ingestion: delete then insert current backtest trades for this strategy
+        db.session.query(Trade).filter_by(strategy=strategy).delete()  # type: ignore
+        import pandas as pd  # type: ignore
+        for row in trades_rows:
+            trade = Trade(
+                strategy=strategy,
+                symbol=row.get("symbol") or symbol,
+                side=row.get("type") or row.get("side") or "",
+                entry=float(row.get("price") or row.get("entry") or 0),
+                exit=float(row.get("exit") or 0) if row.get("exit") not in (None, "") else None,
+                pnl=float(row.get("pnl") or 0) if str(row.get("pnl") or "").replace("-","",1).replace(".","",1).isdigit() else None,
+                time=pd.to_datetime(row.get("time")) if row.get("time") else dt.datetime.utcnow(),  # type: ignore
+            )
+            db.session.add(trade)
+        db.session.commit()
+        logger.info(f"Successfully saved {len(trades_rows)} trades to database")
+        return len(trades_rows)
+    except Exception as e:
+        logger.warning("Failed to ingest trades: %s", e)
+        db.session.rollback()
+        return None
+
+
+def _ingest_backtest(strategy: str, symbol: str, equity_points: list, trades_rows: list):
+    """Store a backtest's equity and trades, then rebuild the strategy's PnL summary and rollups."""
+    with timer("db.ingest_equity"):
+        curve = _ingest_equity(strategy, equity_points)
+    with timer("db.ingest_trades"):
+        trade_count = _ingest_trades(strategy, symbol, trades_rows)
+    _refresh_pnl_summary(strategy, curve=curve, trade_count=trade_count)
+    _refresh_equity_rollups(strategy, curve=curve)
+
+
 @app.post("/api/backtest")
 @token_required
+@job_admitted
 def backtest():
     # Use real backtester
     try:
@@ -316,66 +720,12 @@ def backtest():
         date_range = payload.get("range") or {}
         start = date_range.get("from") or "2025-01-01"
         end = date_range.get("to") or "2025-02-01"
+        # Execution costs only affect the simulation; cached signals are reused
+        fee = float(payload["fee"]) if payload.get("fee") is not None else None
+        slippage = float(payload["slippage"]) if payload.get("slippage") is not None else None
 
-        # Lazy import to keep startup fast
-        from strategy_loader import load_strategy_class  # type: ignore
-        from backtester import Backtester  # type: ignore
-
-        strategy_class = load_strategy_class(strategy_name)
-        backtester = Backtester(symbol, interval, strategy_class, start, end)
-        backtester.run()
-
-        # Build equity points directly from in-memory results first
-        equity_points = []
-        try:
-            for ts, eq in zip(backtester.timestamps, backtester.equity_curve):
-                equity_points.append({"t": str(ts), "v": float(eq)})
-        except Exception as e:
-            logger.warning("Failed to build in-memory equity points: %s", e)
-
-        # If empty, fall back to logs
-        if not equity_points:
-            try:
-                logs_dir = f"logs/{strategy_class.__name__}"
-                import pandas as pd  # type: ignore
-                eq_df = pd.read_csv(f"{logs_dir}/equity.csv")
-                for _, row in eq_df.iterrows():
-                    equity_points.append({"t": str(row["time"]), "v": float(row["equity"])})
-            except Exception as e:
-                logger.warning("Failed to read equity.csv: %s", e)
-
-        # Compute stats from backtester
-        stats = backtester.calculate_stats()
-
-        # Build trades directly from in-memory results first
-        trades_rows: List[Dict[str, Any]] = []
-        try:
-            trades_rows = list(backtester.trades)
-            logger.info(f"Found {len(trades_rows)} trades from backtester.trades")
-            # enrich with symbol and strategy
-            for tr in trades_rows:
-                tr.setdefault("symbol", symbol)
-                tr.setdefault("strategy", strategy_name)
-        except Exception as e:
-            logger.warning(f"Failed to get trades from backtester: {e}")
-            trades_rows = []
-
-        # If empty, fall back to logs
-        if not trades_rows:
-            try:
-                logs_dir = f"logs/{strategy_class.__name__}"
-                import pandas as pd  # type: ignore
-                tr_df = pd.read_csv(f"{logs_dir}/backtester.csv")
-                rows = tr_df.to_dict(orient="records")  # type: ignore
-                logger.info(f"Loaded {len(rows)} trades from CSV file")
-                # enrich with symbol and strategy
-                for r in rows:
-                    r.setdefault("symbol", symbol)
-                    r.setdefault("strategy", strategy_name)
-                trades_rows = rows
-            except Exception as e:
-                logger.warning(f"Failed to load trades from CSV: {e}")
-                pass
+        result = jobs.run(tasks.backtest, symbol, interval, strategy_name, start, end, fee=fee, slippage=slippage)
+        equity_points, stats, trades_rows = result["equity_points"], result["stats"], result["trades_rows"]
 
         resp = {
             "equity": {"points": equity_points},
@@ -389,42 +739,9 @@ def backtest():
             "trades": {"rows": trades_rows},
         }
 
-        # Ingest into DB if available
-        if EquitySnapshot is not None:
-            try:
-                # clear previous snapshots for this strategy to avoid duplication
-                db.session.query(EquitySnapshot).filter_by(strategy=strategy_name).delete()  # type: ignore
-                import pandas as pd  # type: ignore
-                for p in equity_points:
-                    snap = EquitySnapshot(strategy=strategy_name, time=pd.to_datetime(p["t"]), equity=float(p["v"]))  # type: ignore
-                    db.session.add(snap)
-                db.session.commit()
-            except Exception as e:
-                logger.warning("Failed to ingest equity snapshots: %s", e)
-                db.session.rollback()
-        try:
-            logger.info(f"Saving {len(trades_rows)} trades for strategy {strategy_name}")
-            # naive ingestion: delete then insert current backtest trades for this strategy
-            db.session.query(Trade).filter_by(strategy=strategy_name).delete()  # type: ignore
-            import pandas as pd  # type: ignore
-            for row in trades_rows:
-                trade = Trade(
-                    strategy=strategy_name,
-                    symbol=row.get("symbol") or symbol,
-                    side=row.get("type") or row.get("side") or "",
-                    entry=float(row.get("price") or row.get("entry") or 0),
-                    exit=float(row.get("exit") or 0) if row.get("exit") not in (None, "") else None,
-                    pnl=float(row.get("pnl") or 0) if str(row.get("pnl") or "").replace("-","",1).replace(".","",1).isdigit() else None,
-                    time=pd.to_datetime(row.get("time")) if row.get("time") else dt.datetime.utcnow(),  # type: ignore
-                )
-                db.session.add(trade)
-            db.session.commit()
-            logger.info(f"Successfully saved {len(trades_rows)} trades to database")
-        except Exception as e:
-            logger.warning("Failed to ingest trades: %s", e)
-            db.session.rollback()
+        _ingest_backtest(strategy_name, symbol, equity_points, trades_rows)
 
-        return jsonify(resp)
+        return jsonify(_with_timings(resp))
     except Exception as e:
         logger.exception("Backtest error")
         return jsonify({"message": "Backtest failed", "error": str(e)}), 500
@@ -460,6 +777,7 @@ def load_csv_trades():
             db.session.add(trade)
         
         db.session.commit()
+        _refresh_pnl_summary(strategy, trade_count=len(rows))
         return jsonify({"message": f"Loaded {len(rows)} trades for {strategy}"})
     except Exception as e:
         logger.warning(f"Failed to load CSV trades: {e}")
@@ -503,191 +821,167 @@ def get_backtest_results():
         return jsonify({"trades": {"rows": []}})
 
 
+@app.get("/api/backtest/robustness")
+@token_required
+@job_admitted
+def backtest_robustness():
+    """Monte Carlo robustness of the last backtest's trades (logs/<Strategy>/backtester.csv)."""
+    args = request.args
+    strategy = args.get("strategy", "RSI_EMA")
+    try:
+        from strategy_loader import load_strategy_class  # type: ignore
+        from robustness import (METHODS, DEFAULT_SIMULATIONS, DEFAULT_RUIN_LEVEL, TRADING_FEE,  # type: ignore
+                                MAX_SIMULATIONS, MAX_TRADES)
+
+        method = args.get("method", "bootstrap")
+        if method not in METHODS:
+            return jsonify({"message": f"method must be one of {list(METHODS)}"}), 400
+        try:
+            n_sims = min(max(int(args.get("sims", DEFAULT_SIMULATIONS)), 1), MAX_SIMULATIONS)
+            n_trades = min(max(int(args["trades"]), 1), MAX_TRADES) if args.get("trades") else None
+        except ValueError:
+            return jsonify({"message": "sims and trades must be integers"}), 400
+        path = f"logs/{load_strategy_class(strategy).__name__}/backtester.csv"
+        if not os.path.exists(path):
+            return jsonify({"message": "No backtest trades found; run a backtest first"}), 404
+        # Trades in the file are already net of slippage; the fee is charged per trade
+        result = jobs.run(
+            tasks.robustness, path, n_sims=n_sims, method=method,
+            fee=float(args.get("fee", TRADING_FEE)), ruin_level=float(args.get("ruin", DEFAULT_RUIN_LEVEL)),
+            confidence=float(args.get("confidence", 0.95)),
+            n_trades=n_trades,
+            seed=int(args["seed"]) if args.get("seed") else None,
+        )
+        return jsonify(_with_timings({"strategy": strategy, **result}))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        logger.exception("Robustness analysis failed")
+        return jsonify({"message": "Robustness analysis failed", "error": str(e)}), 500
+
+
+# === Paper-trading sessions ===
+# The API only records which sessions should run (paper state "sessions");
+# paper_supervisor.py runs them all in one process and reports their health
+# in PAPER_STATUS_PATH, which GET /api/papertrading serves.
+def _supervisor_alive(status: dict) -> bool:
+    age = time.time() - float(status.get("heartbeat") or 0)
+    return bool(status.get("running")) and age < max(3 * float(status.get("poll_seconds") or 5), 30)
+
+
 @app.post("/api/papertrading")
 @token_required
 def papertrading():
+    """start: one session per strategy x symbol ({"strategy"|"strategies", "symbol"|"symbols",
+    "interval", "params", "balance"}); stop: {"session"}, or the given strategies/symbols, or all."""
     data = request.get_json(silent=True) or {}
     action = data.get("action")
     if action not in ("start", "stop"):
         return jsonify({"message": "action must be 'start' or 'stop'"}), 400
 
-    # update local paper state
-    symbol = (data.get("symbol") or "BTCUSDT").upper()
-    strategy = data.get("strategy") or "RSI_EMA"
+    symbols = [s.upper() for s in (data.get("symbols") or [data.get("symbol") or "BTCUSDT"])]
+    strategies = data.get("strategies") or [data.get("strategy") or "RSI_EMA"]
     interval = data.get("interval") or data.get("timeframe") or "15m"
-
-    try:
-        state = _load_paper_state()
+    if action == "start":
+        from strategy_loader import list_strategy_names  # type: ignore
+        from binance_data import INTERVAL_MS  # type: ignore
+        unknown = [s for s in strategies if s not in list_strategy_names()]
+        if unknown:
+            return jsonify({"message": f"Unknown strategies: {', '.join(unknown)}"}), 400
+        if interval not in INTERVAL_MS:
+            return jsonify({"message": f"Unsupported interval '{interval}'"}), 400
+        if data.get("params") and len(strategies) > 1:
+            return jsonify({"message": "params needs a single strategy"}), 400
+
+    def stopping(sid, spec):
+        if data.get("session"):
+            return sid == data["session"]
+        return ((not (data.get("strategy") or data.get("strategies")) or spec["strategy"] in strategies)
+                and (not (data.get("symbol") or data.get("symbols")) or spec["symbol"] in symbols))
+
+    def apply(state):
+        sessions = state.setdefault("sessions", {})
         if action == "start":
-            state["live"] = True
-            state["symbol"] = symbol
-            state["strategy"] = strategy
-            state["interval"] = interval
+            balance = float(data.get("balance") or state.get("balance") or 1000.0)
+            for strategy in strategies:
+                for symbol in symbols:
+                    sessions[paper_state.session_id(strategy, symbol, interval)] = {
+                        "strategy": strategy, "symbol": symbol, "interval": interval,
+                        "params": data.get("params") or {}, "balance": balance}
+            state.update(symbol=symbols[0], strategy=strategies[0], interval=interval)
         else:
-            state["live"] = False
-        _save_paper_state(state)
-        return jsonify({"ok": True, "action": action, "state": state})
+            for sid in [sid for sid, spec in sessions.items() if stopping(sid, spec)]:
+                del sessions[sid]
+        state["live"] = bool(sessions)
+
+    try:
+        state = paper_state.default_store().update(apply)
+        status = paper_state.status_store().get()
+        return jsonify({"ok": True, "action": action, "state": state, "sessions": sorted(state["sessions"]),
+                        "supervisor": _supervisor_alive(status)})
     except Exception as e:
         return jsonify({"message": "Failed to update paper state", "error": str(e)}), 500
 
+
+@app.get("/api/papertrading")
+@token_required
+def papertrading_status():
+    """Requested sessions with the supervisor's report on each (health, position, equity, lag)."""
+    wanted = paper_state.default_store().get().get("sessions") or {}
+    status = paper_state.status_store().get()
+    alive = _supervisor_alive(status)
+    reported = status.get("sessions") or {}
+    rows = []
+    for sid, spec in sorted(wanted.items()):
+        row = dict(reported.get(sid) or {"id": sid, "spec": spec, "health": "pending"})
+        row.pop("carry", None)
+        if not alive:
+            row["health"] = "stopped" if row["health"] != "pending" else "pending"
+        rows.append(row)
+    return jsonify({
+        "live": bool(wanted),
+        "supervisor": {"running": alive, "pid": status.get("pid"), "started": status.get("started"),
+                       "heartbeatAge": round(time.time() - status["heartbeat"], 3) if status.get("heartbeat") else None},
+        "feeds": list((status.get("feeds") or {}).values()) if alive else [],
+        "sessions": rows,
+    })
+
+
 @app.post("/api/optimizer")
 @token_required
+@job_admitted
 def optimizer_run():
     try:
-        from strategy_loader import load_strategy_class, list_strategy_names  # type: ignore
-        from backtester import Backtester  # type: ignore
-        import pandas as pd  # type: ignore
+        from param_search import SEARCH_METHODS, OBJECTIVES  # type: ignore
+        from optimizer_ledger import default_ledger  # type: ignore
+        import random
 
         payload = request.get_json(silent=True) or {}
-        symbols = payload.get("symbols") or ["BTCUSDT", "ETHUSDT"]
-        strategies = payload.get("strategies") or list_strategy_names()
-        # Accept both interval or timeframe
-        interval = payload.get("interval") or payload.get("timeframe") or "1h"
-        # Accept direct start/end or {range:{from,to}}
-        if isinstance(payload.get("range"), dict):
-            start = payload["range"].get("from") or "2025-01-01"
-            end = payload["range"].get("to") or "2025-02-01"
-        else:
-            start = payload.get("start") or "2025-01-01"
-            end = payload.get("end") or "2025-02-01"
-
-        rows = []
-        # --- Parameter grids per strategy (kept small to control runtime) ---
-        param_grids: dict[str, list[dict]] = {
-            "RSI_EMA": [
-                {"rsi_period": rp, "ema_period": ep, "rsi_buy": rb, "rsi_sell": rs}
-                for rp in [7, 14]
-                for ep in [20, 50]
-                for rb in [30, 40, 45]
-                for rs in [55, 60, 70]
-            ],
-            "MACD": [
-                {"window_fast": wf, "window_slow": ws, "window_sign": sg, "ema200_span": e2}
-                for wf in [8, 12]
-                for ws in [24, 26, 35]
-                for sg in [9, 12]
-                for e2 in [100, 200]
-                if wf < ws
-            ],
-            "SMA_CROSS": [
-                {"short_window": sw, "long_window": lw}
-                for sw in [20, 50]
-                for lw in [100, 200]
-                if sw < lw
-            ],
-            "EMA200_PRICE_ACTION": [
-                {"ema_span": s} for s in [100, 200]
-            ],
-            "TRIX": [
-                {"signal_window": w} for w in [5, 9, 14]
-            ],
-            "BOLLINGER_RSI": [
-                {"bb_window": bw, "bb_std": bs, "rsi_window": rw, "rsi_buy": rb, "rsi_sell": rs}
-                for bw in [14, 20]
-                for bs in [1.5, 2.0]
-                for rw in [14]
-                for rb in [25, 30]
-                for rs in [70, 75]
-            ],
-            "VOLUME_BREAKOUT": [
-                {"avg_window": aw, "min_change": mc, "min_vol_mult": vm}
-                for aw in [20, 30]
-                for mc in [0.0, 0.005]
-                for vm in [1.0, 1.5]
-            ],
-            "BREAKOUT_VOLUME": [
-                {"breakout_window": bw, "min_vol_mult": vm}
-                for bw in [20, 50]
-                for vm in [1.0, 1.5]
-            ],
-            "PSAR_MACD": [
-                {"psar_step": p, "psar_max": pm, "window_fast": wf, "window_slow": ws, "window_sign": sg}
-                for p in [0.02, 0.03]
-                for pm in [0.2]
-                for wf in [8, 12]
-                for ws in [24, 26]
-                for sg in [9]
-            ],
-            "FIBONACCI_REVERSAL": [
-                {"lookback": lb, "retrace": rt}
-                for lb in [50, 100]
-                for rt in [0.5, 0.618]
-            ],
-            "HEIKIN_ASHI_EMA": [
-                {"ema_span": s} for s in [20, 50]
-            ],
-            "SUPERTREND_RSI": [
-                {"stc_fast": sf, "stc_slow": ss, "stc_cycle": sc, "stc_buy": sb, "stc_sell": sl, "rsi_window": rw, "rsi_buy": rb, "rsi_sell": rs}
-                for sf in [23]
-                for ss in [50]
-                for sc in [10]
-                for sb in [50]
-                for sl in [50]
-                for rw in [14]
-                for rb in [25, 30]
-                for rs in [70, 75]
-            ],
-            "ADX_EMA": [
-                {"ema_span": es, "adx_threshold": at}
-                for es in [20, 50]
-                for at in [20, 25, 30]
-            ],
-            "ICHIMOKU": [
-                {"window1": w1, "window2": w2}
-                for w1 in [9]
-                for w2 in [26, 34]
-            ],
-            "KELTNER_BREAKOUT": [
-                {"window": w, "window_atr": wa, "original": o}
-                for w in [20, 30]
-                for wa in [10, 20]
-                for o in [False, True]
-            ],
-        }
-
-        for strat in strategies:
-            strat_class = load_strategy_class(strat)
-            grid = param_grids.get(strat, [{}])
-            best_row = None
-            for params in grid:
-                # Evaluate across symbols and keep the best per-strategy over both params and symbols
-                for sym in symbols:
-                    bt = Backtester(sym, interval, strat_class, start, end, strategy_params=params)
-                    bt.run()
-                    stats = bt.calculate_stats()
-                    row = {
-                        "strategy": strat,
-                        "symbol": sym,
-                        "totalReturn": float(stats.get("Total Return (%)", 0)),
-                        "maxDD": float(stats.get("Max Drawdown (%)", 0)),
-                        "winRate": float(stats.get("Win Rate (%)", 0)),
-                        "sharpe": float(stats.get("Sharpe Ratio", 0)),
-                        "params": params,
-                    }
-                    if best_row is None or row["totalReturn"] > best_row["totalReturn"]:
-                        best_row = row
-            if best_row is not None:
-                rows.append(best_row)
-        import os, json as _json
-        df = pd.DataFrame(rows)
-        # Already one row per strategy (best over params and symbols)
-        os.makedirs("logs/optimizer", exist_ok=True)
-        out_path = "logs/optimizer/optimizer_results.csv"
-        try:
-            if os.path.exists(out_path):
-                os.remove(out_path)
-        except Exception:
-            pass
-        df.to_csv(out_path, index=False)
-        # Persist meta used for this run
-        try:
-            meta_path = "logs/optimizer/meta.json"
-            used_params = {"interval": interval, "start": start, "end": end, "symbols": symbols, "strategies": strategies}
-            with open(meta_path, "w", encoding="utf-8") as f:
-                _json.dump(used_params, f)
-        except Exception:
-            pass
-        return jsonify({"ok": True})
+        # {"resume": run_id} re-runs a stored request; evaluations it already
+        # recorded are read back from the ledger instead of recomputed
+        resume_id = payload.get("resume")
+        if resume_id is not None:
+            previous = default_ledger().run(int(resume_id))
+            if previous is None:
+                return jsonify({"message": f"Unknown optimizer run {resume_id}"}), 404
+            payload = previous["payload"]
+
+        # Search settings: method grid|random|halving|tpe, evaluation budget per
+        # (strategy, symbol), objective return|sharpe|return_dd; "spaces" may
+        # widen a strategy's grid ({param: [values]} or {param: {min, max, step}})
+        search_cfg = payload.get("search") or {}
+        method = search_cfg.get("method", "grid")
+        objective = search_cfg.get("objective", "return")
+        seed = search_cfg.get("seed")
+        if method not in SEARCH_METHODS or objective not in OBJECTIVES:
+            return jsonify({"message": "Invalid search settings",
+                            "methods": sorted(SEARCH_METHODS), "objectives": sorted(OBJECTIVES)}), 400
+        if seed is None and method != "grid":
+            # Pin the seed so a resumed run replays the same search path
+            seed = random.randrange(2 ** 31)
+            payload = {**payload, "search": {**search_cfg, "seed": seed}}
+        result = jobs.run(tasks.optimize, payload)
+        return jsonify(_with_timings({"ok": True, **result}))
     except Exception as e:
         logger.exception("Optimizer run failed")
         return jsonify({"message": "Optimizer failed", "error": str(e)}), 500
@@ -707,15 +1001,17 @@ def optimizer_results():
                 {"strategy": "MACD", "symbol": "ETHUSDT", "totalReturn": 12.7, "maxDD": -8.9, "winRate": 51.0, "sharpe": 1.12},
             ])
         df = df.copy()
-        # Defensive deduplication: keep only best (max totalReturn) per strategy
+        # Rank by the run's objective score when present (older results only have totalReturn)
+        rank_col = "score" if "score" in df.columns else "totalReturn"
+        # Defensive deduplication: keep only best per strategy
         try:
-            if not df.empty and "strategy" in df.columns and "totalReturn" in df.columns:
-                best_idx = df.groupby("strategy")["totalReturn"].idxmax()
+            if not df.empty and "strategy" in df.columns and rank_col in df.columns:
+                best_idx = df.groupby("strategy")[rank_col].idxmax()
                 df = df.loc[best_idx].reset_index(drop=True)
         except Exception:
             pass
-        # Keep a consistent display order by totalReturn desc
-        df["rank"] = df["totalReturn"].rank(ascending=False, method="first").astype(int)
+        # Keep a consistent display order by score desc
+        df["rank"] = df[rank_col].rank(ascending=False, method="first").astype(int)
         df = df.sort_values(["rank", "strategy"]).reset_index(drop=True)
         # format for frontend
         out = []
@@ -742,6 +1038,98 @@ def optimizer_results():
         logger.exception("Optimizer results failed")
         return jsonify({"message": "Failed to load optimizer results", "error": str(e)}), 500
 
+@app.post("/api/walkforward")
+@token_required
+@job_admitted
+def walkforward_run():
+    """Walk-forward optimization: per-fold params/stats and stitched out-of-sample equity."""
+    payload = request.get_json(silent=True) or {}
+    symbol = (payload.get("symbol") or "BTCUSDT").upper()
+    interval = payload.get("interval") or "15m"
+    strategy_name = payload.get("strategy") or "RSI_EMA"
+    date_range = payload.get("range") or {}
+    start = date_range.get("from") or "2024-01-01"
+    end = date_range.get("to") or "2025-01-01"
+    search_cfg = payload.get("search") or {}
+    try:
+        from walk_forward import DEFAULT_TRAIN, DEFAULT_TEST  # type: ignore
+        from param_search import SEARCH_METHODS, OBJECTIVES  # type: ignore
+        from backtester import TRADING_FEE, SLIPPAGE  # type: ignore
+
+        method = search_cfg.get("method", "grid")
+        objective = search_cfg.get("objective", "sharpe")
+        if method not in SEARCH_METHODS or objective not in OBJECTIVES:
+            return jsonify({"message": "Invalid search settings",
+                            "methods": sorted(SEARCH_METHODS), "objectives": sorted(OBJECTIVES)}), 400
+        max_points = int(payload.get("maxPoints", 5000))
+        if max_points < 1:
+            return jsonify({"message": "maxPoints must be at least 1"}), 400
+        result = jobs.run(
+            tasks.walkforward, symbol, interval, strategy_name, start, end,
+            max_points=max_points,
+            train=payload.get("train") or DEFAULT_TRAIN, test=payload.get("test") or DEFAULT_TEST,
+            step=payload.get("step"), anchored=bool(payload.get("anchored", False)),
+            method=method, budget=search_cfg.get("budget"), objective=objective, seed=search_cfg.get("seed", 0),
+            space=(payload.get("spaces") or {}).get(strategy_name),
+            fee=float(payload.get("fee", TRADING_FEE)), slippage=float(payload.get("slippage", SLIPPAGE)),
+        )
+        return jsonify(_with_timings(result))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        logger.exception("Walk-forward failed")
+        return jsonify({"message": "Walk-forward failed", "error": str(e)}), 500
+
+
+@app.get("/api/optimizer/leaderboard")
+@token_required
+def optimizer_leaderboard():
+    """Every recorded evaluation ranked by objective (return|sharpe|return_dd)."""
+    try:
+        from optimizer_ledger import default_ledger  # type: ignore
+        args = request.args
+        rows = default_ledger().leaderboard(
+            objective=args.get("objective", "return"), limit=min(int(args.get("limit", 50)), 1000),
+            strategy=args.get("strategy"), symbol=args.get("symbol"), interval=args.get("interval"),
+            start=args.get("start"), end=args.get("end"),
+        )
+        return jsonify({"rows": rows})
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        logger.exception("Optimizer leaderboard failed")
+        return jsonify({"message": "Failed to load leaderboard", "error": str(e)}), 500
+
+
+@app.get("/api/optimizer/sensitivity")
+@token_required
+def optimizer_sensitivity():
+    """Objective per value of one parameter of one strategy, over all recorded evaluations."""
+    args = request.args
+    strategy, param = args.get("strategy"), args.get("param")
+    if not strategy or not param:
+        return jsonify({"message": "strategy and param are required"}), 400
+    try:
+        from optimizer_ledger import default_ledger  # type: ignore
+        rows = default_ledger().sensitivity(
+            strategy, param, objective=args.get("objective", "return"),
+            symbol=args.get("symbol"), interval=args.get("interval"), start=args.get("start"), end=args.get("end"),
+        )
+        return jsonify({"strategy": strategy, "param": param, "rows": rows})
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        logger.exception("Optimizer sensitivity failed")
+        return jsonify({"message": "Failed to load sensitivity", "error": str(e)}), 500
+
+
+@app.get("/api/optimizer/runs")
+@token_required
+def optimizer_runs():
+    """Recent optimizer runs; POST /api/optimizer {"resume": id} continues one."""
+    from optimizer_ledger import default_ledger  # type: ignore
+    return jsonify({"rows": default_ledger().runs(limit=min(int(request.args.get("limit", 20)), 200))})
+
 # TODO: wire your real endpoints here, e.g.
 # @app.post("/api/login")
 # @app.post("/api/backtest")
@@ -751,39 +1139,12 @@ def optimizer_results():
 # @app.get("/api/positions")2
 # @app.post("/api/papertrading")
 
-STATE_DIR = os.path.join("logs", "paper")
-os.makedirs(STATE_DIR, exist_ok=True)
-STATE_PATH = os.path.join(STATE_DIR, "state.json")
-
-
-def _load_paper_state():
-    try:
-        if os.path.exists(STATE_PATH):
-            with open(STATE_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
-        pass
-    state = {"balance": 1000.0, "symbol": "BTCUSDT", "live": False, "strategy": "RSI_EMA", "interval": "15m"}
-    try:
-        with open(STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(state, f)
-    except Exception:
-        pass
-    return state
-
-
-def _save_paper_state(state):
-    try:
-        with open(STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(state, f)
-    except Exception:
-        pass
-
-
+# Paper account state lives in paper_state's store: cached reads, locked
+# atomic updates shared by all workers; checks inside an update raise Rejected
 @app.get("/api/paper/balance")
 @token_required
 def paper_balance():
-    state = _load_paper_state()
+    state = paper_state.default_store().get()
     return jsonify({
         "balance": state.get("balance", 0.0),
         "symbol": state.get("symbol", "BTCUSDT"),
@@ -800,11 +1161,16 @@ def paper_deposit():
     amount = float(data.get("amount") or 0)
     if amount <= 0:
         return jsonify({"message": "amount must be > 0"}), 400
-    state = _load_paper_state()
-    if bool(state.get("live")):
-        return jsonify({"message": "Cannot deposit while paper trading is live"}), 400
-    state["balance"] = float(state.get("balance", 0.0)) + amount
-    _save_paper_state(state)
+
+    def deposit(state):
+        if bool(state.get("live")):
+            raise paper_state.Rejected("Cannot deposit while paper trading is live")
+        state["balance"] = float(state.get("balance", 0.0)) + amount
+
+    try:
+        state = paper_state.default_store().update(deposit)
+    except paper_state.Rejected as e:
+        return jsonify({"message": str(e)}), 400
     return jsonify({"ok": True, "balance": state["balance"]})
 
 
@@ -815,14 +1181,19 @@ def paper_withdraw():
     amount = float(data.get("amount") or 0)
     if amount <= 0:
         return jsonify({"message": "amount must be > 0"}), 400
-    state = _load_paper_state()
-    if bool(state.get("live")):
-        return jsonify({"message": "Cannot withdraw while paper trading is live"}), 400
-    bal = float(state.get("balance", 0.0))
-    if amount > bal:
-        return jsonify({"message": "insufficient balance"}), 400
-    state["balance"] = bal - amount
-    _save_paper_state(state)
+
+    def withdraw(state):
+        if bool(state.get("live")):
+            raise paper_state.Rejected("Cannot withdraw while paper trading is live")
+        bal = float(state.get("balance", 0.0))
+        if amount > bal:
+            raise paper_state.Rejected("insufficient balance")
+        state["balance"] = bal - amount
+
+    try:
+        state = paper_state.default_store().update(withdraw)
+    except paper_state.Rejected as e:
+        return jsonify({"message": str(e)}), 400
     return jsonify({"ok": True, "balance": state["balance"]})
 
 
@@ -831,27 +1202,35 @@ def paper_withdraw():
 def paper_set_symbol():
     data = request.get_json(silent=True) or {}
     symbol = (data.get("symbol") or "BTCUSDT").upper()
-    state = _load_paper_state()
-    state["symbol"] = symbol
-    _save_paper_state(state)
+    paper_state.default_store().update(lambda state: state.update(symbol=symbol))
     return jsonify({"ok": True, "symbol": symbol})
 
 
 @app.get("/api/paper/results")
 @token_required
 def paper_results():
+    """Paper trades of a strategy: the standalone trader's log plus the supervisor's sessions."""
     try:
         strategy = request.args.get("strategy", "RSI_EMA")
+        import glob
         import pandas as pd  # type: ignore
-        path = os.path.join("logs", strategy, "paperTrading.csv")
-        if not os.path.exists(path):
+        frames = []
+        legacy = os.path.join("logs", strategy, "paperTrading.csv")
+        if os.path.exists(legacy):
+            frames.append(pd.read_csv(legacy))
+        for path in sorted(glob.glob(os.path.join(paper_state.PAPER_SESSIONS_DIR, "*", "trades.csv"))):
+            trades_df = pd.read_csv(path)
+            frames.append(trades_df[trades_df["strategy"] == strategy])
+        frames = [df for df in frames if not df.empty]
+        if not frames:
             return jsonify({"rows": []})
-        df = pd.read_csv(path)
-        return jsonify({"rows": df.to_dict(orient="records")})
+        df = pd.concat(frames, ignore_index=True)
+        return jsonify({"rows": df.astype(object).where(df.notna(), None).to_dict(orient="records")})
     except Exception as e:
         logger.warning("paper results failed: %s", e)
         return jsonify({"rows": []})
 
 
 if __name__ == "__main__":
+    init_db()
     app.run(host="0.0.0.0", port=5000, debug=False, use_reloader=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,132 @@
+# backtest_checkpoint.py
+"""Terminal state of finished backtests, so extending `end` only replays new candles.
+
+A checkpoint is keyed by everything that fixes a backtest except its end
+date (strategy code and params, symbol, interval, start, fee, slippage) and
+holds, in CHECKPOINT_DIR/<key>/:
+
+  state.json   position, entry price, balance, last candle time, record
+               counts and a chained hash of the traded candles
+  equity.bin   (time, equity) records before the final force-close
+  events.bin   Backtester.trades records (trade_records.TRADE_DTYPE)
+  tail-*.npz   the last candles before the checkpoint; indicators are
+               recomputed from them (the "indicator state")
+
+equity.bin and events.bin are append-only: a save truncates them to the
+counts in state.json, appends the new records and then replaces state.json,
+so a crash mid-save leaves the previous checkpoint readable.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from signal_store import data_hash, strategy_fingerprint, resolved_params
+from trade_records import TRADE_DTYPE, EQUITY_DTYPE
+
+CHECKPOINT_DIR = os.getenv("BACKTEST_CHECKPOINT_DIR", os.path.join("logs", "cache", "checkpoints"))
+CHECKPOINT_ENABLED = os.getenv("BACKTEST_CHECKPOINT_ENABLED", "1") not in ("0", "false", "False")
+
+TAIL_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def checkpoint_key(strategy_class, params, symbol, interval, start, fee, slippage) -> str:
+    raw = json.dumps(
+        [strategy_fingerprint(strategy_class), resolved_params(strategy_class, params), symbol.upper(), interval,
+         str(pd.Timestamp(start)), float(fee), float(slippage)],
+        sort_keys=True, default=str,
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=20).hexdigest()
+
+
+def chain_hash(prefix_hash: str | None, df) -> str:
+    """Hash of the candles traded so far, extended by `df`."""
+    if prefix_hash is None:
+        return data_hash(df)
+    return hashlib.blake2b((prefix_hash + data_hash(df)).encode(), digest_size=16).hexdigest()
+
+
+def _atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _append(path, count, records):
+    """Keep the first `count` records of `path` and append `records`."""
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as f:
+        f.truncate(count * records.dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(records).tobytes())
+
+
+class CheckpointStore:
+    def __init__(self, root: str = CHECKPOINT_DIR):
+        self.root = root
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def load(self, key: str) -> dict | None:
+        """State dict plus `equity`, `events` (record arrays) and `tail` (OHLCV frame), or None."""
+        path = self._dir(key)
+        try:
+            with open(os.path.join(path, "state.json")) as f:
+                state = json.load(f)
+            equity = np.fromfile(os.path.join(path, "equity.bin"), dtype=EQUITY_DTYPE, count=state["n_equity"])
+            events = np.fromfile(os.path.join(path, "events.bin"), dtype=TRADE_DTYPE, count=state["n_events"])
+            with np.load(os.path.join(path, state["tail"])) as data:
+                tail = pd.DataFrame(data["ohlcv"], columns=TAIL_COLUMNS,
+                                    index=pd.DatetimeIndex(pd.to_datetime(data["time"]), name="timestamp"))
+        except (OSError, KeyError, ValueError):
+            return None
+        if len(equity) != state["n_equity"] or len(events) != state["n_events"]:
+            return None
+        state.update(equity=equity, events=events, tail=tail)
+        return state
+
+    def save(self, key: str, state: dict, equity, events, tail, base: dict | None = None):
+        """Write a checkpoint. With `base` (the loaded previous checkpoint) the
+        equity/events records are appended to it, otherwise they replace it."""
+        path = self._dir(key)
+        os.makedirs(path, exist_ok=True)
+        n_equity = base["n_equity"] if base else 0
+        n_events = base["n_events"] if base else 0
+        _append(os.path.join(path, "equity.bin"), n_equity, equity)
+        _append(os.path.join(path, "events.bin"), n_events, events)
+
+        tail_name = f"tail-{state['prefix_hash'][:16]}.npz"
+        _atomic_write(os.path.join(path, tail_name), lambda f: np.savez(
+            f, time=tail.index.asi8, ohlcv=tail[TAIL_COLUMNS].to_numpy(dtype=np.float64)))
+        state = dict(state, n_equity=n_equity + len(equity), n_events=n_events + len(events), tail=tail_name)
+        _atomic_write(os.path.join(path, "state.json"), lambda f: f.write(json.dumps(state).encode()))
+        for e in os.scandir(path):
+            if e.name.startswith("tail-") and e.name != tail_name:
+                try:
+                    os.remove(e.path)
+                except OSError:
+                    pass
+
+
+_default_checkpoints = None
+
+
+def default_checkpoints():
+    """Process-wide store, or None when BACKTEST_CHECKPOINT_ENABLED is off."""
+    global _default_checkpoints
+    if not CHECKPOINT_ENABLED:
+        return None
+    if _default_checkpoints is None:
+        _default_checkpoints = CheckpointStore()
+    return _default_checkpoints
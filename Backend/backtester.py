@@ -1,103 +1,300 @@
 # backtester.py
 
-import matplotlib
-matplotlib.use("Agg")
+from __future__ import annotations
 import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import os
-import mplfinance as mpf
 from datetime import datetime
 from strategy_loader import load_strategy_class
-from binance_data import get_historical_klines_df
+from binance_data import get_historical_klines_df, interval_to_timedelta
+from signal_store import default_store, data_hash, signal_key
+from stats import equity_stats
+from backtest_checkpoint import default_checkpoints, checkpoint_key, chain_hash, TAIL_COLUMNS
+from instrumentation import timer, timed, count
+from evaluator import INITIAL_BALANCE, TRADING_FEE, SLIPPAGE
+from trade_records import (Records, trade_dicts, TRADE_DTYPE, EQUITY_DTYPE,
+                           LONG_ENTRY, LONG_EXIT, SHORT_ENTRY, SHORT_EXIT)
 
 # === CONFIG ===
-INITIAL_BALANCE = 1000
-TRADING_FEE = 0.001  # 0.1%
-SLIPPAGE = 0.0005    # 0.05%
+# Candles kept in a checkpoint to recompute indicators, in strategy warm-ups
+CHECKPOINT_OVERLAP_WARMUPS = 2
+
+
+def _pyplot():
+    """matplotlib.pyplot on the Agg backend, imported by the first plot (it takes longer
+    to import than everything else a backtest needs)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
 
 class Backtester:
-    def __init__(self, symbol, interval, strategy_class, start, end, strategy_params: dict | None = None):
+    def __init__(self, symbol, interval, strategy_class, start, end, strategy_params: dict | None = None,
+                 keep_indicators: bool = True, fee: float = TRADING_FEE, slippage: float = SLIPPAGE,
+                 signal_store=None, checkpoint_store=None):
         self.symbol = symbol
         self.interval = interval
         self.strategy_class = strategy_class
         self.start = start
         self.end = end
         self.strategy_params = strategy_params or {}
+        # False = only the int8 signal column is added (optimizer sweeps)
+        self.keep_indicators = keep_indicators
+        self.fee = fee
+        self.slippage = slippage
+        # Signals don't depend on fee/slippage, so reruns reuse cached ones
+        self.signal_store = signal_store if signal_store is not None else default_store()
+        # Terminal state of earlier runs over the same start; extending `end` replays only new candles
+        self.checkpoint_store = checkpoint_store if checkpoint_store is not None else default_checkpoints()
         self.balance = INITIAL_BALANCE
         self.position = 0       # 0 = no position, 1 = long, -1 = short
         self.entry_price = None
-        self.trades = []
-        self.equity_curve = []
-        self.timestamps = []
+        # Trade events and equity points as structured arrays (see trade_records)
+        self.trades = Records(TRADE_DTYPE)
+        self.equity = Records(EQUITY_DTYPE)
         self.logs_dir = f"logs/{strategy_class.__name__}"
         os.makedirs(self.logs_dir, exist_ok=True)
 
+    @property
+    def equity_curve(self) -> np.ndarray:
+        return self.equity.array["equity"]
+
+    @property
+    def timestamps(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(pd.to_datetime(self.equity.array["time"]))
+
+    def trade_events(self) -> list:
+        """Trade events as {"type", "price", "time"[, "pnl"]} dicts."""
+        return trade_dicts(self.trades.array)
+
+    @property
+    def warmup(self):
+        """Candles the strategy needs before `start` so its first signal is valid."""
+        warmup_for = getattr(self.strategy_class, "warmup_for", None)
+        return warmup_for(**self.strategy_params) if warmup_for else 0
+
     def fetch_data(self):
         print(f"🌐 Fetching data for {self.symbol} ({self.interval})...")
-        df = get_historical_klines_df(self.symbol, self.interval, self.start, self.end)
+        fetch_start = pd.Timestamp(self.start) - self.warmup * interval_to_timedelta(self.interval)
+        with timer("backtest.fetch"):
+            df = get_historical_klines_df(self.symbol, self.interval, fetch_start, self.end)
         if df is None or df.empty:
             raise ValueError("No data fetched for backtest.")
         return df
 
     def apply_strategy(self, df):
+        key = None
+        if self.signal_store is not None:
+            key = signal_key(self.strategy_class, self.strategy_params, self.symbol, self.interval, data_hash(df))
+            # The cache holds signals only; a frame with indicator columns needs the strategy run
+            cached = None if self.keep_indicators else self.signal_store.get(key)
+            if cached is not None and len(cached) == len(df):
+                count("signal_cache.hit")
+                df['signal'] = cached
+                return df
+            count("signal_cache.miss")
+        with timer(f"strategy.{self.strategy_class.__name__}"):
+            df = self._generate_signals(df)
+        if key is not None:
+            self.signal_store.put(key, df['signal'].to_numpy())
+        return df
+
+    def _generate_signals(self, df):
         # Instantiate with optional parameters if accepted
         try:
             strategy = self.strategy_class(df, **self.strategy_params)
         except TypeError:
             strategy = self.strategy_class(df)
+        if not self.keep_indicators and hasattr(strategy, "signals"):
+            # Copy-free: the fetched frame is ours, so just attach the signal
+            df['signal'] = strategy.signals()
+            return df
         df = strategy.generate_signals()
         if 'signal' not in df.columns:
             raise ValueError("Strategy must return a 'signal' column.")
         return df
 
+    # --- CHECKPOINTS ---
+    def _checkpoint_key(self):
+        return checkpoint_key(self.strategy_class, self.strategy_params, self.symbol, self.interval,
+                              self.start, self.fee, self.slippage)
+
+    def _extend_checkpoint(self):
+        """(frame, checkpoint) to continue a stored run, or None to run from `start`.
+
+        The frame holds the checkpoint's tail candles plus everything after it up to
+        `end`, with entry/exit events as signals (the position itself is restored).
+        """
+        with timer("backtest.checkpoint_load"):
+            checkpoint = self.checkpoint_store.load(self._checkpoint_key())
+        if checkpoint is None:
+            return None
+        last_time = pd.Timestamp(checkpoint["last_time"])
+        if pd.Timestamp(self.end) < last_time:
+            return None
+        tail = checkpoint["tail"]
+        print(f"🌐 Fetching data for {self.symbol} ({self.interval}) after checkpoint {last_time}...")
+        with timer("backtest.fetch"):
+            frame = get_historical_klines_df(self.symbol, self.interval, tail.index[0], self.end)
+        if frame is None or frame.empty:
+            return None
+        head = frame[frame.index <= last_time]
+        if not (head.index.equals(tail.index)
+                and np.array_equal(head[TAIL_COLUMNS].to_numpy(dtype=np.float64), tail.to_numpy())):
+            print("⚠️ Candles changed since the checkpoint, running the full backtest.")
+            return None
+        try:
+            strategy = self.strategy_class(frame, **self.strategy_params)
+        except TypeError:
+            strategy = self.strategy_class(frame)
+        if not hasattr(strategy, "signal_events"):
+            return None
+        with timer("backtest.signals"), timer(f"strategy.{self.strategy_class.__name__}"):
+            frame['signal'] = strategy.signal_events()
+
+        self.balance = checkpoint["balance"]
+        self.position = checkpoint["position"]
+        self.entry_price = checkpoint["entry_price"]
+        self.trades = Records(TRADE_DTYPE, checkpoint["events"])
+        self.equity = Records(EQUITY_DTYPE, checkpoint["equity"])
+        return frame, checkpoint
+
+    def _save_checkpoint(self, frame, traded, base):
+        """Store the state after `traded` (the candles replayed since `base` or `start`)."""
+        if self.checkpoint_store is None or traded.empty:
+            return
+        n_equity = base["n_equity"] if base else 0
+        n_events = base["n_events"] if base else 0
+        last_time = traded.index[-1]
+        overlap = max(CHECKPOINT_OVERLAP_WARMUPS * self.warmup, 1)
+        state = {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "start": str(pd.Timestamp(self.start)),
+            "last_time": last_time.value,
+            "position": int(self.position),
+            "entry_price": None if self.entry_price is None else float(self.entry_price),
+            "balance": float(self.balance),
+            "prefix_hash": chain_hash(base["prefix_hash"] if base else None, traded[TAIL_COLUMNS]),
+        }
+        tail = frame[frame.index <= last_time].iloc[-overlap:]
+        try:
+            self.checkpoint_store.save(self._checkpoint_key(), state, self.equity.array[n_equity:],
+                                       self.trades.array[n_events:], tail, base=base)
+        except OSError as e:
+            print(f"⚠️ Could not save checkpoint: {e}")
+
+    @timed("backtest.run")
     def run(self):
-        df = self.fetch_data()
-        df = self.apply_strategy(df)
+        extended = self._extend_checkpoint() if self.checkpoint_store is not None else None
+        if extended is None:
+            df = self.fetch_data()
+            with timer("backtest.signals"):
+                frame = self.apply_strategy(df)
+            checkpoint = None
+            # Warm-up candles only feed the indicators; trading starts at `start`
+            df = frame[frame.index >= pd.Timestamp(self.start)]
+            if df.empty:
+                raise ValueError("No data in the requested range after strategy warm-up.")
+        else:
+            frame, checkpoint = extended
+            df = frame[frame.index > pd.Timestamp(checkpoint["last_time"])]
+            print(f"♻️ Resuming from checkpoint: {len(df)} new candles")
         print("Signal counts:")
         print(df['signal'].value_counts())
 
         print(f"\n🚀 Starting backtest: {self.symbol} | Strategy: {self.strategy_class.__name__}\n")
 
-        for i in range(len(df)):
-            price = df.iloc[i]["close"]
-            signal = df.iloc[i]["signal"]
-            timestamp = df.index[i]
+        # A candle that is still open can change, so the checkpoint stops at the last closed one
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        n_closed = int(np.searchsorted(df.index + interval_to_timedelta(self.interval), now, side="right"))
+        count("backtest.candles", len(df))
+        with timer("backtest.simulate"):
+            self._replay(df.iloc[:n_closed])
+        with timer("backtest.checkpoint_save"):
+            self._save_checkpoint(frame, df.iloc[:n_closed], checkpoint)
+        with timer("backtest.simulate"):
+            self._replay(df.iloc[n_closed:])
+
+        # --- CLOSE FINAL POSITION ---
+        if self.position != 0:
+            price = frame.iloc[-1]['close']
+            exit_price = price * (1 - self.slippage) if self.position == 1 else price * (1 + self.slippage)
+            pnl = ((exit_price - self.entry_price) / self.entry_price) if self.position == 1 else ((self.entry_price - exit_price)/self.entry_price)
+            self.balance *= (1 + pnl - self.fee)
+            last_time = frame.index[-1].value
+            self.trades.append(last_time, LONG_EXIT if self.position == 1 else SHORT_EXIT, exit_price, pnl)
+            self.position = 0
+            self.equity.append(last_time, self.balance)
+
+        # --- SAVE LOGS & PLOTS ---
+        with timer("backtest.save_logs"):
+            self.save_logs(df)
+        with timer("backtest.plots"):
+            self.plot_equity()
+            self.plot_trades(df if checkpoint is None else frame)
+        with timer("backtest.summary"):
+            self.print_summary()
+
+    def _replay(self, df):
+        """Apply the trading rules candle by candle from the current position/balance."""
+        n = len(df)
+        closes = df["close"].to_numpy()
+        signals = df["signal"].to_numpy()
+        times = df.index.asi8
+        # Preallocate: at most an exit and an entry per candle, one equity point per candle
+        trades = self.trades.reserve(2 * n)
+        t_time, t_type, t_price, t_pnl = trades["time"], trades["type"], trades["price"], trades["pnl"]
+        k = self.trades.size
+        equity = self.equity.reserve(n)
+        e_time, e_equity = equity["time"], equity["equity"]
+        j = self.equity.size
+        for i in range(n):
+            price = closes[i]
+            signal = signals[i]
+            timestamp = times[i]
 
             # --- LONG SIGNAL ---
             if signal == 1:
                 if self.position == 0:
                     # Open long
-                    self.entry_price = price * (1 + SLIPPAGE)
+                    self.entry_price = price * (1 + self.slippage)
                     self.position = 1
-                    self.trades.append({"type": "LONG_ENTRY", "price": self.entry_price, "time": timestamp})
+                    t_time[k], t_type[k], t_price[k], t_pnl[k] = timestamp, LONG_ENTRY, self.entry_price, np.nan
+                    k += 1
                 elif self.position == -1:
                     # Close short, open long
-                    exit_price = price * (1 - SLIPPAGE)
+                    exit_price = price * (1 - self.slippage)
                     pnl = (self.entry_price - exit_price) / self.entry_price
-                    self.balance *= (1 + pnl - TRADING_FEE)
-                    self.trades.append({"type": "SHORT_EXIT", "price": exit_price, "time": timestamp, "pnl": pnl})
-                    self.entry_price = price * (1 + SLIPPAGE)
+                    self.balance *= (1 + pnl - self.fee)
+                    t_time[k], t_type[k], t_price[k], t_pnl[k] = timestamp, SHORT_EXIT, exit_price, pnl
+                    self.entry_price = price * (1 + self.slippage)
                     self.position = 1
-                    self.trades.append({"type": "LONG_ENTRY", "price": self.entry_price, "time": timestamp})
+                    t_time[k + 1], t_type[k + 1], t_price[k + 1], t_pnl[k + 1] = (
+                        timestamp, LONG_ENTRY, self.entry_price, np.nan)
+                    k += 2
 
             # --- SHORT SIGNAL ---
             elif signal == -1:
                 if self.position == 0:
                     # Open short
-                    self.entry_price = price * (1 - SLIPPAGE)
+                    self.entry_price = price * (1 - self.slippage)
                     self.position = -1
-                    self.trades.append({"type": "SHORT_ENTRY", "price": self.entry_price, "time": timestamp})
+                    t_time[k], t_type[k], t_price[k], t_pnl[k] = timestamp, SHORT_ENTRY, self.entry_price, np.nan
+                    k += 1
                 elif self.position == 1:
                     # Close long, open short
-                    exit_price = price * (1 - SLIPPAGE)
+                    exit_price = price * (1 - self.slippage)
                     pnl = (exit_price - self.entry_price) / self.entry_price
-                    self.balance *= (1 + pnl - TRADING_FEE)
-                    self.trades.append({"type": "LONG_EXIT", "price": exit_price, "time": timestamp, "pnl": pnl})
-                    self.entry_price = price * (1 - SLIPPAGE)
+                    self.balance *= (1 + pnl - self.fee)
+                    t_time[k], t_type[k], t_price[k], t_pnl[k] = timestamp, LONG_EXIT, exit_price, pnl
+                    self.entry_price = price * (1 - self.slippage)
                     self.position = -1
-                    self.trades.append({"type": "SHORT_ENTRY", "price": self.entry_price, "time": timestamp})
+                    t_time[k + 1], t_type[k + 1], t_price[k + 1], t_pnl[k + 1] = (
+                        timestamp, SHORT_ENTRY, self.entry_price, np.nan)
+                    k += 2
 
             # --- EQUITY TRACKING ---
             equity = self.balance
@@ -105,60 +302,30 @@ class Backtester:
                 equity += self.balance * 0 + (price - self.entry_price) / self.entry_price * self.balance
             elif self.position == -1:
                 equity += self.balance * 0 + (self.entry_price - price) / self.entry_price * self.balance
-            self.equity_curve.append(equity)
-            self.timestamps.append(timestamp)
-
-        # --- CLOSE FINAL POSITION ---
-        if self.position != 0:
-            price = df.iloc[-1]['close']
-            exit_price = price * (1 - SLIPPAGE) if self.position == 1 else price * (1 + SLIPPAGE)
-            pnl = ((exit_price - self.entry_price) / self.entry_price) if self.position == 1 else ((self.entry_price - exit_price)/self.entry_price)
-            self.balance *= (1 + pnl - TRADING_FEE)
-            self.trades.append({
-                "type": "LONG_EXIT" if self.position == 1 else "SHORT_EXIT",
-                "price": exit_price,
-                "time": df.index[-1],
-                "pnl": pnl
-            })
-            self.position = 0
-            self.equity_curve.append(self.balance)
-            self.timestamps.append(df.index[-1])
-
-        # --- SAVE LOGS & PLOTS ---
-        self.save_logs(df)
-        self.plot_equity()
-        self.plot_trades(df)
-        self.print_summary()
+            e_time[j], e_equity[j] = timestamp, equity
+            j += 1
+        self.trades.size = k
+        self.equity.size = j
 
     # --- STATS CALCULATION ---
-    def calculate_stats(self):
-        if not self.trades:
-            return {
-                "Final Balance": self.balance,
-                "Total Return (%)": 0,
-                "Win Rate (%)": 0,
-                "Sharpe Ratio": 0,
-                "Max Drawdown (%)": 0
-            }
-
-        df_trades = pd.DataFrame(self.trades)
-        wins = df_trades[df_trades.get("pnl", 0) > 0].shape[0]
-        losses = df_trades[df_trades.get("pnl", 0) <= 0].shape[0]
-        win_rate = (wins / (wins + losses) * 100) if wins + losses > 0 else 0
-
-        equity = pd.Series(self.equity_curve, index=self.timestamps)
-        returns = equity.pct_change().dropna()
-        sharpe = np.sqrt(252) * returns.mean() / returns.std() if returns.std() != 0 else 0
-        drawdown = (equity / equity.cummax() - 1).min() * 100
-        total_return = ((equity.iloc[-1] - INITIAL_BALANCE) / INITIAL_BALANCE) * 100
-
-        return {
-            "Final Balance": equity.iloc[-1],
-            "Total Return (%)": total_return,
-            "Win Rate (%)": win_rate,
-            "Sharpe Ratio": sharpe,
-            "Max Drawdown (%)": drawdown
-        }
+    def calculate_stats(self, metrics=None):
+        """Performance metrics (default: all of stats.METRICS), annualized for this interval."""
+        if metrics is None or "Exposure (%)" in metrics:
+            position = self._positions()
+        else:
+            position = None
+        return equity_stats(self.equity_curve, self.trades.array["pnl"], position,
+                            initial_balance=INITIAL_BALANCE, interval=self.interval, metrics=metrics)
+
+    def _positions(self) -> np.ndarray:
+        """Position held after each candle, rebuilt from the trade events."""
+        equity, trades = self.equity.array, self.trades.array
+        # The force-close adds a second point (and an exit) on the last candle
+        if len(equity) > 1 and equity["time"][-1] == equity["time"][-2]:
+            equity, trades = equity[:-1], trades[:-1]
+        side = np.select([trades["type"] == LONG_ENTRY, trades["type"] == SHORT_ENTRY], [1, -1], 0)
+        last = np.searchsorted(trades["time"], equity["time"], side="right") - 1
+        return np.where(last >= 0, side[np.maximum(last, 0)] if len(side) else 0, 0)
 
     # --- LOGS & PLOTS ---
     def save_logs(self, df):
@@ -168,8 +335,7 @@ class Backtester:
         })
         equity_df.to_csv(f"{self.logs_dir}/equity.csv", index=False)
 
-        if self.trades:
-            trades_df = pd.DataFrame(self.trades)
+        if len(self.trades):
             # Deprecated: backtest_trades.csv (remove if exists)
             legacy_path = f"{self.logs_dir}/backtest_trades.csv"
             try:
@@ -187,57 +353,52 @@ class Backtester:
         """Build one-line-per-trade rows from entry/exit events.
         Columns: time (entry time), symbol, side (Long/Short), entry, exit, pnl, strategy
         """
-        if not self.trades:
+        if not len(self.trades):
+            return pd.DataFrame()
+        trades = self.trades.array
+        trades = trades[np.argsort(trades["time"], kind="stable")]
+        types = trades["type"]
+        exits = np.flatnonzero((types == LONG_EXIT) | (types == SHORT_EXIT))
+        if len(exits) == 0:
             return pd.DataFrame()
-        rows = sorted(self.trades, key=lambda r: r.get("time"))
-        result = []
-        open_long = None
-        open_short = None
-        for r in rows:
-            typ = str(r.get("type", "")).upper()
-            price = r.get("price")
-            ts = r.get("time")
-            if "LONG_ENTRY" in typ:
-                open_long = {"time": ts, "entry": price}
-            elif "LONG_EXIT" in typ:
-                exit_price = price
-                entry = open_long["entry"] if open_long else r.get("entry", None)
-                entry_time = open_long["time"] if open_long else ts
-                pnl = r.get("pnl")
-                if pnl is None and entry not in (None, 0) and exit_price is not None:
-                    pnl = (exit_price - entry) / entry
-                result.append({
-                    "time": str(entry_time),
-                    "symbol": self.symbol,
-                    "side": "Long",
-                    "entry": entry,
-                    "exit": exit_price,
-                    "pnl": pnl,
-                    "strategy": self.strategy_class.__name__,
-                })
-                open_long = None
-            elif "SHORT_ENTRY" in typ:
-                open_short = {"time": ts, "entry": price}
-            elif "SHORT_EXIT" in typ:
-                exit_price = price
-                entry = open_short["entry"] if open_short else r.get("entry", None)
-                entry_time = open_short["time"] if open_short else ts
-                pnl = r.get("pnl")
-                if pnl is None and entry not in (None, 0) and exit_price is not None:
-                    pnl = (entry - exit_price) / entry
-                result.append({
-                    "time": str(entry_time),
-                    "symbol": self.symbol,
-                    "side": "Short",
-                    "entry": entry,
-                    "exit": exit_price,
-                    "pnl": pnl,
-                    "strategy": self.strategy_class.__name__,
-                })
-                open_short = None
-        return pd.DataFrame(result)
+
+        # Each exit closes the latest entry of its side opened after that side's previous exit
+        entry_pos = np.full(len(exits), -1)
+        for entry_code, exit_code in ((LONG_ENTRY, LONG_EXIT), (SHORT_ENTRY, SHORT_EXIT)):
+            side = types[exits] == exit_code
+            side_exits = exits[side]
+            entries = np.flatnonzero(types == entry_code)
+            k = np.searchsorted(entries, side_exits) - 1
+            found = np.where(k >= 0, entries[np.maximum(k, 0)] if len(entries) else -1, -1)
+            prev_exit = np.r_[-1, side_exits[:-1]]
+            entry_pos[side] = np.where(found > prev_exit, found, -1)
+
+        has_entry = entry_pos >= 0
+        long = types[exits] == LONG_EXIT
+        exit_price = trades["price"][exits]
+        entry = np.where(has_entry, trades["price"][np.maximum(entry_pos, 0)], np.nan)
+        entry_time = np.where(has_entry, trades["time"][np.maximum(entry_pos, 0)], trades["time"][exits])
+        pnl = trades["pnl"][exits]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            derived = np.where(long, exit_price - entry, entry - exit_price) / entry
+        pnl = np.where(np.isnan(pnl), derived, pnl)
+        return pd.DataFrame({
+            "time": [str(t) for t in pd.to_datetime(entry_time)],
+            "symbol": self.symbol,
+            "side": np.where(long, "Long", "Short"),
+            "entry": entry,
+            "exit": exit_price,
+            "pnl": pnl,
+            "strategy": self.strategy_class.__name__,
+        })
+
+    def robustness(self, **kwargs) -> dict:
+        """Monte Carlo distributions over this run's consolidated trades (see robustness.monte_carlo)."""
+        from robustness import monte_carlo
+        return monte_carlo(self._consolidate_trades(), fee=self.fee, initial_balance=INITIAL_BALANCE, **kwargs)
 
     def plot_equity(self):
+        plt = _pyplot()
         plt.figure(figsize=(12, 6))
         plt.plot(self.timestamps, self.equity_curve, label="Equity Curve", linewidth=2)
         plt.title(f"Equity Curve - {self.symbol} ({self.strategy_class.__name__})")
@@ -249,38 +410,39 @@ class Backtester:
         plt.tight_layout()
         plt.savefig(f"{self.logs_dir}/equity_plot.png")
         plt.show()
+        plt.close()
 
     def plot_trades(self, df):
+        plt = _pyplot()
+        import mplfinance as mpf
         df_plot = df[['open','high','low','close','volume']].copy()
         df_plot.index = pd.to_datetime(df_plot.index)
-
-        buy_signals = [t for t in self.trades if 'LONG_ENTRY' in t['type']]
-        sell_signals = [t for t in self.trades if 'LONG_EXIT' in t['type']]
-
-        short_buy_signals = [t for t in self.trades if 'SHORT_ENTRY' in t['type']]
-        short_sell_signals = [t for t in self.trades if 'SHORT_EXIT' in t['type']]
-
+        trades = self.trades.array
         ap = []
 
-        def add_scatter(signals, marker, color):
-            series = pd.Series(index=df_plot.index, data=np.nan)
-            for t in signals:
-                if t['time'] in series.index:
-                    series[t['time']] = t['price']
-            return mpf.make_addplot(series, type='scatter', markersize=50, marker=marker, color=color)
-
-        if buy_signals:
-            ap.append(add_scatter(buy_signals, '^', 'green'))
-        if sell_signals:
-            ap.append(add_scatter(sell_signals, 'v', 'red'))
-        if short_buy_signals:
-            ap.append(add_scatter(short_buy_signals, 'v', 'orange'))
-        if short_sell_signals:
-            ap.append(add_scatter(short_sell_signals, '^', 'purple'))
+        def add_scatter(code, marker, color):
+            events = trades[trades["type"] == code]
+            # An extended run plots only the new candles; earlier events fall outside them
+            pos = df_plot.index.get_indexer(pd.to_datetime(events["time"]))
+            inside = pos >= 0
+            if not inside.any():
+                return
+            series = np.full(len(df_plot), np.nan)
+            series[pos[inside]] = events["price"][inside]
+            if not np.isfinite(series).any():
+                return
+            ap.append(mpf.make_addplot(pd.Series(series, index=df_plot.index), type='scatter',
+                                       markersize=50, marker=marker, color=color))
+
+        add_scatter(LONG_ENTRY, '^', 'green')
+        add_scatter(LONG_EXIT, 'v', 'red')
+        add_scatter(SHORT_ENTRY, 'v', 'orange')
+        add_scatter(SHORT_EXIT, '^', 'purple')
 
         mpf.plot(df_plot, type='candle', style='charles', addplot=ap,
                  title=f"{self.symbol} Trades", volume=True,
                  savefig=f"{self.logs_dir}/trades_plot.png")
+        plt.close("all")
 
     def print_summary(self):
         stats = self.calculate_stats()
@@ -304,10 +466,13 @@ def main():
     parser.add_argument("--strategy", type=str, required=True)
     parser.add_argument("--start", type=str, required=True)
     parser.add_argument("--end", type=str, required=True)
+    parser.add_argument("--fee", type=float, default=TRADING_FEE)
+    parser.add_argument("--slippage", type=float, default=SLIPPAGE)
     args = parser.parse_args()
 
     strategy_class = load_strategy_class(args.strategy)
-    backtester = Backtester(args.symbol, args.interval, strategy_class, args.start, args.end)
+    backtester = Backtester(args.symbol, args.interval, strategy_class, args.start, args.end,
+                            fee=args.fee, slippage=args.slippage)
     backtester.run()
 
 if __name__ == "__main__":
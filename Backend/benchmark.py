@@ -0,0 +1,403 @@
+# benchmark.py
+"""Timings of the backtest, strategy and API hot paths on synthetic candles.
+
+Every benchmark runs on seeded synthetic OHLCV (synthetic_data, also served
+to the Backtester through DATA_PROVIDER=synthetic) of each requested size
+(same model and seed = same candles, so runs are comparable) and is repeated until `--repeat`
+runs or the `--budget` seconds are used up. One JSON line per benchmark and
+size is appended to BENCHMARK_HISTORY with the git commit and library
+versions; each result is compared with the previous one of the same name and
+size, and `--check` exits non-zero when one got slower by more than
+`--threshold`.
+
+Benchmarks run in a temporary directory (logs, plots and a scratch SQLite
+database) with the signal cache and backtest checkpoints disabled, so every
+run does the full work.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import datetime as dt
+import fnmatch
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+# Cached signals/checkpoints would turn repeated runs into lookups
+os.environ["SIGNAL_CACHE_ENABLED"] = "0"
+os.environ["BACKTEST_CHECKPOINT_ENABLED"] = "0"
+# Backtests fetch the same seeded candles the other benchmarks use, offline
+os.environ["DATA_PROVIDER"] = "synthetic"
+# API handlers run their jobs inline, so results stay comparable with earlier history
+os.environ.setdefault("JOB_WORKERS", "0")
+
+HISTORY_PATH = os.path.abspath(os.getenv("BENCHMARK_HISTORY", os.path.join("logs", "benchmarks", "history.jsonl")))
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+INTERVAL = "1m"
+SYMBOL = "BENCHUSDT"
+# Slowdowns smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR_S = 0.002
+BENCH_STRATEGY = "SMA_CROSS"  # signals used by the backtest/DB/API benchmarks (trades often)
+
+
+# --- DATA ---
+_frames: dict = {}
+
+
+def candles(n: int) -> pd.DataFrame:
+    """Shared synthetic frame of `n` candles (callers copy before mutating)."""
+    if n not in _frames:
+        from synthetic_data import synthetic_ohlcv
+        _frames[n] = synthetic_ohlcv(n, symbol=SYMBOL, interval=INTERVAL)
+    return _frames[n]
+
+
+def with_signals(n: int) -> pd.DataFrame:
+    key = ("signals", n)
+    if key not in _frames:
+        from strategy_loader import load_strategy_class
+        df = candles(n).copy()
+        df["signal"] = load_strategy_class(BENCH_STRATEGY)(df).signals()
+        _frames[key] = df
+    return _frames[key]
+
+
+# --- REGISTRY ---
+# name -> (setup(n) returning the callable to time, max bars or None, sized)
+BENCHMARKS: dict = {}
+
+
+def benchmark(name, max_bars: int | None = None, sized: bool = True):
+    """Register `setup(n)`; it prepares inputs (untimed) and returns the function to time.
+    `max_bars` skips larger sizes; unsized benchmarks run once per invocation."""
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, max_bars, sized)
+        return setup
+    return decorator
+
+
+def _strategy_benchmark(name):
+    def setup(n):
+        from strategy_loader import load_strategy_class
+        cls = load_strategy_class(name)
+        df = candles(n)
+
+        def run():
+            strategy = cls(df.copy())
+            if hasattr(strategy, "signals"):
+                return strategy.signals()
+            return strategy.generate_signals()
+        return run
+    return setup
+
+
+def register_strategies():
+    from strategy_loader import list_strategy_names
+    for name in list_strategy_names():
+        benchmark(f"strategy.{name}")(_strategy_benchmark(name))
+
+
+def _backtester():
+    from backtester import Backtester
+    from strategy_loader import load_strategy_class
+    return Backtester(SYMBOL, INTERVAL, load_strategy_class(BENCH_STRATEGY), None, None,
+                      keep_indicators=False)
+
+
+def _replayed(n):
+    backtester = _backtester()
+    backtester._replay(with_signals(n))
+    return backtester
+
+
+@benchmark("backtest.replay")
+def bench_replay(n):
+    df = with_signals(n)
+    return lambda: _backtester()._replay(df)
+
+
+@benchmark("backtest.stats")
+def bench_stats(n):
+    return _replayed(n).calculate_stats
+
+
+@benchmark("backtest.consolidate")
+def bench_consolidate(n):
+    return _replayed(n)._consolidate_trades
+
+
+@benchmark("evaluator.simulate")
+def bench_simulate(n):
+    from evaluator import simulate
+    df = with_signals(n)
+    close = df["close"].to_numpy(dtype=np.float64)
+    signals = df["signal"].to_numpy(dtype=np.int8)[:, None]
+    return lambda: simulate(close, signals)
+
+
+# --- STARTUP ---
+# Import time of the API (what a gunicorn worker pays without --preload) and of
+# the CLIs, each in a fresh interpreter; startup.python is the interpreter alone
+STARTUP_MODULES = ("api", "backtester", "streaming_backtester", "portfolio_backtester", "walk_forward",
+                   "strategy_optimizer", "robustness", "synthetic_data")
+
+
+def _startup_benchmark(module):
+    def setup(n):
+        here = os.path.dirname(os.path.abspath(__file__))
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in (here, os.getenv("PYTHONPATH")) if p)}
+        cmd = [sys.executable, "-c", f"import {module}" if module else "pass"]
+        return lambda: subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL)
+    return setup
+
+
+benchmark("startup.python", sized=False)(_startup_benchmark(None))
+for _module in STARTUP_MODULES:
+    benchmark(f"startup.{_module}", sized=False)(_startup_benchmark(_module))
+
+
+# --- DB & API ---
+_api = None
+
+
+def api_client():
+    """(api module, test client, auth headers) on a scratch SQLite database in the working dir."""
+    global _api
+    if _api is None:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.abspath("benchmark.db")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        import api
+        api.init_db()
+        with api.app.app_context():
+            headers = {"Authorization": f"Bearer {api.create_jwt(1)}"}
+        _api = (api, api.app.test_client(), headers)
+    return _api
+
+
+def _request_range(n):
+    """Backtest range covering the `n` synthetic candles (DATA_PROVIDER serves them)."""
+    df = candles(n)
+    return {"from": str(df.index[0]), "to": str(df.index[-1])}
+
+
+def _equity_points(n):
+    backtester = _replayed(n)
+    return [{"t": str(t), "v": float(v)} for t, v in zip(backtester.timestamps, backtester.equity_curve)]
+
+
+def _ingest(api, fn, *args):
+    # The /api/backtest ingestion helpers themselves, in an app context
+    with api.app.app_context():
+        return fn(BENCH_STRATEGY, *args)
+
+
+@benchmark("db.ingest_equity", max_bars=100_000)
+def bench_ingest_equity(n):
+    api, _, _ = api_client()
+    points = _equity_points(n)
+    return lambda: _ingest(api, api._ingest_equity, points)
+
+
+@benchmark("db.ingest_trades", max_bars=100_000)
+def bench_ingest_trades(n):
+    api, _, _ = api_client()
+    rows = _replayed(n).trade_events()
+    return lambda: _ingest(api, api._ingest_trades, SYMBOL, rows)
+
+
+# Everything /api/backtest stores: equity, trades, PnL summary and rollups
+@benchmark("db.ingest_backtest", max_bars=100_000)
+def bench_ingest_backtest(n):
+    api, _, _ = api_client()
+    points, rows = _equity_points(n), _replayed(n).trade_events()
+    return lambda: _ingest(api, api._ingest_backtest, SYMBOL, points, rows)
+
+
+@benchmark("api.health", sized=False)
+def bench_api_health(n):
+    _, client, _ = api_client()
+    return lambda: client.get("/api/health")
+
+
+@benchmark("api.paper_balance", sized=False)
+def bench_api_paper_balance(n):
+    _, client, headers = api_client()
+    return lambda: client.get("/api/paper/balance", headers=headers)
+
+
+@benchmark("api.strategies", sized=False)
+def bench_api_strategies(n):
+    _, client, headers = api_client()
+    return lambda: client.get("/api/strategies", headers=headers)
+
+
+# Includes the equity/trade plots and the DB ingestion the endpoint does
+@benchmark("api.backtest", max_bars=10_000)
+def bench_api_backtest(n):
+    _, client, headers = api_client()
+    body = {"symbol": SYMBOL, "interval": INTERVAL, "strategy": BENCH_STRATEGY, "range": _request_range(n)}
+
+    def run():
+        response = client.post("/api/backtest", headers=headers, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/backtest returned {response.status_code}: {response.get_json()}")
+    return run
+
+
+def _read_endpoint(path):
+    def setup(n):
+        api, client, headers = api_client()
+        _ingest(api, api._ingest_backtest, SYMBOL, _equity_points(n), _replayed(n).trade_events())
+
+        def run():
+            api._cache.clear()  # measure the database path, not the response cache
+            return client.get(f"{path}?strategy={BENCH_STRATEGY}", headers=headers)
+        return run
+    return setup
+
+
+for _path in ("/api/equity", "/api/pnl", "/api/trades"):
+    benchmark("api." + _path.rsplit("/", 1)[-1], max_bars=100_000)(_read_endpoint(_path))
+
+
+# --- RUNNER ---
+def measure(run, repeat: int, budget: float) -> list:
+    """Wall times of up to `repeat` calls, stopping once `budget` seconds are spent (at least one call)."""
+    times = []
+    while len(times) < repeat and (not times or sum(times) < budget):
+        t = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    from synthetic_data import cache_tag
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "machine": f"{platform.system()}-{platform.machine()}", "data": cache_tag()}
+
+
+def load_history(path: str = HISTORY_PATH) -> list:
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return []
+
+
+def append_history(records, path: str = HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def previous_results(history) -> dict:
+    """Latest history record per (name, bars, synthetic data)."""
+    return {(r["name"], r["bars"], r.get("data")): r for r in history}
+
+
+def selected(names, only=None, skip=None) -> list:
+    """Benchmark names matching any `only` pattern and no `skip` pattern (fnmatch globs)."""
+    return [name for name in names
+            if (not only or any(fnmatch.fnmatch(name, p) for p in only))
+            and not any(fnmatch.fnmatch(name, p) for p in skip or ())]
+
+
+def run_benchmarks(names, sizes, repeat=5, budget=5.0, history=None, threshold=0.2) -> tuple[list, list]:
+    """(records, regressions) for `names` at each size; a regression is a min time more
+    than `threshold` (and NOISE_FLOOR_S) above the previous record's."""
+    previous = previous_results(history or [])
+    env = environment()
+    stamp = dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds")
+    records, regressions = [], []
+    for name in names:
+        setup, max_bars, sized = BENCHMARKS[name]
+        for n in (sizes if sized else sizes[:1]):
+            if max_bars is not None and n > max_bars:
+                continue
+            bars = n if sized else None
+            try:
+                with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    times = measure(setup(n), repeat, budget)
+            except Exception as e:
+                print(f"❌ {name} [{bars}]: {e}")
+                continue
+            record = dict(env, time=stamp, name=name, bars=bars, runs=len(times),
+                          median_s=statistics.median(times), min_s=min(times))
+            records.append(record)
+            line = f"{name:<32} {str(bars or '-'):>9} {record['median_s']:>10.4f}s {record['min_s']:>10.4f}s"
+            before = previous.get((name, bars, env["data"]))
+            if before:
+                change = record["min_s"] / before["min_s"] - 1 if before["min_s"] else 0.0
+                line += f" {change:+8.1%} vs {before.get('commit') or '?'}"
+                if change > threshold and record["min_s"] - before["min_s"] > NOISE_FLOOR_S:
+                    regressions.append((record, before))
+                    line += " ⚠️"
+            print(line, flush=True)
+    return records, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the backtest, strategy and API hot paths")
+    parser.add_argument("--sizes", type=str, default=",".join(str(n) for n in DEFAULT_SIZES),
+                        help="Comma-separated candle counts")
+    parser.add_argument("--only", type=str, default=None, help="Comma-separated name globs, e.g. 'strategy.*'")
+    parser.add_argument("--skip", type=str, default=None, help="Comma-separated name globs to leave out")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark and size")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds after which no more runs start")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown vs the previous run flagged")
+    parser.add_argument("--history", type=str, default=HISTORY_PATH)
+    parser.add_argument("--no-save", action="store_true", help="Don't append results to the history")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    args = parser.parse_args()
+
+    register_strategies()
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+    names = selected(BENCHMARKS, args.only and args.only.split(","), args.skip and args.skip.split(","))
+    sizes = [int(s) for s in args.sizes.split(",")]
+    history_path = os.path.abspath(args.history)
+    history = load_history(history_path)
+
+    from synthetic_data import cache_tag
+    print(f"⏱️ {len(names)} benchmarks at {sizes} candles ({cache_tag()})\n")
+    print(f"{'benchmark':<32} {'bars':>9} {'median':>11} {'min':>11}")
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            records, regressions = run_benchmarks(names, sizes, args.repeat, args.budget, history, args.threshold)
+        finally:
+            os.chdir(cwd)
+
+    if records and not args.no_save:
+        append_history(records, history_path)
+        print(f"\n💾 {len(records)} results appended to {history_path}")
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} benchmarks slower than the previous run by more than {args.threshold:.0%}:")
+        for record, before in regressions:
+            print(f"  {record['name']} [{record['bars']}]: {before['min_s']:.4f}s -> {record['min_s']:.4f}s")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,121 @@
+import os
+import numpy as np
 import pandas as pd
 import requests
 import time
 
-def get_historical_klines_df(symbol, interval="15m", start=None, end=None):
-    """
-    Fetch historical klines between start and end dates (inclusive).
-    Returns DataFrame with open, high, low, close, volume
-    """
-    url = "https://api.binance.com/api/v3/klines"
-    limit = 1000
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+MAX_KLINES_PER_REQUEST = 1000
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+# "binance", or "synthetic" for seeded offline candles (see synthetic_data)
+DATA_PROVIDER = os.getenv("DATA_PROVIDER", "binance").lower()
+
+# Binance kline intervals in milliseconds ("1M" is approximated as 30 days)
+INTERVAL_MS = {
+    "1s": 1_000,
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000,
+    "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000, "1M": 2_592_000_000,
+}
+
+
+def interval_to_timedelta(interval):
+    """Length of one candle of `interval` as a pandas Timedelta."""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported interval '{interval}'")
+    return pd.Timedelta(milliseconds=INTERVAL_MS[interval])
+
+def _synthetic():
+    """The synthetic_data module when DATA_PROVIDER selects it, None for Binance."""
+    if DATA_PROVIDER == "binance":
+        return None
+    if DATA_PROVIDER == "synthetic":
+        import synthetic_data
+        return synthetic_data
+    raise ValueError(f"Unknown DATA_PROVIDER '{DATA_PROVIDER}', expected 'binance' or 'synthetic'.")
+
+
+def klines_frame(data) -> pd.DataFrame:
+    """OHLCV float frame indexed by open time from raw Binance kline rows."""
+    if not data:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float, index=pd.DatetimeIndex([], name="timestamp"))
+    values = np.array([row[:6] for row in data], dtype=np.float64)
+    index = pd.DatetimeIndex(pd.to_datetime(values[:, 0].astype(np.int64), unit="ms"), name="timestamp")
+    return pd.DataFrame(values[:, 1:], index=index, columns=OHLCV_COLUMNS)
+
+
+def iter_klines_pages(symbol, interval="15m", start=None, end=None):
+    """Yield klines between start and end (inclusive) one request at a time, as OHLCV frames."""
+    synthetic = _synthetic()
+    if synthetic is not None:
+        yield from synthetic.iter_synthetic_pages(symbol, interval, start, end)
+        return
     start_ts = int(pd.Timestamp(start).timestamp() * 1000)
     end_ts = int(pd.Timestamp(end).timestamp() * 1000)
-    all_data = []
-
     while True:
         params = {
             "symbol": symbol.upper(),
             "interval": interval,
-            "limit": limit,
+            "limit": MAX_KLINES_PER_REQUEST,
             "startTime": start_ts,
             "endTime": end_ts
         }
-        resp = requests.get(url, params=params)
+        resp = requests.get(KLINES_URL, params=params)
         data = resp.json()
         if not data:
             break
-
-        all_data.extend(data)
+        yield klines_frame(data)
         last_time = data[-1][0]
-        if last_time >= end_ts or len(data) < limit:
+        if last_time >= end_ts or len(data) < MAX_KLINES_PER_REQUEST:
             break
         start_ts = last_time + 1
         time.sleep(0.2)
 
-    df = pd.DataFrame(all_data, columns=[
-        "timestamp","open","high","low","close","volume",
-        "close_time","quote_asset_volume","number_of_trades",
-        "taker_buy_base","taker_buy_quote","ignore"
-    ])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df.set_index("timestamp", inplace=True)
-    df = df[["open","high","low","close","volume"]].astype(float)
-    return df
+
+def get_historical_klines_df(symbol, interval="15m", start=None, end=None):
+    """
+    Fetch historical klines between start and end dates (inclusive).
+    Returns DataFrame with open, high, low, close, volume
+
+    Each page is converted to floats as it arrives, so only numeric blocks
+    (not raw JSON rows) are held until the final concat.
+    """
+    synthetic = _synthetic()
+    if synthetic is not None:
+        return synthetic.synthetic_klines(symbol, interval, start, end)
+    pages = list(iter_klines_pages(symbol, interval, start, end))
+    if not pages:
+        return klines_frame([])
+    return pd.concat(pages) if len(pages) > 1 else pages[0]
 
 def get_klines(symbol, interval="1m", limit=100):
-    """Helper for live/multi-coin trading"""
-    url = "https://api.binance.com/api/v3/klines"
-    params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
-    resp = requests.get(url, params=params)
-    data = resp.json()
+    """Helper for live/multi-coin trading.
+
+    Returns the latest `limit` candles, paging backwards when the strategy
+    warm-up needs more than one request's worth.
+    """
+    synthetic = _synthetic()
+    if synthetic is not None:
+        return synthetic.latest_synthetic_klines(symbol, interval, limit)
+    data = []
+    end_time = None
+    while len(data) < limit:
+        params = {
+            "symbol": symbol.upper(),
+            "interval": interval,
+            "limit": min(limit - len(data), MAX_KLINES_PER_REQUEST),
+        }
+        if end_time is not None:
+            params["endTime"] = end_time
+        resp = requests.get(KLINES_URL, params=params)
+        page = resp.json()
+        if not page:
+            break
+        data = page + data
+        if len(page) < params["limit"]:
+            break
+        end_time = page[0][0] - 1
     if not data:
         return pd.DataFrame()
-    df = pd.DataFrame(data, columns=[
-        "timestamp","open","high","low","close","volume",
-        "close_time","quote_asset_volume","number_of_trades",
-        "taker_buy_base","taker_buy_quote","ignore"
-    ])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df.set_index("timestamp", inplace=True)
-    df = df[["open","high","low","close","volume"]].astype(float)
-    return df
+    return klines_frame(data)
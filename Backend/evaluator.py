@@ -0,0 +1,189 @@
+# evaluator.py
+"""Score many (strategy, params) combinations over one block of candles.
+
+Indicators are computed once through a shared `Indicators` cache, every
+combination contributes one int8 signal column, and a vectorized kernel
+replays the Backtester's long/short rules for all columns at once. Results
+match `Backtester.calculate_stats()` for the same candles, fee and slippage.
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from strategy.indicators import Indicators
+from binance_data import get_historical_klines_df, interval_to_timedelta
+from stats import compute_stats, infer_interval, BASE_METRICS
+from instrumentation import timer, count
+
+# Trading defaults of every engine (backtester, streaming, portfolio, robustness,
+# paper supervisor): defined here, imported there
+INITIAL_BALANCE = 1000
+TRADING_FEE = 0.001  # 0.1%
+SLIPPAGE = 0.0005    # 0.05%
+# Columns simulated together; bounds the (T x batch) float64 work arrays
+BATCH_SIZE = 64
+
+
+def instantiate(strategy_class, df, params):
+    # Same fallback as Backtester.apply_strategy for strategies without params
+    try:
+        return strategy_class(df, **(params or {}))
+    except TypeError:
+        return strategy_class(df)
+
+
+def build_signals(df, specs, indicators: Indicators | None = None) -> np.ndarray:
+    """(T x K) int8 signal matrix for `specs` = [(strategy_class, params), ...]."""
+    ind = indicators if indicators is not None else Indicators(df)
+    signals = np.zeros((len(df), len(specs)), dtype=np.int8)
+    for k, (strategy_class, params) in enumerate(specs):
+        with timer(f"strategy.{strategy_class.__name__}"):
+            strategy = instantiate(strategy_class, df, params)
+            if hasattr(strategy, "signals"):
+                signals[:, k] = strategy.signals(indicators=ind)
+            else:
+                signals[:, k] = strategy.generate_signals()['signal'].to_numpy()
+    return signals
+
+
+def simulate(close, signals, fee=TRADING_FEE, slippage=SLIPPAGE, initial_balance=INITIAL_BALANCE,
+             state: dict | None = None, close_end=True):
+    """Vectorized replay of Backtester.run for every signal column.
+
+    `close` is one price series shared by all columns (T,) or one per column (T x K).
+    `state` continues a previous call on the candles just before these (its
+    returned "state"); with `close_end=False` an open position is carried
+    instead of force-closed on the last candle.
+
+    Returns a dict of arrays:
+      equity    (T x K) equity after each candle
+      final     (K,)    equity after force-closing the last open position
+      open_end  (K,)    whether a position was force-closed on the last candle
+      exit_pnl  (T x K) trade pnl on candles where a position was closed, else NaN
+      final_pnl (K,)    pnl of the force-closed position (NaN if none)
+      position  (T x K) position held after each candle
+      entry     (T x K) entry price of the position held after each candle
+      state     dict of (K,) position, entry and balance after the last candle
+    """
+    signals = np.asarray(signals)
+    T, K = signals.shape
+    close = np.asarray(close, dtype=np.float64)
+    close = np.broadcast_to(close[:, None] if close.ndim == 1 else close, (T, K))
+    rows = np.arange(T)[:, None]
+    if state is None:
+        position0, entry0, balance0 = np.zeros(K, dtype=np.int8), np.full(K, np.nan), initial_balance
+    else:
+        position0, entry0, balance0 = state["position"], state["entry"], state["balance"]
+
+    # Position = last non-zero signal (a signal in the held direction is a no-op)
+    last = np.where(signals != 0, rows, -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    position = np.where(last >= 0, np.take_along_axis(signals, np.maximum(last, 0), axis=0),
+                        position0).astype(np.int8)
+    prev = np.empty_like(position)
+    prev[0] = position0
+    prev[1:] = position[:-1]
+    changed = position != prev
+
+    # Entry price of the position held on each candle (carried in until the first change)
+    seg_start = np.where(changed, rows, -1)
+    np.maximum.accumulate(seg_start, axis=0, out=seg_start)
+    entry = np.where(seg_start >= 0,
+                     np.take_along_axis(close, np.maximum(seg_start, 0), axis=0) * (1 + slippage * position),
+                     entry0)
+    prev_entry = np.empty_like(entry)
+    prev_entry[0] = entry0
+    prev_entry[1:] = entry[:-1]
+
+    # Closing a position mid-run always fills at close * (1 - slippage)
+    exits = changed & (prev != 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        exit_pnl = np.where(exits, prev * (close * (1 - slippage) - prev_entry) / prev_entry, np.nan)
+        factor = np.where(exits, 1 + exit_pnl - fee, 1.0)
+        balance = balance0 * np.cumprod(factor, axis=0)
+        unrealized = np.where(position != 0, position * (close - entry) / entry, 0.0)
+    equity = balance * (1 + unrealized)
+
+    # Force-close at the end: long sells below, short buys back above the close
+    open_end = (position[-1] != 0) & bool(close_end)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        final_exit = close[-1] * (1 - slippage * position[-1])
+        final_pnl = np.where(open_end, position[-1] * (final_exit - entry[-1]) / entry[-1], np.nan)
+    final = np.where(open_end, balance[-1] * (1 + np.nan_to_num(final_pnl) - fee), equity[-1])
+    return {
+        "equity": equity,
+        "final": final,
+        "open_end": open_end,
+        "exit_pnl": exit_pnl,
+        "final_pnl": final_pnl,
+        "position": position,
+        "entry": entry,
+        "state": {"position": position[-1].copy(), "entry": entry[-1].copy(), "balance": balance[-1].copy()},
+    }
+
+
+def summarize(sim, initial_balance=INITIAL_BALANCE, interval=None, metrics=None) -> list[dict]:
+    """Backtester.calculate_stats() for every simulated column (see stats.compute_stats)."""
+    # Equity curve as the Backtester records it: one point per candle plus
+    # the force-close point when a position was open at the end
+    curve = np.vstack([sim["equity"], np.where(sim["open_end"], sim["final"], np.nan)])
+    pnl = np.vstack([sim["exit_pnl"], sim["final_pnl"]])
+    return compute_stats(curve, pnl, sim["position"], initial_balance=initial_balance, interval=interval,
+                         metrics=metrics)
+
+
+def evaluate_strategies(df, specs, start=None, fee=TRADING_FEE, slippage=SLIPPAGE,
+                        batch_size=BATCH_SIZE, indicators: Indicators | None = None,
+                        interval: str | None = None, metrics=None) -> list[dict]:
+    """Stats for every (strategy_class, params) in `specs` over the same candles.
+
+    `df` should include the warm-up history; candles before `start` feed the
+    indicators but are not traded, exactly like Backtester.run. `interval`
+    (inferred from the index when omitted) sets the annualization; `metrics`
+    limits the stats computed (default: all of stats.METRICS).
+    """
+    if not specs:
+        return []
+    ind = indicators if indicators is not None else Indicators(df)
+    first = 0 if start is None else int(np.searchsorted(df.index.values, np.datetime64(pd.Timestamp(start))))
+    close = df['close'].to_numpy(dtype=np.float64)[first:]
+    if len(close) == 0:
+        raise ValueError("No data in the requested range after strategy warm-up.")
+    interval = interval or infer_interval(df.index)
+    results = []
+    for b in range(0, len(specs), batch_size):
+        batch = specs[b:b + batch_size]
+        with timer("evaluator.signals"):
+            signals = build_signals(df, batch, indicators=ind)[first:]
+        with timer("evaluator.simulate"):
+            sim = simulate(close, signals, fee=fee, slippage=slippage)
+        with timer("evaluator.stats"):
+            results.extend(summarize(sim, interval=interval, metrics=metrics))
+    count("evaluator.evaluations", len(specs))
+    return results
+
+
+def max_warmup(specs) -> int:
+    return max((getattr(cls, "warmup_for", lambda **p: 0)(**(params or {})) for cls, params in specs), default=0)
+
+
+def fetch_candles(symbol, interval, start, end, warmup=0):
+    """Candles for [start, end] plus `warmup` earlier candles for the indicators."""
+    fetch_start = pd.Timestamp(start) - warmup * interval_to_timedelta(interval)
+    with timer("evaluator.fetch"):
+        df = get_historical_klines_df(symbol, interval, fetch_start, end)
+    if df is None or df.empty:
+        raise ValueError(f"No data fetched for {symbol}.")
+    return df
+
+
+def evaluate_symbol(symbol, interval, start, end, specs, fee=TRADING_FEE, slippage=SLIPPAGE,
+                    ledger=None, run_id=None) -> list[dict]:
+    """Fetch one symbol once (with the largest warm-up in `specs`) and score every spec on it.
+
+    With an optimizer_ledger.Ledger, recorded results are reused and new ones recorded.
+    """
+    df = fetch_candles(symbol, interval, start, end, max_warmup(specs))
+    if ledger is not None:
+        return ledger.evaluate(df, specs, symbol, interval, start, fee=fee, slippage=slippage, run_id=run_id)[0]
+    return evaluate_strategies(df, specs, start=start, fee=fee, slippage=slippage, interval=interval,
+                               metrics=BASE_METRICS)
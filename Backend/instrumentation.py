@@ -0,0 +1,185 @@
+# instrumentation.py
+"""Phase timers and counters for backtests, the optimizer and API requests.
+
+    with timer("backtest.simulate"):
+        ...
+    count("signal_cache.hit")
+
+Every measurement is added to process-wide totals (calls, seconds, max and a
+duration histogram) that the metrics endpoint reads with `snapshot()`, and
+to the innermost active `collect()` scope, which is how one API request gets
+its own per-phase breakdown (the optional `timings` response field).
+
+With INSTRUMENTATION_ENABLED=0 `timer` hands out one shared no-op context
+manager and `count` returns at once, so instrumented code pays a function
+call per phase and nothing else.
+"""
+from __future__ import annotations
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "1") not in ("0", "false", "False")
+# Upper bounds (seconds) of the duration histogram kept for every phase
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_lock = threading.Lock()
+_timers: dict[str, list] = {}     # name -> [calls, total seconds, max seconds, bucket counts]
+_counters: dict[str, float] = {}
+_scope = contextvars.ContextVar("instrumentation_scope", default=None)
+_NOOP = nullcontext()
+
+
+class Scope:
+    """Timings and counters recorded while a `collect()` block is active."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, list] = {}   # name -> [calls, seconds]
+        self.counters: dict[str, float] = {}
+
+    def add_time(self, name, seconds, calls=1):
+        phase = self.phases.get(name)
+        if phase is None:
+            self.phases[name] = [calls, seconds]
+        else:
+            phase[0] += calls
+            phase[1] += seconds
+
+    def add_count(self, name, n):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self) -> dict:
+        """{"total": seconds so far, "phases": {name: seconds}, "calls": {name: n} (phases timed
+        more than once), "counters": {...}}."""
+        out = {"total": round(time.perf_counter() - self.started, 6),
+               "phases": {name: round(seconds, 6) for name, (_, seconds) in self.phases.items()}}
+        calls = {name: n for name, (n, _) in self.phases.items() if n > 1}
+        if calls:
+            out["calls"] = calls
+        if self.counters:
+            out["counters"] = dict(self.counters)
+        return out
+
+
+class Timer:
+    __slots__ = ("name", "start", "seconds")
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        record(self.name, self.seconds)
+        return False
+
+
+def timer(name: str):
+    """Context manager timing a block as phase `name`."""
+    return Timer(name) if ENABLED else _NOOP
+
+
+def timed(name: str):
+    """Decorator timing every call as phase `name`."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name: str, seconds: float, calls: int = 1):
+    """Add `calls` measured calls taking `seconds` in total to phase `name` (several calls,
+    e.g. phases reported back by a job process, go into the histogram at their mean)."""
+    mean = seconds / calls if calls > 1 else seconds
+    bucket = bisect.bisect_left(BUCKETS, mean)
+    with _lock:
+        totals = _timers.get(name)
+        if totals is None:
+            totals = _timers[name] = [0, 0.0, 0.0, [0] * (len(BUCKETS) + 1)]
+        totals[0] += calls
+        totals[1] += seconds
+        if mean > totals[2]:
+            totals[2] = mean
+        totals[3][bucket] += calls
+    scope = _scope.get()
+    if scope is not None:
+        scope.add_time(name, seconds, calls)
+
+
+def count(name: str, n: float = 1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+    scope = _scope.get()
+    if scope is not None:
+        scope.add_count(name, n)
+
+
+# --- SCOPES ---
+def start_scope() -> tuple[Scope, contextvars.Token]:
+    """Begin collecting into a new scope (see `collect`); end it with `end_scope(token)`."""
+    scope = Scope()
+    return scope, _scope.set(scope)
+
+
+def end_scope(token: contextvars.Token):
+    """Stop collecting into the scope of `token`; its totals also count for the enclosing scope."""
+    scope = _scope.get()
+    try:
+        _scope.reset(token)
+    except ValueError:
+        # Token from another context (e.g. a request torn down elsewhere); just detach
+        _scope.set(None)
+        return
+    parent = _scope.get()
+    if parent is not None and scope is not None:
+        for name, (calls, seconds) in scope.phases.items():
+            parent.add_time(name, seconds, calls)
+        for name, n in scope.counters.items():
+            parent.add_count(name, n)
+
+
+@contextmanager
+def collect():
+    """Scope whose `as_dict()` holds the phases timed inside the block."""
+    scope, token = start_scope()
+    try:
+        yield scope
+    finally:
+        end_scope(token)
+
+
+def current_scope() -> Scope | None:
+    return _scope.get()
+
+
+# --- AGGREGATES ---
+def snapshot() -> dict:
+    """Process-wide totals: {"timers": {name: {"calls", "seconds", "max", "buckets"}}, "counters": {name: value}};
+    "buckets" counts the calls per BUCKETS interval (non-cumulative, the last one above all bounds)."""
+    with _lock:
+        timers = {name: {"calls": calls, "seconds": seconds, "max": peak, "buckets": list(buckets)}
+                  for name, (calls, seconds, peak, buckets) in _timers.items()}
+        counters = dict(_counters)
+    return {"timers": timers, "counters": counters}
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
@@ -0,0 +1,185 @@
+# jobs.py
+"""Bounded process pool for the CPU-heavy API work (backtests, optimizer,
+walk-forward, Monte Carlo), so it never runs on a request thread.
+
+    with admit():                 # raises Busy when the queue is full
+        result = run(tasks.backtest, ...)
+
+Limits hold for the whole host, not per gunicorn worker: at most JOB_WORKERS
+jobs run at once and at most JOB_QUEUE more wait for one of them. Both are
+slot files under JOB_DIR taken with fcntl locks, which the kernel releases
+when a process dies, so a crashed worker never leaks a slot. A request that
+finds the queue full waits up to JOB_WAIT_SECONDS for a place and then gets
+Busy (the API answers 429).
+
+Jobs run in processes started from a fork server (never forked from a
+threaded web worker); each gunicorn worker keeps up to JOB_WORKERS of them
+and starts them on first use. Phases and counters recorded inside a job are
+sent back with the result and added to the caller's instrumentation, so
+request timings and /api/metrics include them. JOB_WORKERS=0 runs jobs in
+the calling thread (development, tests).
+"""
+from __future__ import annotations
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+import metrics
+from instrumentation import collect, record, count
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits apply per process
+    fcntl = None
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE = int(os.getenv("JOB_QUEUE", "4"))
+JOB_WAIT_SECONDS = float(os.getenv("JOB_WAIT_SECONDS", "0"))
+JOB_DIR = os.getenv("JOB_DIR", os.path.join("logs", "jobs"))
+POLL_SECONDS = 0.05
+
+logger = logging.getLogger("jobs")
+
+
+class Busy(Exception):
+    """No room in the job queue."""
+
+
+class _Slots:
+    """`n` host-wide slots: lock files JOB_DIR/<name>.<i>.lock (a semaphore without fcntl)."""
+
+    def __init__(self, name, n):
+        self.paths = [os.path.join(JOB_DIR, f"{name}.{i}.lock") for i in range(n)]
+        self.local = threading.BoundedSemaphore(n) if fcntl is None else None
+
+    def try_acquire(self):
+        """Handle of a free slot, or None."""
+        if self.local is not None:
+            return self.local if self.local.acquire(blocking=False) else None
+        os.makedirs(JOB_DIR, exist_ok=True)
+        for path in self.paths:
+            f = open(path, "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except OSError:
+                f.close()
+        return None
+
+    def acquire(self, timeout=None):
+        """Wait up to `timeout` seconds (None: forever) for a slot; None if none came free."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            handle = self.try_acquire()
+            if handle is not None or (deadline is not None and time.monotonic() >= deadline):
+                return handle
+            time.sleep(POLL_SECONDS)
+
+    @staticmethod
+    def release(handle):
+        handle.release() if isinstance(handle, threading.BoundedSemaphore) else handle.close()
+
+
+_admitted = _Slots("admitted", JOB_WORKERS + JOB_QUEUE)
+_running = _Slots("running", max(JOB_WORKERS, 1))
+_pool = None
+_pool_lock = threading.Lock()
+_state_lock = threading.Lock()
+_waiting = 0   # jobs of this process waiting for a running slot
+_active = 0    # jobs of this process running
+
+metrics.register_gauge("job_queue_depth", "Jobs waiting for a pool worker.", lambda: _waiting)
+metrics.register_gauge("jobs_running", "Jobs running in the pool.", lambda: _active)
+
+
+def _add(waiting=0, active=0):
+    global _waiting, _active
+    with _state_lock:
+        _waiting += waiting
+        _active += active
+
+
+# --- ADMISSION ---
+@contextmanager
+def admit(wait: float | None = None):
+    """Hold a place in the host-wide queue for the block; Busy if none frees up within `wait`."""
+    if JOB_WORKERS <= 0:
+        yield
+        return
+    handle = _admitted.acquire(JOB_WAIT_SECONDS if wait is None else wait)
+    if handle is None:
+        count("jobs.rejected")
+        raise Busy(f"{JOB_WORKERS} jobs running and {JOB_QUEUE} queued; try again later.")
+    try:
+        yield
+    finally:
+        _Slots.release(handle)
+
+
+# --- POOL ---
+def _init_worker():
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+
+
+def _call(fn, args, kwargs, cwd):
+    """Run in a pool process: the result plus the phases and counters it recorded."""
+    if os.getcwd() != cwd:
+        os.chdir(cwd)
+    with collect() as scope:
+        result = fn(*args, **kwargs)
+    return result, scope.phases, scope.counters
+
+
+def pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=context, initializer=_init_worker)
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def run(fn, *args, **kwargs):
+    """fn(*args, **kwargs) in the pool once a running slot is free; `fn` and its arguments
+    must be picklable (module-level function, plain data)."""
+    if JOB_WORKERS <= 0:
+        return fn(*args, **kwargs)
+    _add(waiting=1)
+    started = time.perf_counter()
+    try:
+        handle = _running.acquire()
+    finally:
+        _add(waiting=-1)
+    record("jobs.wait", time.perf_counter() - started)
+    _add(active=1)
+    try:
+        result, phases, counters = pool().submit(_call, fn, args, kwargs, os.getcwd()).result()
+    except BrokenProcessPool:
+        # A job process died (e.g. out of memory); start a fresh pool for the next job
+        logger.error("Job pool broke while running %s; restarting it", getattr(fn, "__name__", fn))
+        shutdown()
+        raise
+    finally:
+        _add(active=-1)
+        _Slots.release(handle)
+    for name, (calls, seconds) in phases.items():
+        record(name, seconds, calls)
+    for name, n in counters.items():
+        count(name, n)
+    return result
@@ -0,0 +1,137 @@
+# kline_cache.py
+"""On-disk cache of Binance klines, read back in bounded chunks.
+
+Candles are stored per symbol and interval in monthly partitions
+(KLINE_CACHE_DIR/<SYMBOL>/<interval>/<YYYY-MM>.npz: int64 open times in ms
+plus float64 OHLCV). A month that has fully closed never changes, so it is
+downloaded once; the current month is topped up from its last candle.
+
+`iter_klines` walks the partitions in order and yields DataFrames of at most
+`chunk_size` rows, so a multi-year 1m history never has to be in memory at
+once. `load_klines` concatenates them for callers that want one frame.
+"""
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from binance_data import iter_klines_pages, interval_to_timedelta, OHLCV_COLUMNS, DATA_PROVIDER
+
+KLINE_CACHE_DIR = os.getenv("KLINE_CACHE_DIR", os.path.join("logs", "cache", "klines"))
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _month_starts(start, end):
+    first = pd.Timestamp(start).to_period("M").to_timestamp()
+    return pd.date_range(first, pd.Timestamp(end), freq="MS")
+
+
+class KlineCache:
+    def __init__(self, root: str = KLINE_CACHE_DIR, fetch_pages=iter_klines_pages):
+        self.root = root
+        # (symbol, interval, start, end) -> iterable of OHLCV frames; swappable for other sources
+        self.fetch_pages = fetch_pages
+
+    def _path(self, symbol, interval, month) -> str:
+        return os.path.join(self.root, symbol.upper(), interval, f"{month:%Y-%m}.npz")
+
+    def _read(self, path):
+        try:
+            with np.load(path) as data:
+                return data["time"], data["ohlcv"], bool(data["complete"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _write(self, path, times, ohlcv, complete):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, time=times, ohlcv=ohlcv, complete=np.array(complete))
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def month(self, symbol, interval, month):
+        """(open times ms, OHLCV) for one calendar month, downloading what is missing."""
+        path = self._path(symbol, interval, month)
+        cached = self._read(path)
+        if cached is not None and cached[2]:
+            return cached[0], cached[1]
+        month_end = month + pd.offsets.MonthBegin(1) - pd.Timedelta(milliseconds=1)
+        step = interval_to_timedelta(interval)
+        if cached is not None and len(cached[0]):
+            times, ohlcv = cached[0], cached[1]
+            fetch_from = pd.Timestamp(int(times[-1]), unit="ms") + step
+        else:
+            times, ohlcv = np.empty(0, dtype=np.int64), np.empty((0, len(OHLCV_COLUMNS)))
+            fetch_from = month
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        if fetch_from <= min(month_end, now):
+            pages = [p for p in self.fetch_pages(symbol, interval, fetch_from, month_end) if not p.empty]
+            if pages:
+                new = pd.concat(pages) if len(pages) > 1 else pages[0]
+                new = new[(new.index >= fetch_from) & (new.index <= month_end)]
+                times = np.r_[times, new.index.asi8 // 1_000_000].astype(np.int64)
+                ohlcv = np.vstack([ohlcv, new[OHLCV_COLUMNS].to_numpy(dtype=np.float64)])
+        # A month is final once its last candle has closed
+        complete = bool(month_end + step <= now)
+        self._write(path, times, ohlcv, complete)
+        return times, ohlcv
+
+    def iter_klines(self, symbol, interval, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield OHLCV frames for [start, end] in order, each at most `chunk_size` rows."""
+        start_ms = pd.Timestamp(start).value // 1_000_000
+        end_ms = pd.Timestamp(end).value // 1_000_000
+        buf_t, buf_v, buffered = [], [], 0
+        for month in _month_starts(start, end):
+            times, ohlcv = self.month(symbol, interval, month)
+            lo, hi = np.searchsorted(times, start_ms), np.searchsorted(times, end_ms, side="right")
+            times, ohlcv = times[lo:hi], ohlcv[lo:hi]
+            while len(times):
+                take = chunk_size - buffered
+                buf_t.append(times[:take])
+                buf_v.append(ohlcv[:take])
+                buffered += len(buf_t[-1])
+                times, ohlcv = times[take:], ohlcv[take:]
+                if buffered == chunk_size:
+                    yield _frame(buf_t, buf_v)
+                    buf_t, buf_v, buffered = [], [], 0
+        if buffered:
+            yield _frame(buf_t, buf_v)
+
+    def load_klines(self, symbol, interval, start, end) -> pd.DataFrame:
+        chunks = list(self.iter_klines(symbol, interval, start, end))
+        if not chunks:
+            return pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float, index=pd.DatetimeIndex([], name="timestamp"))
+        return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def _frame(times, values) -> pd.DataFrame:
+    index = pd.DatetimeIndex(pd.to_datetime(np.concatenate(times), unit="ms"), name="timestamp")
+    return pd.DataFrame(np.concatenate(values), index=index, columns=OHLCV_COLUMNS)
+
+
+_default_cache = None
+
+
+def default_cache() -> KlineCache:
+    global _default_cache
+    if _default_cache is None:
+        root = KLINE_CACHE_DIR
+        if DATA_PROVIDER != "binance":
+            # Synthetic candles never mix with downloaded ones
+            from synthetic_data import cache_tag
+            root = os.path.join(KLINE_CACHE_DIR, cache_tag())
+        _default_cache = KlineCache(root)
+    return _default_cache
+
+
+def iter_klines(symbol, interval, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+    return default_cache().iter_klines(symbol, interval, start, end, chunk_size=chunk_size)
+
+
+def load_klines(symbol, interval, start, end) -> pd.DataFrame:
+    return default_cache().load_klines(symbol, interval, start, end)
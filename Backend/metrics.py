@@ -0,0 +1,336 @@
+# metrics.py
+"""Prometheus text-format metrics that add up across gunicorn workers.
+
+Each process keeps its request counters, latency histograms, in-flight
+gauges and registered gauges in memory and writes them, together with the
+instrumentation totals (phase histograms and counters), to
+METRICS_DIR/<pid>.json at most every METRICS_FLUSH_SECONDS. A scrape merges
+the files of all workers:
+
+  counters, histograms   summed over every process ever seen; files of dead
+                         workers are folded into archive.json so restarts
+                         neither lose nor double-count them
+  gauges                 summed over live processes only
+
+A process is live when its pid exists and, where /proc is available, has
+the start time recorded in its file, so a pid reused by another process
+does not keep a dead worker's file alive.
+
+No external service is needed; the directory only has to be shared by the
+workers (same host).
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import instrumentation
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server, no lock needed
+    fcntl = None
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join("logs", "metrics"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+BUCKETS = instrumentation.BUCKETS
+ARCHIVE = "archive.json"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HELP = {
+    "http_requests_total": ("counter", "API requests by route, method and status."),
+    "http_request_duration_seconds": ("histogram", "API request latency by route and method."),
+    "http_requests_in_flight": ("gauge", "API requests being handled, by route."),
+    "phase_duration_seconds": ("histogram", "Duration of instrumented phases (backtest, optimizer, DB ...)."),
+}
+
+_lock = threading.Lock()
+_counters: dict[tuple, float] = {}   # (name, labels) -> value
+_histograms: dict[tuple, list] = {}  # (name, labels) -> [bucket counts..., sum, count]
+_gauges: dict[tuple, float] = {}
+_gauge_callbacks: dict[str, tuple] = {}  # name -> (help, fn returning a number)
+_last_flush = 0.0
+_pending = None  # timer of a deferred flush
+_flushed_pid = None  # pid of the first flush; a different one means a new (forked) process
+
+
+def _key(name, labels: dict | None) -> tuple:
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name: str, labels: dict | None = None, value: float = 1):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, labels: dict | None = None):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 3)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+def gauge_add(name: str, value: float, labels: dict | None = None):
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + value
+
+
+def register_gauge(name: str, help_text: str, fn):
+    """Gauge read from `fn()` at every flush (e.g. a queue depth), summed over live workers."""
+    _gauge_callbacks[name] = (help_text, fn)
+    HELP[name] = ("gauge", help_text)
+
+
+# --- REQUESTS ---
+def request_started(route: str):
+    gauge_add("http_requests_in_flight", 1, {"route": route})
+
+
+def request_finished(route: str, method: str, status: int, seconds: float):
+    gauge_add("http_requests_in_flight", -1, {"route": route})
+    inc("http_requests_total", {"route": route, "method": method, "status": str(status)})
+    observe("http_request_duration_seconds", seconds, {"route": route, "method": method})
+    maybe_flush()
+
+
+# --- PER-PROCESS FILES ---
+def _state() -> dict:
+    with _lock:
+        counters = [[name, dict(labels), value] for (name, labels), value in _counters.items()]
+        histograms = [[name, dict(labels), list(h)] for (name, labels), h in _histograms.items()]
+        gauges = [[name, dict(labels), value] for (name, labels), value in _gauges.items()]
+    for name, (_, fn) in list(_gauge_callbacks.items()):
+        try:
+            gauges.append([name, {}, float(fn())])
+        except Exception:
+            pass
+    # Instrumentation phases and counters (cumulative per process, like ours)
+    snap = instrumentation.snapshot()
+    for phase, t in snap["timers"].items():
+        histograms.append(["phase_duration_seconds", {"phase": phase}, t["buckets"] + [t["seconds"], t["calls"]]])
+    for name, value in snap["counters"].items():
+        counters.append([_metric_name(name) + "_total", {}, value])
+    return {"pid": os.getpid(), "started": _start_time(os.getpid()), "counters": counters,
+            "histograms": histograms, "gauges": gauges}
+
+
+def _atomic_write(path, data: dict):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def flush(root: str = METRICS_DIR):
+    """Write this process's metrics to root/<pid>.json."""
+    global _last_flush, _flushed_pid
+    _last_flush = time.monotonic()
+    try:
+        os.makedirs(root, exist_ok=True)
+        path = os.path.join(root, f"{os.getpid()}.json")
+        if _flushed_pid != os.getpid():
+            # A file under our pid is from an earlier process that reused it
+            _flushed_pid = os.getpid()
+            if os.path.exists(path):
+                with _locked(root):
+                    _archive(root, [(path, _read(path) or {})])
+        _atomic_write(path, _state())
+    except OSError:
+        pass
+
+
+def maybe_flush(root: str = METRICS_DIR):
+    """Flush now if the last flush is old enough, else once the interval is up (so a worker
+    that goes idle still reports its last requests)."""
+    global _pending
+    wait = METRICS_FLUSH_SECONDS - (time.monotonic() - _last_flush)
+    if wait <= 0:
+        flush(root)
+    elif _pending is None:
+        _pending = threading.Timer(wait, _deferred_flush, args=(root,))
+        _pending.daemon = True
+        _pending.start()
+
+
+def _deferred_flush(root):
+    global _pending
+    _pending = None
+    flush(root)
+
+
+def _start_time(pid: int) -> int | None:
+    """Start time of `pid` in clock ticks since boot (Linux /proc), or None."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        # Fields after the parenthesized command name; starttime is field 22
+        return int(stat[stat.rindex(b")") + 2:].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _alive(pid: int, started: int | None = None) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, owned by someone else
+    if started is None:
+        return True
+    # Same pid but another start time: the worker died and its pid was reused
+    current = _start_time(pid)
+    return current is None or current == started
+
+
+def _read(path) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(into: dict, data: dict, gauges=True):
+    for name, labels, value in data.get("counters", []):
+        key = _key(name, labels)
+        into["counters"][key] = into["counters"].get(key, 0) + value
+    for name, labels, h in data.get("histograms", []):
+        key = _key(name, labels)
+        have = into["histograms"].get(key)
+        into["histograms"][key] = list(h) if have is None else [a + b for a, b in zip(have, h)]
+    if gauges:
+        for name, labels, value in data.get("gauges", []):
+            key = _key(name, labels)
+            into["gauges"][key] = into["gauges"].get(key, 0) + value
+
+
+def _as_lists(merged: dict) -> dict:
+    return {"counters": [[n, dict(l), v] for (n, l), v in merged["counters"].items()],
+            "histograms": [[n, dict(l), h] for (n, l), h in merged["histograms"].items()], "gauges": []}
+
+
+class _locked:
+    """Exclusive lock on root/.lock (no-op without fcntl)."""
+
+    def __init__(self, root):
+        self.path = os.path.join(root, ".lock")
+
+    def __enter__(self):
+        self.f = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()  # releases the lock
+        return False
+
+
+def _archive(root, dead) -> dict:
+    """Fold the (path, data) files of finished processes into the archive (counters and
+    histograms only) and delete them; returns the archive. Call with the lock held."""
+    archive_path = os.path.join(root, ARCHIVE)
+    archive = _read(archive_path) or {}
+    if dead:
+        folded = {"counters": {}, "histograms": {}, "gauges": {}}
+        _merge(folded, archive, gauges=False)
+        for _, data in dead:
+            _merge(folded, data, gauges=False)
+        archive = _as_lists(folded)
+        _atomic_write(archive_path, archive)
+        for path, _ in dead:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return archive
+
+
+def collect(root: str = METRICS_DIR) -> dict:
+    """Metrics of every worker merged: {"counters", "histograms", "gauges"} keyed by (name, labels)."""
+    flush(root)
+    merged = {"counters": {}, "histograms": {}, "gauges": {}}
+    if not os.path.isdir(root):
+        return merged
+    with _locked(root):
+        dead = []
+        for entry in os.scandir(root):
+            if not entry.name.endswith(".json") or entry.name == ARCHIVE:
+                continue
+            data = _read(entry.path)
+            if data is None:
+                continue
+            if _alive(int(data.get("pid", -1)), data.get("started")):
+                _merge(merged, data)
+            else:
+                dead.append((entry.path, data))
+        _merge(merged, _archive(root, dead), gauges=False)
+    return merged
+
+
+# --- EXPOSITION ---
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _labels(labels, extra=()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escaped = (k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in items)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _header(lines, name, kind):
+    kind, help_text = HELP.get(name, (kind, name.replace("_", " ")))
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def exposition(root: str = METRICS_DIR) -> str:
+    """All workers' metrics in the Prometheus text format (version 0.0.4)."""
+    merged = collect(root)
+    lines = []
+    for kind, values in (("counter", merged["counters"]), ("gauge", merged["gauges"])):
+        names = sorted({name for name, _ in values})
+        for name in names:
+            _header(lines, name, kind)
+            for (n, labels), value in sorted(values.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+    for name in sorted({name for name, _ in merged["histograms"]}):
+        _header(lines, name, "histogram")
+        for (n, labels), h in sorted(merged["histograms"].items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, c in zip(BUCKETS, h):
+                cumulative += c
+                lines.append(f"{name}_bucket{_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {h[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {h[-2]:g}")
+            lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+    return "\n".join(lines) + "\n"
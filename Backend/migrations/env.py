@@ -1,21 +1,24 @@
-import os
 from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
 # Alembic Config
 config = context.config
-if config.config_file_name is not None:
+# `flask --app api init-db` passes its connection and metadata (and keeps its own
+# logging); the alembic CLI imports the app and uses its engine URL (DATABASE_URL,
+# relative SQLite paths resolved the way Flask-SQLAlchemy does)
+connection = config.attributes.get("connection")
+if config.config_file_name is not None and connection is None:
     fileConfig(config.config_file_name)
 
-# Import Flask app and db; expose metadata
-from api import app, db  # type: ignore
-target_metadata = db.metadata
-
-# Optional: override URL from env
-env_url = os.getenv("DATABASE_URL")
-if env_url:
-    config.set_main_option("sqlalchemy.url", env_url)
+if connection is not None:
+    target_metadata = config.attributes["metadata"]
+else:
+    from api import app, db  # type: ignore
+    target_metadata = db.metadata
+    with app.app_context():
+        config.set_main_option("sqlalchemy.url",
+                               db.engine.url.render_as_string(hide_password=False).replace("%", "%%"))
 
 
 def run_migrations_offline() -> None:
@@ -32,16 +35,21 @@ def run_migrations_offline() -> None:
 
 
 def run_migrations_online() -> None:
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, compare_type=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
-    with connectable.connect() as connection:
+    with connectable.connect() as conn:
         # Use Flask app context so models are registered
         with app.app_context():
             context.configure(
-                connection=connection,
+                connection=conn,
                 target_metadata=target_metadata,
                 compare_type=True,
             )
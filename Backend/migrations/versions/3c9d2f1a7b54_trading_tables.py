@@ -0,0 +1,110 @@
+"""trading tables and composite indexes
+
+Revision ID: 3c9d2f1a7b54
+Revises: 7f4a638f6485
+Create Date: 2026-10-19 11:00:00.000000
+
+Databases that were set up by db.create_all() already have some of these
+tables (with single-column indexes only), so every step checks what exists.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d2f1a7b54'
+down_revision: Union[str, Sequence[str], None] = '7f4a638f6485'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, index, columns) of models.py
+INDEXES = [
+    ('trade', 'ix_trade_strategy_time', ['strategy', 'time']),
+    ('trade', 'ix_trade_strategy_symbol_time', ['strategy', 'symbol', 'time']),
+    ('trade', 'ix_trade_symbol', ['symbol']),
+    ('trade', 'ix_trade_time', ['time']),
+    ('position', 'ix_position_strategy_symbol_opened_at', ['strategy', 'symbol', 'opened_at']),
+    ('position', 'ix_position_symbol', ['symbol']),
+    ('position', 'ix_position_opened_at', ['opened_at']),
+    ('equity_snapshot', 'ix_equity_snapshot_strategy_time', ['strategy', 'time']),
+    ('equity_snapshot', 'ix_equity_snapshot_time', ['time']),
+]
+# create_all indexes now covered by a composite index's leading column
+REDUNDANT = [
+    ('trade', 'ix_trade_strategy', ['strategy']),
+    ('position', 'ix_position_strategy', ['strategy']),
+    ('equity_snapshot', 'ix_equity_snapshot_strategy', ['strategy']),
+]
+
+
+def _tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _indexes(table) -> set:
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = _tables()
+    if 'trade' not in tables:
+        op.create_table('trade',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('strategy', sa.String(length=64), nullable=False),
+        sa.Column('symbol', sa.String(length=32), nullable=False),
+        sa.Column('side', sa.String(length=8), nullable=False),
+        sa.Column('entry', sa.Float(), nullable=False),
+        sa.Column('exit', sa.Float(), nullable=True),
+        sa.Column('pnl', sa.Float(), nullable=True),
+        sa.Column('time', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'position' not in tables:
+        op.create_table('position',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('strategy', sa.String(length=64), nullable=False),
+        sa.Column('symbol', sa.String(length=32), nullable=False),
+        sa.Column('side', sa.String(length=8), nullable=False),
+        sa.Column('entry', sa.Float(), nullable=False),
+        sa.Column('current', sa.Float(), nullable=True),
+        sa.Column('opened_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'equity_snapshot' not in tables:
+        op.create_table('equity_snapshot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('strategy', sa.String(length=64), nullable=False),
+        sa.Column('time', sa.DateTime(), nullable=True),
+        sa.Column('equity', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'pnl_summary' not in tables:
+        op.create_table('pnl_summary',
+        sa.Column('strategy', sa.String(length=64), nullable=False),
+        sa.Column('first_time', sa.DateTime(), nullable=True),
+        sa.Column('first_equity', sa.Float(), nullable=True),
+        sa.Column('last_time', sa.DateTime(), nullable=True),
+        sa.Column('last_equity', sa.Float(), nullable=True),
+        sa.Column('equity_24h', sa.Float(), nullable=True),
+        sa.Column('trade_count', sa.Integer(), nullable=False),
+        sa.Column('open_positions', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('strategy')
+        )
+    for table, name, columns in INDEXES:
+        if name not in _indexes(table):
+            op.create_index(name, table, columns, unique=False)
+    for table, name, _ in REDUNDANT:
+        if name in _indexes(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    tables = _tables()
+    for table in ('pnl_summary', 'equity_snapshot', 'position', 'trade'):
+        if table in tables:
+            op.drop_table(table)
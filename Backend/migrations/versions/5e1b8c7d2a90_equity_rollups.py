@@ -0,0 +1,43 @@
+"""equity rollups
+
+Revision ID: 5e1b8c7d2a90
+Revises: 3c9d2f1a7b54
+Create Date: 2026-10-19 14:00:00.000000
+
+Existing snapshots get their rollups on the first /api/equity request for
+the strategy, so no data migration is needed.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1b8c7d2a90'
+down_revision: Union[str, Sequence[str], None] = '3c9d2f1a7b54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if 'equity_rollup' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table('equity_rollup',
+    sa.Column('strategy', sa.String(length=64), nullable=False),
+    sa.Column('resolution', sa.String(length=8), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('open', sa.Float(), nullable=False),
+    sa.Column('high', sa.Float(), nullable=False),
+    sa.Column('low', sa.Float(), nullable=False),
+    sa.Column('close', sa.Float(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('strategy', 'resolution', 'bucket')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'equity_rollup' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('equity_rollup')
@@ -20,6 +20,9 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
+    # Skipped when db.create_all() already made it (databases from before migrations)
+    if 'user' in sa.inspect(op.get_bind()).get_table_names():
+        return
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('user',
     sa.Column('id', sa.Integer(), nullable=False),
@@ -3,9 +3,15 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# Hot queries filter by strategy and order by time, so strategy-only lookups use
+# the composite indexes below (their leading column) rather than an index of their own
 class Trade(db.Model):
+    __table_args__ = (
+        db.Index("ix_trade_strategy_time", "strategy", "time"),
+        db.Index("ix_trade_strategy_symbol_time", "strategy", "symbol", "time"),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    strategy = db.Column(db.String(64), index=True, nullable=False)
+    strategy = db.Column(db.String(64), nullable=False)
     symbol = db.Column(db.String(32), index=True, nullable=False)
     side = db.Column(db.String(8), nullable=False)  # BUY/SELL or LONG/SHORT
     entry = db.Column(db.Float, nullable=False)
@@ -14,18 +20,48 @@ class Trade(db.Model):
     time = db.Column(db.DateTime, index=True, default=dt.datetime.utcnow)
 
 class Position(db.Model):
+    __table_args__ = (
+        db.Index("ix_position_strategy_symbol_opened_at", "strategy", "symbol", "opened_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    strategy = db.Column(db.String(64), index=True, nullable=False)
+    strategy = db.Column(db.String(64), nullable=False)
     symbol = db.Column(db.String(32), index=True, nullable=False)
     side = db.Column(db.String(8), nullable=False)
     entry = db.Column(db.Float, nullable=False)
     current = db.Column(db.Float)
-    opened_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    opened_at = db.Column(db.DateTime, index=True, default=dt.datetime.utcnow)
 
 class EquitySnapshot(db.Model):
+    __table_args__ = (
+        db.Index("ix_equity_snapshot_strategy_time", "strategy", "time"),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    strategy = db.Column(db.String(64), index=True, nullable=False)
+    strategy = db.Column(db.String(64), nullable=False)
     time = db.Column(db.DateTime, index=True, default=dt.datetime.utcnow)
     equity = db.Column(db.Float, nullable=False)
 
+class PnlSummary(db.Model):
+    # One row per strategy, rewritten whenever its snapshots/trades are ingested
+    strategy = db.Column(db.String(64), primary_key=True)
+    first_time = db.Column(db.DateTime)
+    first_equity = db.Column(db.Float)
+    last_time = db.Column(db.DateTime)
+    last_equity = db.Column(db.Float)
+    equity_24h = db.Column(db.Float)  # last equity at or before last_time - 24h (first if the curve is shorter)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    open_positions = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
 
+
+
+class EquityRollup(db.Model):
+    # OHLC of a strategy's equity per bucket, tiers "1h" and "1d", rebuilt with its snapshots;
+    # the primary key (strategy, resolution, bucket) serves the chart's range queries
+    strategy = db.Column(db.String(64), primary_key=True)
+    resolution = db.Column(db.String(8), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)  # start of the hour/day
+    open = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    low = db.Column(db.Float, nullable=False)
+    close = db.Column(db.Float, nullable=False)
+    points = db.Column(db.Integer, nullable=False)  # raw snapshots in the bucket
@@ -9,7 +9,6 @@ from rich.table import Table
 from strategy_loader import load_strategy_class
 from binance_data import get_klines
 from utils.telegram_alert import send_telegram_message  # optional
-import matplotlib.pyplot as plt
 
 console = Console()
 
@@ -29,6 +28,9 @@ class MultiCoinPaperTrader:
         self.fee_pct = fee_pct / 100
         self.logs_dir = f"logs/{strategy_class.__name__}"
         os.makedirs(self.logs_dir, exist_ok=True)
+        # Fetch just enough history for the strategy's indicators to warm up
+        required_candles = getattr(strategy_class, "required_candles", None)
+        self.candle_limit = required_candles() if required_candles else 100
 
     def update(self):
         table = Table(title="📊 Live Portfolio Status")
@@ -44,7 +46,7 @@ class MultiCoinPaperTrader:
         self.latest_signals = []
 
         for symbol in self.symbols:
-            df = get_klines(symbol, interval="1m", limit=100)
+            df = get_klines(symbol, interval="1m", limit=self.candle_limit)
             df = self.strategy_class(df).generate_signals()
             if df is None or 'signal' not in df.columns:
                 continue
@@ -199,6 +201,7 @@ class MultiCoinPaperTrader:
         self.save_equity_log()
         df = pd.DataFrame(self.equity_history, columns=["time", "equity"])
         df.set_index("time", inplace=True)
+        import matplotlib.pyplot as plt
         df.plot(title="Equity Curve")
         plt.tight_layout()
         plt.show()
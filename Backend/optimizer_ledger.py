@@ -0,0 +1,262 @@
+# optimizer_ledger.py
+"""Persistent record of every optimizer evaluation.
+
+Each scored (strategy, params, symbol, interval, range, data hash, fee,
+slippage) is written to a SQLite ledger as soon as its batch finishes, so a
+crashed or timed-out optimizer run loses at most one batch. Re-running the
+same request finds those rows and only computes what is missing; the full
+leaderboard and per-parameter sensitivity are queries over the ledger.
+
+The data hash covers the traded candles (from `start` on), not the warm-up
+history, so results are reused whatever warm-up a run happened to fetch.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from evaluator import evaluate_strategies, BATCH_SIZE, TRADING_FEE, SLIPPAGE
+from strategy.indicators import Indicators
+from signal_store import data_hash, resolved_params, strategy_fingerprint
+from stats import STATS_VERSION
+from instrumentation import timed, count
+
+OPTIMIZER_LEDGER_PATH = os.getenv("OPTIMIZER_LEDGER_PATH", os.path.join("logs", "optimizer", "ledger.db"))
+
+# Stats key -> ledger column
+METRIC_COLUMNS = {
+    "Total Return (%)": "total_return",
+    "Max Drawdown (%)": "max_dd",
+    "Win Rate (%)": "win_rate",
+    "Sharpe Ratio": "sharpe",
+    "Final Balance": "final_balance",
+}
+# Leaderboard objectives -> SQL expression (higher is better)
+OBJECTIVE_SQL = {
+    "return": "total_return",
+    "sharpe": "sharpe",
+    "return_dd": "CASE WHEN max_dd < 0 THEN total_return / -max_dd ELSE total_return END",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    code TEXT NOT NULL,
+    params TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start TEXT NOT NULL,
+    "end" TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    fee REAL NOT NULL,
+    slippage REAL NOT NULL,
+    total_return REAL,
+    max_dd REAL,
+    win_rate REAL,
+    sharpe REAL,
+    final_balance REAL,
+    partial INTEGER NOT NULL DEFAULT 0,
+    run_id INTEGER,
+    created_at REAL NOT NULL,
+    UNIQUE (strategy, code, params, symbol, interval, start, "end", data_hash, fee, slippage)
+);
+CREATE INDEX IF NOT EXISTS ix_evaluations_scope ON evaluations (strategy, symbol, interval, start, "end");
+CREATE INDEX IF NOT EXISTS ix_evaluations_return ON evaluations (total_return);
+CREATE INDEX IF NOT EXISTS ix_evaluations_sharpe ON evaluations (sharpe);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+"""
+
+
+def canonical_params(strategy_class, params) -> str:
+    """Params merged over constructor defaults as sorted JSON ({} and explicit defaults match)."""
+    return json.dumps(resolved_params(strategy_class, params), sort_keys=True, default=str)
+
+
+def _timestamp(value) -> str:
+    return pd.Timestamp(value).isoformat()
+
+
+def _strategy_name(strategy_class) -> str:
+    from strategy_loader import strategy_name
+    return strategy_name(strategy_class)
+
+
+class Ledger:
+    def __init__(self, path: str = OPTIMIZER_LEDGER_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- RUNS ---
+    def start_run(self, payload: dict) -> int:
+        with self.conn:
+            cur = self.conn.execute("INSERT INTO runs (payload, status, started_at) VALUES (?, 'running', ?)",
+                                    (json.dumps(payload, sort_keys=True, default=str), time.time()))
+        return cur.lastrowid
+
+    def finish_run(self, run_id: int, error: str | None = None):
+        with self.conn:
+            self.conn.execute("UPDATE runs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                              ("failed" if error else "done", error, time.time(), run_id))
+
+    def run(self, run_id: int) -> dict | None:
+        row = self.conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        out = dict(row)
+        out["payload"] = json.loads(out["payload"])
+        out["evaluations"] = self.conn.execute("SELECT COUNT(*) FROM evaluations WHERE run_id = ?",
+                                               (run_id,)).fetchone()[0]
+        return out
+
+    def runs(self, limit=20) -> list[dict]:
+        rows = self.conn.execute("SELECT id, status, error, started_at, finished_at FROM runs "
+                                 "ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        return [dict(r) for r in rows]
+
+    # --- EVALUATIONS ---
+    @timed("optimizer.ledger_lookup")
+    def lookup(self, keys: list[tuple]) -> dict:
+        """Stats for already-recorded keys (see `key`), as {key: stats}."""
+        found = {}
+        for k in keys:
+            row = self.conn.execute(
+                'SELECT total_return, max_dd, win_rate, sharpe, final_balance FROM evaluations '
+                'WHERE strategy = ? AND code = ? AND params = ? AND symbol = ? AND interval = ? '
+                'AND start = ? AND "end" = ? AND data_hash = ? AND fee = ? AND slippage = ?', k).fetchone()
+            if row is not None:
+                found[k] = {stat: row[col] for stat, col in METRIC_COLUMNS.items()}
+        return found
+
+    @timed("optimizer.ledger_record")
+    def record(self, keys: list[tuple], results: list[dict], run_id: int | None = None, partial=False):
+        now = time.time()
+        rows = [k + tuple(stats.get(stat) for stat in METRIC_COLUMNS) + (int(partial), run_id, now)
+                for k, stats in zip(keys, results)]
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO evaluations (strategy, code, params, symbol, interval, start, "end", '
+                'data_hash, fee, slippage, total_return, max_dd, win_rate, sharpe, final_balance, partial, run_id, '
+                'created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    @staticmethod
+    def key(strategy_class, params, symbol, interval, start, end, digest, fee, slippage) -> tuple:
+        # Stored metrics depend on the strategy code and on how stats are defined
+        return (_strategy_name(strategy_class), f"{strategy_fingerprint(strategy_class)};stats{STATS_VERSION}",
+                canonical_params(strategy_class, params), symbol.upper(), interval,
+                _timestamp(start), _timestamp(end), digest, float(fee), float(slippage))
+
+    def evaluate(self, df, specs, symbol, interval, start, fee=TRADING_FEE, slippage=SLIPPAGE,
+                 run_id=None, partial=False, batch_size=BATCH_SIZE) -> tuple[list[dict], int]:
+        """evaluate_strategies() that reuses recorded results and records new ones batch by batch.
+
+        The range end is the last candle of `df`; `partial` marks screening
+        windows shorter than the requested range (successive halving), which
+        the leaderboard skips by default. Returns (stats per spec, number reused).
+        """
+        if not specs:
+            return [], 0
+        first = int(np.searchsorted(df.index.values, np.datetime64(pd.Timestamp(start))))
+        traded = df.iloc[first:]
+        if traded.empty:
+            raise ValueError("No data in the requested range after strategy warm-up.")
+        digest = data_hash(traded)
+        end = traded.index[-1]
+        keys = [self.key(cls, params, symbol, interval, start, end, digest, fee, slippage) for cls, params in specs]
+        results = self.lookup(keys)
+        reused = len(results)
+        count("optimizer.reused", reused)
+        missing = [i for i, k in enumerate(keys) if k not in results]
+        ind = Indicators(df)
+        for b in range(0, len(missing), batch_size):
+            batch = missing[b:b + batch_size]
+            stats = evaluate_strategies(df, [specs[i] for i in batch], start=start, fee=fee, slippage=slippage,
+                                        batch_size=batch_size, indicators=ind, interval=interval,
+                                        metrics=tuple(METRIC_COLUMNS))
+            batch_keys = [keys[i] for i in batch]
+            self.record(batch_keys, stats, run_id=run_id, partial=partial)
+            results.update(zip(batch_keys, stats))
+        return [results[k] for k in keys], reused
+
+    # --- QUERIES ---
+    def _scope(self, strategy=None, symbol=None, interval=None, start=None, end=None, include_partial=False):
+        clauses, args = ([], []) if include_partial else (["partial = 0"], [])
+        for column, value in (("strategy", strategy), ("symbol", symbol and symbol.upper()), ("interval", interval)):
+            if value:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if start:
+            clauses.append("start >= ?")
+            args.append(_timestamp(start))
+        if end:
+            clauses.append('"end" <= ?')
+            args.append(_timestamp(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def leaderboard(self, objective="return", limit=50, **scope) -> list[dict]:
+        """Best recorded evaluations by `objective` within the optional scope filters."""
+        if objective not in OBJECTIVE_SQL:
+            raise ValueError(f"Unknown objective '{objective}', expected one of {sorted(OBJECTIVE_SQL)}.")
+        where, args = self._scope(**scope)
+        rows = self.conn.execute(
+            f'SELECT strategy, params, symbol, interval, start, "end", fee, slippage, total_return, max_dd, '
+            f'win_rate, sharpe, final_balance, {OBJECTIVE_SQL[objective]} AS score FROM evaluations{where} '
+            f'ORDER BY score DESC LIMIT ?', args + [int(limit)]).fetchall()
+        out = []
+        for r in rows:
+            row = dict(r)
+            row["params"] = json.loads(row["params"])
+            out.append(row)
+        return out
+
+    def sensitivity(self, strategy, param, objective="return", **scope) -> list[dict]:
+        """Objective statistics per value of one parameter (other parameters pooled)."""
+        if objective not in OBJECTIVE_SQL:
+            raise ValueError(f"Unknown objective '{objective}', expected one of {sorted(OBJECTIVE_SQL)}.")
+        where, args = self._scope(strategy=strategy, **scope)
+        rows = self.conn.execute(f"SELECT params, {OBJECTIVE_SQL[objective]} AS score FROM evaluations{where}",
+                                 args).fetchall()
+        groups: dict[str, list[float]] = {}
+        values = {}
+        for r in rows:
+            params = json.loads(r["params"])
+            if param not in params or r["score"] is None:
+                continue
+            k = json.dumps(params[param], default=str)
+            values[k] = params[param]
+            groups.setdefault(k, []).append(float(r["score"]))
+        out = []
+        for k, scores in groups.items():
+            s = np.asarray(scores)
+            out.append({"value": values[k], "count": int(len(s)), "mean": float(s.mean()),
+                        "median": float(np.median(s)), "max": float(s.max()), "min": float(s.min())})
+        return sorted(out, key=lambda r: (str(type(r["value"])), r["value"]))
+
+
+_local = threading.local()
+
+
+def default_ledger() -> Ledger:
+    """Ledger at OPTIMIZER_LEDGER_PATH; one connection per thread (sqlite3 connections are not thread-safe)."""
+    ledger = getattr(_local, "ledger", None)
+    if ledger is None:
+        ledger = _local.ledger = Ledger()
+    return ledger
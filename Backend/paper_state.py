@@ -0,0 +1,231 @@
+# paper_state.py
+"""Paper-trading account state (balance, symbol, live flag, strategy,
+interval) shared by every gunicorn worker through one JSON file.
+
+    store = default_store()
+    store.get()                    # copy of the state; re-read only if the file changed
+                                   # (nested values are shared: treat them as read-only)
+    store.update(fn)               # fn(state) edits a fresh copy under the file lock
+    store.subscribe(fn)            # fn(old, new) after every change this process sees
+
+Reads stat the file and return the in-memory copy unless another process
+has replaced it since, so they cost a few microseconds. Updates take an
+exclusive fcntl lock on <path>.lock, re-read the file, apply the change and
+write it to a temporary file that atomically replaces the state, so
+concurrent deposits and withdrawals from different workers never lose one
+and a crash never leaves a half-written file. An update that raises
+Rejected (e.g. insufficient balance) leaves the state untouched.
+
+Subscribers hear about this process's own updates at once and about other
+processes' on the next read; start_watcher() polls the file so they hear
+without one.
+
+"sessions" holds the paper-trading sessions the API wants running
+(session_id -> spec); paper_supervisor.py runs them and reports on them in
+its own file, PAPER_STATUS_PATH, read through a store as well.
+"""
+from __future__ import annotations
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from instrumentation import count
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialized within the process
+    fcntl = None
+
+PAPER_STATE_PATH = os.getenv("PAPER_STATE_PATH", os.path.join("logs", "paper", "state.json"))
+PAPER_STATUS_PATH = os.getenv("PAPER_STATUS_PATH", os.path.join("logs", "paper", "supervisor.json"))
+PAPER_SESSIONS_DIR = os.getenv("PAPER_SESSIONS_DIR", os.path.join("logs", "paper", "sessions"))  # per-session logs
+DEFAULT_STATE = {"balance": 1000.0, "symbol": "BTCUSDT", "live": False, "strategy": "RSI_EMA", "interval": "15m",
+                 "sessions": {}}
+
+logger = logging.getLogger("paper_state")
+
+
+class Rejected(Exception):
+    """Raised by an update function to refuse the change; the state is unchanged."""
+
+
+def session_id(strategy: str, symbol: str, interval: str) -> str:
+    return f"{strategy}:{symbol.upper()}:{interval}"
+
+
+def _signature(st) -> tuple:
+    # A replace gives the file a new inode; mtime and size catch in-place edits
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class PaperStateStore:
+    """Cached, lock-protected JSON object at `path` (see the module docstring); keys
+    missing from the file read as `defaults` (the paper account's by default)."""
+
+    def __init__(self, path: str = PAPER_STATE_PATH, defaults: dict | None = None):
+        self.path = path
+        self.defaults = DEFAULT_STATE if defaults is None else defaults
+        self.version = 0  # changes seen by this process
+        self._state = copy.deepcopy(self.defaults)
+        self._sig = None
+        self._loaded = False  # the first read is not a change
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._watcher = None
+
+    # --- READ ---
+    def get(self) -> dict:
+        """Copy of the current state."""
+        try:
+            sig = _signature(os.stat(self.path))
+        except OSError:
+            sig = None
+        if sig != self._sig:
+            self._reload()
+        return dict(self._state)
+
+    def _read(self):
+        """(state, signature) of the file; defaults when it is missing or unreadable."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                sig = _signature(os.fstat(f.fileno()))
+                data = json.load(f)
+            if isinstance(data, dict):
+                return {**copy.deepcopy(self.defaults), **data}, sig
+            logger.warning("Ignoring %s: not a JSON object", self.path)
+        except FileNotFoundError:
+            sig = None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable %s: %s", self.path, e)
+        return copy.deepcopy(self.defaults), sig
+
+    def _reload(self):
+        with self._lock:
+            state, sig = self._read()
+            old, changed = self._state, self._loaded and state != self._state
+            self._state, self._sig, self._loaded = state, sig, True
+            if changed:
+                self.version += 1
+        count("paper_state.reload")
+        if changed:
+            self._notify(old, state)
+
+    # --- WRITE ---
+    def update(self, fn) -> dict:
+        """Apply fn(state) (edit the dict in place or return a new one) atomically across
+        processes; returns the new state. Rejected from `fn` propagates, nothing is written."""
+        with self._lock, _FileLock(self.path + ".lock"):
+            current, sig = self._read()
+            state = copy.deepcopy(current)
+            result = fn(state)
+            if result is not None:
+                state = dict(result)
+            old = self._state
+            if state != current:
+                self._write(state)
+            else:
+                self._sig = sig
+            changed = state != old
+            self._state, self._loaded = state, True
+            if changed:
+                self.version += 1
+        count("paper_state.update")
+        if changed:
+            self._notify(old, state)
+        return dict(state)
+
+    def _write(self, state: dict):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".state-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+                self._sig = _signature(os.fstat(f.fileno()))
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    # --- CHANGE NOTIFICATION ---
+    def subscribe(self, fn):
+        """Call fn(old, new) after each change this process sees; returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(fn)
+
+        def unsubscribe():
+            with self._lock:
+                if fn in self._subscribers:
+                    self._subscribers.remove(fn)
+        return unsubscribe
+
+    def _notify(self, old: dict, new: dict):
+        for fn in list(self._subscribers):
+            try:
+                fn(dict(old), dict(new))
+            except Exception:
+                logger.exception("Paper state subscriber failed")
+
+    def start_watcher(self, interval: float = 1.0):
+        """Poll the file every `interval` seconds in a daemon thread, so subscribers learn of
+        other processes' updates without a read in this one."""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name="paper-state-watcher",
+                                             daemon=True)
+            self._watcher.start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.get()
+            except Exception:
+                logger.exception("Paper state watcher failed")
+
+
+class _FileLock:
+    """Exclusive fcntl lock on `path` (no-op without fcntl)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.f = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()  # releases the lock
+        return False
+
+
+_stores: dict[str, PaperStateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def default_store(path: str = PAPER_STATE_PATH, defaults: dict | None = None) -> PaperStateStore:
+    """The process's store at `path` (the paper account by default)."""
+    store = _stores.get(path)
+    if store is not None:
+        return store
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = PaperStateStore(path, defaults)
+        return _stores[path]
+
+
+def status_store() -> PaperStateStore:
+    """The supervisor's report at PAPER_STATUS_PATH."""
+    return default_store(PAPER_STATUS_PATH, {})
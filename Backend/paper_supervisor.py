@@ -0,0 +1,400 @@
+# paper_supervisor.py
+"""Runs every paper-trading session (strategy x symbol x interval) in one
+process, started and stopped from the API.
+
+POST /api/papertrading records the sessions it wants under "sessions" in the
+paper state (paper_state.py). This process watches that file, starts and
+stops sessions to match, and writes their health to PAPER_STATUS_PATH, which
+GET /api/papertrading reads:
+
+    python paper_supervisor.py          # until stopped; one per host
+    python paper_supervisor.py --once   # a single tick (cron, debugging)
+
+Sessions on the same symbol and interval share a feed: one kline request per
+closed candle serves all of them, and their strategies share one Indicators
+cache on that window (two warm-ups long, like the streaming backtester's
+overlap). Each session replays only the candles closed since its last tick
+through evaluator.simulate, carrying position, entry price and balance, so a
+tick costs one request per feed plus a few array operations per session.
+Feeds are fetched concurrently, and the loop sleeps until the next candle
+closes (or the state changes). Carries are saved with the status, so a
+restarted supervisor resumes open positions.
+
+Each session appends its equity and closed trades to
+logs/paper/sessions/<strategy>_<symbol>_<interval>/. Health per session:
+starting (no candle yet), ok, lagging (a closed candle is overdue) or error.
+"""
+from __future__ import annotations
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import metrics
+import paper_state
+from binance_data import get_klines, interval_to_timedelta
+from evaluator import instantiate, simulate, INITIAL_BALANCE, TRADING_FEE, SLIPPAGE
+from streaming_backtester import OVERLAP_WARMUPS
+from strategy.indicators import Indicators
+from strategy_loader import load_strategy_class
+from instrumentation import timer, count
+
+try:
+    import fcntl
+except ImportError:  # Windows: nothing stops a second supervisor
+    fcntl = None
+
+PAPER_POLL_SECONDS = float(os.getenv("PAPER_POLL_SECONDS", "5"))
+# Wait after a candle closes before fetching it, so the exchange has it
+PAPER_CLOSE_DELAY = float(os.getenv("PAPER_CLOSE_DELAY", "2"))
+PAPER_FEED_THREADS = int(os.getenv("PAPER_FEED_THREADS", "8"))
+PAPER_ALERTS = os.getenv("PAPER_ALERTS", "0") not in ("0", "false", "False")
+
+logger = logging.getLogger("paper_supervisor")
+
+
+def _utcnow() -> pd.Timestamp:
+    return pd.Timestamp.now(tz="UTC").tz_localize(None)
+
+
+def _alert(message: str):
+    """Telegram message sent from a thread, so a slow request never delays a tick."""
+    if not PAPER_ALERTS:
+        return
+    from utils.telegram_alert import send_telegram_message
+    threading.Thread(target=send_telegram_message, args=(message,), daemon=True).start()
+
+
+# --- SESSIONS ---
+class Session:
+    """One strategy on one symbol and interval, advanced one closed candle at a time."""
+
+    def __init__(self, sid: str, spec: dict, saved: dict | None = None):
+        self.id = sid
+        self.spec = spec
+        self.strategy = spec["strategy"]
+        self.symbol = spec["symbol"]
+        self.interval = spec["interval"]
+        self.params = spec.get("params") or {}
+        self.fee = float(spec.get("fee", TRADING_FEE))
+        self.slippage = float(spec.get("slippage", SLIPPAGE))
+        self.initial_balance = float(spec.get("balance") or INITIAL_BALANCE)
+        self.strategy_class = load_strategy_class(self.strategy)
+        warmup_for = getattr(self.strategy_class, "warmup_for", None)
+        self.warmup = warmup_for(**self.params) if warmup_for else 0
+        self.step = interval_to_timedelta(self.interval)
+        self.dir = os.path.join(paper_state.PAPER_SESSIONS_DIR, sid.replace(":", "_"))
+
+        saved = saved if saved and saved.get("spec") == spec else {}
+        self.resumed = bool(saved)
+        if not saved:
+            # A new session starts new logs, like a backtest run
+            for name in ("equity.csv", "trades.csv"):
+                if os.path.exists(os.path.join(self.dir, name)):
+                    os.remove(os.path.join(self.dir, name))
+        self.carry = saved.get("carry")            # {"position", "entry", "balance"} after last_candle
+        self.open_trade = saved.get("open_trade")  # [entry time, entry price] of the carried position
+        self.last_candle = pd.Timestamp(saved["last_candle"]) if saved.get("last_candle") else None
+        self.equity = float(saved.get("equity", self.initial_balance))
+        self.trades = int(saved.get("trades", 0))
+        self.started = saved.get("started") or str(_utcnow())
+        self.last_tick = saved.get("last_tick")
+        self.latency = saved.get("latency_seconds")
+        self.error = None
+
+    @property
+    def window(self) -> int:
+        """Candles to fetch so the indicators have converged on the newest one."""
+        return max(OVERLAP_WARMUPS * self.warmup, self.warmup + 1, 2)
+
+    def _signals(self, frame, indicators, continuing):
+        # As in the streaming backtester: with a carried position only entry/exit events count
+        strategy = instantiate(self.strategy_class, frame, self.params)
+        if continuing and hasattr(strategy, "signal_events"):
+            return strategy.signal_events(indicators)
+        if hasattr(strategy, "signals"):
+            return strategy.signals(indicators)
+        return strategy.generate_signals()["signal"].to_numpy(dtype=np.int8)
+
+    def advance(self, frame: pd.DataFrame, indicators: Indicators, now: pd.Timestamp) -> list:
+        """Trade the candles of `frame` closed since the last tick (a new session starts on the
+        newest one); returns the trades closed."""
+        if self.last_candle is None:
+            new = np.zeros(len(frame), dtype=bool)
+            new[-1] = True
+        else:
+            new = np.asarray(frame.index > self.last_candle)
+        new[:self.warmup] = False  # candles missed beyond the window are skipped
+        if not new.any():
+            return []
+        signal_ = self._signals(frame, indicators, continuing=self.carry is not None)
+        times = frame.index[new]
+        close = frame["close"].to_numpy(dtype=np.float64)[new]
+        state = None
+        if self.carry is not None:
+            entry = self.carry["entry"]
+            state = {"position": np.array([self.carry["position"]], dtype=np.int8),
+                     "entry": np.array([np.nan if entry is None else entry]),
+                     "balance": np.array([self.carry["balance"]])}
+        sim = simulate(close, np.asarray(signal_, dtype=np.int8)[new][:, None], fee=self.fee,
+                       slippage=self.slippage, initial_balance=self.initial_balance, state=state, close_end=False)
+        position, entry, exit_pnl = sim["position"][:, 0], sim["entry"][:, 0], sim["exit_pnl"][:, 0]
+
+        # Pair each exit with the position it closes
+        prev = 0 if self.carry is None else self.carry["position"]
+        rows = []
+        for i, t in enumerate(times):
+            if position[i] == prev:
+                continue
+            if prev != 0:
+                opened = self.open_trade or [None, None]
+                rows.append({"time": opened[0], "symbol": self.symbol, "side": "Long" if prev == 1 else "Short",
+                             "entry": opened[1], "exit": float(close[i] * (1 - self.slippage)),
+                             "pnl": float(exit_pnl[i]), "strategy": self.strategy})
+                _alert(f"{'🟢' if exit_pnl[i] > 0 else '🔴'} [{self.strategy}] Close {rows[-1]['side']} {self.symbol} "
+                       f"@ {rows[-1]['exit']:.2f} | PnL: {exit_pnl[i] * 100:.2f}%")
+            self.open_trade = [str(t), float(entry[i])] if position[i] != 0 else None
+            if position[i] != 0:
+                _alert(f"{'🟢 Long' if position[i] == 1 else '🔴 Short'} [{self.strategy}] {self.symbol} "
+                       f"@ {entry[i]:.2f}")
+            prev = int(position[i])
+
+        state = sim["state"]
+        self.carry = {"position": int(state["position"][0]),
+                      "entry": None if np.isnan(state["entry"][0]) else float(state["entry"][0]),
+                      "balance": float(state["balance"][0])}
+        equity = sim["equity"][:, 0]
+        self.equity = float(equity[-1])
+        self.trades += len(rows)
+        self.last_candle = times[-1]
+        self.last_tick = str(now)
+        self.latency = (now - (times[-1] + self.step)).total_seconds()
+        self._append(times, equity, rows)
+        count("paper.candles", len(times))
+        return rows
+
+    def _append(self, times, equity, rows):
+        os.makedirs(self.dir, exist_ok=True)
+        for name, df in (("equity.csv", pd.DataFrame({"time": times, "equity": equity})),
+                         ("trades.csv", pd.DataFrame(rows))):
+            if df.empty:
+                continue
+            path = os.path.join(self.dir, name)
+            df.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+    def status(self, now: pd.Timestamp) -> dict:
+        lag = None if self.last_candle is None else (now - (self.last_candle + self.step)).total_seconds()
+        if self.error:
+            health = "error"
+        elif lag is None:
+            health = "starting"
+        elif lag > self.step.total_seconds() + PAPER_CLOSE_DELAY + PAPER_POLL_SECONDS:
+            health = "lagging"
+        else:
+            health = "ok"
+        position = self.carry["position"] if self.carry else 0
+        return {
+            "id": self.id, "spec": self.spec, "health": health, "error": self.error,
+            "position": {1: "LONG", -1: "SHORT"}.get(position), "entry": self.carry["entry"] if self.carry else None,
+            "equity": self.equity, "return_pct": (self.equity / self.initial_balance - 1) * 100,
+            "trades": self.trades, "last_candle": None if self.last_candle is None else str(self.last_candle),
+            "last_tick": self.last_tick, "lag_seconds": lag, "latency_seconds": self.latency,
+            "started": self.started, "carry": self.carry, "open_trade": self.open_trade,
+        }
+
+
+# --- FEEDS ---
+class Feed:
+    """Closed candles of one symbol and interval, fetched once per candle for all its sessions."""
+
+    def __init__(self, symbol: str, interval: str):
+        self.symbol = symbol
+        self.interval = interval
+        self.step = interval_to_timedelta(interval)
+        self.last_candle = None
+        self.next_due = None
+        self.error = None
+        self.fetches = 0
+
+    def due(self, now) -> bool:
+        return self.next_due is None or now >= self.next_due
+
+    def fetch(self, limit: int, now: pd.Timestamp) -> pd.DataFrame | None:
+        """The last `limit` closed candles, or None when no new one has closed yet."""
+        self.next_due = now + pd.Timedelta(seconds=PAPER_POLL_SECONDS)  # retry if nothing new or it fails
+        with timer("paper.fetch"):
+            df = get_klines(self.symbol, self.interval, limit + 1)  # + the candle still open
+        self.fetches += 1
+        if df.empty:
+            raise ValueError(f"No candles for {self.symbol} {self.interval}")
+        df = df[df.index + self.step <= now].iloc[-limit:]
+        if df.empty or (self.last_candle is not None and df.index[-1] <= self.last_candle):
+            return None
+        self.last_candle = df.index[-1]
+        self.next_due = self.last_candle + 2 * self.step + pd.Timedelta(seconds=PAPER_CLOSE_DELAY)
+        return df
+
+    def status(self, now) -> dict:
+        return {"symbol": self.symbol, "interval": self.interval, "error": self.error, "fetches": self.fetches,
+                "last_candle": None if self.last_candle is None else str(self.last_candle),
+                "next_due": None if self.next_due is None else str(self.next_due)}
+
+
+# --- SUPERVISOR ---
+class PaperSupervisor:
+    """Keeps the running sessions in line with the paper state and reports on them."""
+
+    def __init__(self, store: paper_state.PaperStateStore | None = None,
+                 status: paper_state.PaperStateStore | None = None):
+        self.store = store or paper_state.default_store()
+        self.status_store = status or paper_state.status_store()
+        self.sessions: dict[str, Session] = {}
+        self.failed: dict[str, dict] = {}  # sessions that could not start: id -> status
+        self.feeds: dict[tuple, Feed] = {}
+        self.started = str(_utcnow())
+        # Carries of the previous run, resumed when the same sessions are still wanted
+        self._saved = dict(self.status_store.get().get("sessions") or {})
+        self._wake = threading.Event()
+        self.store.subscribe(lambda old, new: self._wake.set())
+        self.pool = ThreadPoolExecutor(PAPER_FEED_THREADS, thread_name_prefix="paper-feed")
+        self.unhealthy = 0
+        metrics.register_gauge("paper_sessions", "Paper-trading sessions running.", lambda: len(self.sessions))
+        metrics.register_gauge("paper_sessions_unhealthy", "Paper-trading sessions lagging or failing.",
+                               lambda: self.unhealthy)
+
+    def reconcile(self):
+        """Start the wanted sessions that are not running and stop the ones no longer wanted."""
+        wanted = self.store.get().get("sessions") or {}
+        for sid in list(self.sessions):
+            if wanted.get(sid) != self.sessions[sid].spec:
+                del self.sessions[sid]
+                logger.info("Stopped session %s", sid)
+        self.failed = {}
+        for sid, spec in wanted.items():
+            if sid in self.sessions:
+                continue
+            try:
+                self.sessions[sid] = Session(sid, spec, self._saved.pop(sid, None))
+                logger.info("%s session %s", "Resumed" if self.sessions[sid].resumed else "Started", sid)
+            except Exception as e:
+                logger.warning("Session %s cannot start: %s", sid, e)
+                self.failed[sid] = {"id": sid, "spec": spec, "health": "error", "error": str(e)}
+        keys = {(s.symbol, s.interval) for s in self.sessions.values()}
+        self.feeds = {key: self.feeds.get(key) or Feed(*key) for key in keys}
+
+    def tick(self, now: pd.Timestamp | None = None):
+        """Fetch every due feed (concurrently) and advance its sessions."""
+        now = now or _utcnow()
+        groups = {}
+        for s in self.sessions.values():
+            groups.setdefault((s.symbol, s.interval), []).append(s)
+        futures = {key: self.pool.submit(self.feeds[key].fetch, max(s.window for s in sessions), now)
+                   for key, sessions in groups.items() if self.feeds[key].due(now)}
+        for key, future in futures.items():
+            feed, sessions = self.feeds[key], groups[key]
+            try:
+                frame = future.result()
+                feed.error = None
+            except Exception as e:
+                logger.warning("Feed %s %s failed: %s", *key, e)
+                feed.error = str(e)
+                for s in sessions:
+                    s.error = f"feed: {e}"
+                continue
+            if frame is None:
+                continue
+            with timer("paper.advance"):
+                indicators = Indicators(frame)
+                for s in sessions:
+                    try:
+                        s.advance(frame, indicators, now)
+                        s.error = None
+                    except Exception as e:
+                        logger.exception("Session %s failed", s.id)
+                        s.error = str(e)
+
+    def report(self, running=True) -> dict:
+        now = _utcnow()
+        sessions = {sid: s.status(now) for sid, s in self.sessions.items()}
+        self.unhealthy = sum(1 for s in sessions.values() if s["health"] in ("lagging", "error")) + len(self.failed)
+        sessions.update(self.failed)
+        return {
+            "pid": os.getpid(), "running": running, "started": self.started, "heartbeat": time.time(),
+            "poll_seconds": PAPER_POLL_SECONDS, "sessions": sessions,
+            "feeds": {f"{symbol}:{interval}": feed.status(now) for (symbol, interval), feed in self.feeds.items()},
+        }
+
+    def write_status(self, running=True):
+        report = self.report(running)
+        self.status_store.update(lambda _: report)
+        metrics.flush()
+
+    def sleep_seconds(self) -> float:
+        """Until the next feed is due, at most PAPER_POLL_SECONDS."""
+        now = _utcnow()
+        due = [(f.next_due - now).total_seconds() for f in self.feeds.values() if f.next_due is not None]
+        return max(0.0, min([PAPER_POLL_SECONDS] + due))
+
+    def run(self, once=False):
+        self.store.start_watcher(min(1.0, PAPER_POLL_SECONDS))
+        try:
+            while True:
+                self._wake.clear()
+                self.reconcile()
+                with timer("paper.tick"):
+                    self.tick()
+                self.write_status()
+                if once:
+                    return
+                self._wake.wait(self.sleep_seconds())
+        finally:
+            self.write_status(running=False)
+            self.pool.shutdown(wait=False)
+
+
+def _single_instance():
+    """Lock held for the life of the process; None when another supervisor holds it."""
+    path = paper_state.PAPER_STATUS_PATH + ".run.lock"  # not the status store's own write lock
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path, "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return None
+    return f
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the paper-trading sessions requested through the API")
+    parser.add_argument("--once", action="store_true", help="Run a single tick and exit")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    lock = _single_instance()
+    if lock is None:
+        print("❌ Another paper supervisor is already running")
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    supervisor = PaperSupervisor()
+    print(f"🚀 Paper supervisor running ({len(supervisor.store.get().get('sessions') or {})} sessions requested)")
+    try:
+        supervisor.run(once=args.once)
+    except KeyboardInterrupt:
+        print("\n🛑 Paper supervisor stopped.")
+    if args.once:
+        for sid, status in supervisor.report()["sessions"].items():
+            print(f"📈 {sid}: {status['health']} | equity {status.get('equity', 0):.2f} | "
+                  f"trades {status.get('trades', 0)}" + (f" | {status['error']}" if status.get("error") else ""))
+
+
+if __name__ == "__main__":
+    main()
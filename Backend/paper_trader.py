@@ -34,7 +34,8 @@ INTERVAL = "15m"
 TRADE_QUANTITY_USD = 100
 FEE_PCT = 0.001
 SLIPPAGE_PCT = 0.001
-MAX_CANDLES = 100
+# Enough history for the strategy's indicators to warm up on the latest candle
+MAX_CANDLES = strategy_class.required_candles() if hasattr(strategy_class, "required_candles") else 100
 
 # Initialize
 binance = BinanceConnector(config.API_KEY, config.API_SECRET)
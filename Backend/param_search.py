@@ -0,0 +1,344 @@
+# param_search.py
+"""Parameter search strategies for the optimizer.
+
+Every search works on a strategy's search space (candidate values per
+parameter, as in strategy_loader's grid specs) and spends at most `budget`
+evaluations, where one evaluation is one parameter set scored on one block
+of candles. Scoring goes through evaluator.evaluate_strategies, so a batch
+of parameter sets shares its indicators.
+
+  grid     every combination (budget caps it, in grid order)
+  random   `budget` distinct combinations drawn uniformly
+  halving  successive halving: many combinations on a short date window,
+           the best 1/eta move on to a window eta times longer
+  tpe      Tree-structured Parzen Estimator over the discrete values
+"""
+from __future__ import annotations
+import itertools
+import math
+import numpy as np
+import pandas as pd
+from evaluator import evaluate_strategies, TRADING_FEE, SLIPPAGE
+from stats import BASE_METRICS
+from instrumentation import timer
+
+DEFAULT_BUDGET = 50
+HALVING_ETA = 3
+# Shortest window successive halving scores on, as a fraction of the range
+HALVING_MIN_FRACTION = 1 / 9
+TPE_GAMMA = 0.25       # share of observations treated as "good"
+TPE_CANDIDATES = 24    # draws from the good-density per proposal
+TPE_BATCH = 4          # proposals scored together per round
+
+
+# --- OBJECTIVES ---
+def _return(stats):
+    return float(stats.get("Total Return (%)", 0))
+
+
+def _sharpe(stats):
+    return float(stats.get("Sharpe Ratio", 0))
+
+
+def _return_dd(stats):
+    """Return over max drawdown (Calmar-like); plain return when there was no drawdown."""
+    ret = _return(stats)
+    dd = abs(float(stats.get("Max Drawdown (%)", 0)))
+    return ret / dd if dd > 0 else ret
+
+
+OBJECTIVES = {
+    "return": _return,
+    "sharpe": _sharpe,
+    "return_dd": _return_dd,
+}
+
+
+def objective_fn(name):
+    try:
+        return OBJECTIVES[name]
+    except KeyError:
+        raise ValueError(f"Unknown objective '{name}', expected one of {sorted(OBJECTIVES)}.") from None
+
+
+# --- SEARCH SPACE ---
+def expand_values(spec) -> list:
+    """Candidate list from a list, or from {"min", "max", "step"} for numeric ranges."""
+    if isinstance(spec, dict):
+        lo, hi, step = spec["min"], spec["max"], spec.get("step", 1)
+        n = int(math.floor((hi - lo) / step + 1e-9)) + 1
+        values = [lo + i * step for i in range(n)]
+        if all(isinstance(v, int) for v in (lo, hi, step)):
+            return values
+        return [round(v, 10) for v in values]
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    return [spec]
+
+
+class SearchSpace:
+    """Discrete product space of candidate values with an optional validity constraint."""
+
+    def __init__(self, spec: dict | None, constraint=None):
+        spec = spec or {}
+        self.keys = list(spec.keys())
+        self.values = [expand_values(spec[k]) for k in self.keys]
+        self.constraint = constraint
+
+    @property
+    def size(self) -> int:
+        """Upper bound on the number of combinations (before the constraint)."""
+        return math.prod(len(v) for v in self.values)
+
+    def valid(self, params) -> bool:
+        return self.constraint is None or bool(self.constraint(params))
+
+    def params(self, indices) -> dict:
+        return {k: vals[i] for k, vals, i in zip(self.keys, self.values, indices)}
+
+    def grid(self):
+        for indices in itertools.product(*(range(len(v)) for v in self.values)):
+            params = self.params(indices)
+            if self.valid(params):
+                yield indices, params
+
+    def sample(self, rng, n, seen=None, max_tries=None) -> list:
+        """Up to `n` distinct valid index tuples not in `seen`, uniformly at random."""
+        seen = set() if seen is None else seen
+        if self.size <= 4 * n:
+            # Small space: shuffle the enumerated grid instead of rejection sampling
+            pool = [i for i, _ in self.grid() if i not in seen]
+            out = [pool[j] for j in rng.permutation(len(pool))[:n]]
+            seen.update(out)
+            return out
+        out = []
+        tries = 0
+        max_tries = max_tries or 50 * n + 100
+        while len(out) < n and tries < max_tries:
+            tries += 1
+            indices = tuple(int(rng.integers(len(v))) for v in self.values)
+            if indices in seen or not self.valid(self.params(indices)):
+                continue
+            seen.add(indices)
+            out.append(indices)
+        return out
+
+
+def space_warmup(strategy_class, space: SearchSpace, limit=1000) -> int:
+    """Largest warm-up over the space (all combinations when small, else the
+    per-parameter maxima plus a sample), so one fetch serves every evaluation."""
+    warmup_for = getattr(strategy_class, "warmup_for", None)
+    if warmup_for is None:
+        return 0
+    if not space.keys:
+        return warmup_for()
+    if space.size <= limit:
+        candidates = [p for _, p in space.grid()]
+    else:
+        rng = np.random.default_rng(0)
+        highest = {k: max(v) if all(isinstance(x, (int, float)) for x in v) else v[0]
+                   for k, v in zip(space.keys, space.values)}
+        candidates = [highest] + [space.params(i) for i in space.sample(rng, 200)]
+    return max((warmup_for(**p) for p in candidates), default=0)
+
+
+# --- EVALUATION ---
+class Evaluator:
+    """Scores parameter sets of one strategy on one frame and records the history.
+
+    `fraction` < 1 scores on the first part of the traded range only; every
+    strategy indicator is causal, so a prefix of the frame gives the same
+    signals as the full frame over that prefix.
+
+    With a `ledger` (optimizer_ledger.Ledger) results already recorded for
+    this symbol/interval/window are reused, so a re-run with the same seed
+    replays the search and only computes what an interrupted run missed.
+    """
+
+    def __init__(self, strategy_class, df, start=None, objective="sharpe", fee=TRADING_FEE, slippage=SLIPPAGE,
+                 ledger=None, symbol=None, interval=None, run_id=None):
+        self.strategy_class = strategy_class
+        self.df = df
+        self.start = start
+        self.objective = objective_fn(objective)
+        self.fee = fee
+        self.slippage = slippage
+        self.first = 0 if start is None else int(np.searchsorted(df.index.values, np.datetime64(pd.Timestamp(start))))
+        self.ledger = ledger
+        self.symbol = symbol
+        self.interval = interval
+        self.run_id = run_id
+        self.evaluations = 0
+        self.reused = 0
+        self.history = []
+
+    def __call__(self, params_list, fraction=1.0) -> list[tuple[float, dict]]:
+        if not params_list:
+            return []
+        n_trade = len(self.df) - self.first
+        end = len(self.df) if fraction >= 1 else self.first + max(2, int(math.ceil(fraction * n_trade)))
+        df = self.df.iloc[:end]
+        specs = [(self.strategy_class, p) for p in params_list]
+        if self.ledger is not None:
+            results, reused = self.ledger.evaluate(df, specs, self.symbol, self.interval, self.start, fee=self.fee,
+                                                   slippage=self.slippage, run_id=self.run_id,
+                                                   partial=fraction < 1)
+            self.reused += reused
+        else:
+            results = evaluate_strategies(df, specs, start=self.start, fee=self.fee, slippage=self.slippage,
+                                          interval=self.interval, metrics=BASE_METRICS)
+        self.evaluations += len(params_list)
+        scored = []
+        for params, stats in zip(params_list, results):
+            score = self.objective(stats)
+            if not math.isfinite(score):
+                score = -math.inf
+            self.history.append({"params": params, "fraction": fraction, "score": score, "stats": stats})
+            scored.append((score, stats))
+        return scored
+
+
+# --- SEARCH METHODS ---
+def grid_search(space: SearchSpace, evaluate: Evaluator, budget, rng=None) -> list:
+    """Full-window (score, params, stats) for the grid, in order, up to `budget` combinations."""
+    params_list = [p for _, p in itertools.islice(space.grid(), budget)]
+    return [(s, p, st) for p, (s, st) in zip(params_list, evaluate(params_list))]
+
+
+def random_search(space: SearchSpace, evaluate: Evaluator, budget, rng) -> list:
+    params_list = [space.params(i) for i in space.sample(rng, budget)]
+    return [(s, p, st) for p, (s, st) in zip(params_list, evaluate(params_list))]
+
+
+def halving_search(space: SearchSpace, evaluate: Evaluator, budget, rng,
+                   eta=HALVING_ETA, min_fraction=HALVING_MIN_FRACTION) -> list:
+    """Successive halving on growing date windows.
+
+    Rounds use windows min_fraction, min_fraction*eta, ..., 1 of the range and
+    keep the best 1/eta each time. The first round's size is chosen so the
+    evaluations of all rounds add up to at most `budget`.
+    """
+    rounds = max(1, int(math.floor(math.log(1 / min_fraction, eta) + 1e-9)) + 1)
+    n0 = int(budget / sum(eta ** -r for r in range(rounds)))
+    candidates = [space.params(i) for i in space.sample(rng, max(n0, 1))]
+    # A small space may run out before the budget does; shorten the ladder to fit
+    while rounds > 1 and len(candidates) < eta ** (rounds - 1):
+        rounds -= 1
+    results = []
+    for r in range(rounds):
+        fraction = float(eta) ** -(rounds - 1 - r)
+        scored = evaluate(candidates, fraction=fraction)
+        ranked = sorted(zip(scored, candidates), key=lambda x: x[0][0], reverse=True)
+        if r == rounds - 1:
+            results = [(s, p, st) for (s, st), p in ranked]
+            break
+        keep = max(1, len(candidates) // eta)
+        candidates = [p for _, p in ranked[:keep]]
+    return results
+
+
+def _tpe_proposals(space: SearchSpace, observed, rng, n, seen) -> list:
+    """Indices maximising l(x)/g(x), with per-parameter categorical densities
+    estimated from the best TPE_GAMMA of `observed` (l) and the rest (g)."""
+    ranked = sorted(observed, key=lambda x: x[0], reverse=True)
+    n_good = max(1, int(math.ceil(TPE_GAMMA * len(ranked))))
+    good, bad = ranked[:n_good], ranked[n_good:]
+    l_probs, g_probs = [], []
+    for d, vals in enumerate(space.values):
+        # Laplace-smoothed counts so unseen values keep a chance
+        l_counts = np.ones(len(vals))
+        g_counts = np.ones(len(vals))
+        for _, idx in good:
+            l_counts[idx[d]] += 1
+        for _, idx in bad:
+            g_counts[idx[d]] += 1
+        l_probs.append(l_counts / l_counts.sum())
+        g_probs.append(g_counts / g_counts.sum())
+
+    proposals = []
+    for _ in range(n):
+        best, best_ratio = None, -math.inf
+        for _ in range(TPE_CANDIDATES):
+            idx = tuple(int(rng.choice(len(p), p=p)) for p in l_probs)
+            if idx in seen or any(idx == p for p in proposals) or not space.valid(space.params(idx)):
+                continue
+            ratio = sum(math.log(l_probs[d][i]) - math.log(g_probs[d][i]) for d, i in enumerate(idx))
+            if ratio > best_ratio:
+                best, best_ratio = idx, ratio
+        if best is None:
+            # Densities collapsed onto seen points; fall back to a uniform draw
+            fallback = space.sample(rng, 1, seen=set(seen) | set(proposals))
+            if not fallback:
+                break
+            best = fallback[0]
+        proposals.append(best)
+    return proposals
+
+
+def tpe_search(space: SearchSpace, evaluate: Evaluator, budget, rng, n_startup=None) -> list:
+    n_startup = n_startup or max(5, budget // 5)
+    seen = set()
+    observed = []  # (score, indices)
+    results = []
+
+    def run(indices_list):
+        params_list = [space.params(i) for i in indices_list]
+        for idx, p, (s, st) in zip(indices_list, params_list, evaluate(params_list)):
+            observed.append((s, idx))
+            results.append((s, p, st))
+
+    run(space.sample(rng, min(n_startup, budget), seen=seen))
+    while len(observed) < budget:
+        batch = _tpe_proposals(space, observed, rng, min(TPE_BATCH, budget - len(observed)), seen)
+        if not batch:
+            break
+        seen.update(batch)
+        run(batch)
+    return sorted(results, key=lambda x: x[0], reverse=True)
+
+
+SEARCH_METHODS = {
+    "grid": grid_search,
+    "random": random_search,
+    "halving": halving_search,
+    "tpe": tpe_search,
+}
+
+
+def search(strategy_class, df, space: SearchSpace, method="grid", budget=None, objective="sharpe",
+           start=None, fee=TRADING_FEE, slippage=SLIPPAGE, seed=None,
+           ledger=None, symbol=None, interval=None, run_id=None) -> dict:
+    """Run one search and return the best parameters with their full-window stats.
+
+    Result keys: params, score, stats, evaluations, reused, method, objective, history.
+    `ledger`, `symbol` and `interval` enable reuse/recording of evaluations.
+    """
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"Unknown search method '{method}', expected one of {sorted(SEARCH_METHODS)}.")
+    if not space.keys:
+        method, budget = "grid", 1  # defaults only
+    if budget is None:
+        budget = space.size if method == "grid" else DEFAULT_BUDGET
+    budget = int(budget)
+    if budget < 1:
+        raise ValueError("budget must be >= 1")
+    if ledger is not None and (symbol is None or interval is None):
+        raise ValueError("symbol and interval are required with a ledger")
+    evaluate = Evaluator(strategy_class, df, start=start, objective=objective, fee=fee, slippage=slippage,
+                         ledger=ledger, symbol=symbol, interval=interval, run_id=run_id)
+    rng = np.random.default_rng(seed)
+    with timer(f"optimizer.search.{method}"):
+        results = SEARCH_METHODS[method](space, evaluate, budget, rng)
+    if not results:
+        raise ValueError("Search space has no valid parameter combination.")
+    score, params, stats = max(results, key=lambda x: x[0])
+    return {
+        "params": params,
+        "score": score,
+        "stats": stats,
+        "evaluations": evaluate.evaluations,
+        "reused": evaluate.reused,
+        "method": method,
+        "objective": objective,
+        "history": evaluate.history,
+    }
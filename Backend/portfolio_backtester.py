@@ -0,0 +1,261 @@
+# portfolio_backtester.py
+"""Backtest one strategy across many symbols sharing one pool of capital.
+
+Symbols are aligned on the union of their candle timestamps into (T x N)
+arrays: close prices as float32 and signals as int8 (forward-filled prices
+over gaps; flat before a symbol's first candle). Each symbol is a sleeve
+traded with the Backtester's rules (evaluator.simulate); sleeves are
+simulated a block of columns at a time and folded into the portfolio curve,
+so memory stays at the (T x N) inputs plus a (T x block) work area.
+
+Allocation rules:
+  equal    1/N of capital per symbol
+  weights  fixed weights per symbol (any unallocated remainder stays in cash)
+  active   capital split equally over the symbols holding a position on
+           each candle (idle capital in cash), optionally capped by max_weight
+
+`equal` and `weights` let sleeves drift (like separate accounts, as
+MultiCoinPaperTrader pools them) unless `rebalance` is set to a number of
+candles. Rebalancing costs are not charged.
+"""
+from __future__ import annotations
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from evaluator import (build_signals, simulate, summarize, fetch_candles, max_warmup,
+                       INITIAL_BALANCE, TRADING_FEE, SLIPPAGE)
+from strategy_loader import load_strategy_class
+from stats import equity_stats, BASE_METRICS
+
+# Symbols simulated together; bounds the (T x block) float64 work arrays
+BLOCK_SIZE = 16
+ALLOCATIONS = ("equal", "weights", "active")
+
+
+def align(frames: dict, start=None):
+    """(index, close float32 (T x N), signal int8 (T x N)) on the union timeline from `start`.
+
+    `frames` maps symbol -> (DatetimeIndex, close array, signal array).
+    """
+    symbols = list(frames)
+    index = pd.DatetimeIndex([])
+    for idx, _, _ in frames.values():
+        index = index.union(idx)
+    if start is not None:
+        index = index[index >= pd.Timestamp(start)]
+    close = np.empty((len(index), len(symbols)), dtype=np.float32)
+    signal = np.zeros((len(index), len(symbols)), dtype=np.int8)
+    for j, sym in enumerate(symbols):
+        idx, c, s = frames[sym]
+        pos = index.get_indexer(idx)
+        keep = pos >= 0
+        pos, c, s = pos[keep], np.asarray(c)[keep], np.asarray(s)[keep]
+        if len(pos) == 0:
+            close[:, j] = np.nan
+            continue
+        col = np.full(len(index), np.nan, dtype=np.float32)
+        col[pos] = c
+        # Forward-fill gaps; before the first candle use the first price (sleeve is flat there)
+        filled = np.where(np.isnan(col), 0, np.arange(len(col)))
+        np.maximum.accumulate(filled, out=filled)
+        col = col[filled]
+        col[:pos[0]] = c[0]
+        close[:, j] = col
+        signal[pos, j] = s
+    return index, close, signal
+
+
+def _positions(signal) -> np.ndarray:
+    """Position held after each candle: last non-zero signal (as in evaluator.simulate)."""
+    rows = np.arange(len(signal))[:, None]
+    last = np.where(signal != 0, rows, -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return np.where(last >= 0, np.take_along_axis(signal, np.maximum(last, 0), axis=0), 0).astype(np.int8)
+
+
+def _active(position) -> np.ndarray:
+    """Sleeves exposed during each candle (held before it or entered on it)."""
+    held_before = np.zeros_like(position, dtype=bool)
+    held_before[1:] = position[:-1] != 0
+    return held_before | (position != 0)
+
+
+class PortfolioBacktester:
+    def __init__(self, symbols, interval, strategy_class, start, end, strategy_params=None,
+                 allocation="equal", weights: dict | None = None, rebalance: int | None = None,
+                 max_weight: float | None = None, fee=TRADING_FEE, slippage=SLIPPAGE,
+                 initial_balance=None, block_size=BLOCK_SIZE):
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f"Unknown allocation '{allocation}', expected one of {ALLOCATIONS}.")
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.strategy_class = strategy_class
+        self.strategy_params = strategy_params or {}
+        self.start = pd.to_datetime(start)
+        self.end = pd.to_datetime(end)
+        self.allocation = allocation
+        self.weights = weights
+        self.rebalance = int(rebalance) if rebalance else None
+        self.max_weight = max_weight
+        self.fee = fee
+        self.slippage = slippage
+        # Default: INITIAL_BALANCE per traded symbol, like MultiCoinPaperTrader (set by run_aligned)
+        self._initial_balance = float(initial_balance) if initial_balance else None
+        self.initial_balance = self._initial_balance or float(INITIAL_BALANCE * len(self.symbols))
+        self.block_size = int(block_size)
+        self.logs_dir = f"logs/portfolio/{strategy_class.__name__}"
+        self.index = None
+        self.equity = None
+        self.symbol_stats = {}
+
+    # --- DATA ---
+    def fetch_data(self) -> dict:
+        """Fetch each symbol (with warm-up), compute its signals and keep only close + signal."""
+        warmup = max_warmup([(self.strategy_class, self.strategy_params)])
+        frames = {}
+        for sym in self.symbols:
+            try:
+                df = fetch_candles(sym, self.interval, self.start, self.end, warmup)
+            except ValueError:
+                print(f"⚠️ No data for {sym}, skipping.")
+                continue
+            signal = build_signals(df, [(self.strategy_class, self.strategy_params)])[:, 0]
+            frames[sym] = (df.index, df["close"].to_numpy(dtype=np.float32), signal)
+        if not frames:
+            raise ValueError("No data fetched for any symbol.")
+        return frames
+
+    def target_weights(self, symbols) -> np.ndarray:
+        if self.allocation == "weights":
+            if not self.weights:
+                raise ValueError("allocation='weights' needs a weights mapping.")
+            w = np.array([float(self.weights.get(s, 0.0)) for s in symbols])
+            total = w.sum()
+            return w / total if total > 1 else w
+        return np.full(len(symbols), 1.0 / len(symbols))
+
+    # --- SIMULATION ---
+    def run_aligned(self, index, close, signal, symbols=None):
+        """Portfolio equity for pre-aligned (T x N) close/signal arrays."""
+        symbols = list(symbols or self.symbols)
+        T, N = close.shape
+        if T == 0:
+            raise ValueError("No data in the requested range.")
+        weights = self.target_weights(symbols)
+        self.initial_balance = self._initial_balance or float(INITIAL_BALANCE * N)
+
+        if self.allocation == "active":
+            # First pass: how many sleeves are exposed on each candle
+            n_active = np.zeros(T)
+            for b in range(0, N, self.block_size):
+                n_active += _active(_positions(signal[:, b:b + self.block_size])).sum(axis=1)
+            denom = np.maximum(n_active, 1.0)
+            if self.max_weight:
+                denom = np.maximum(denom, 1.0 / self.max_weight)
+            port_return = np.zeros(T)
+        else:
+            # Segment id per candle; sleeves compound within a segment and reset to target weights after it
+            seg = np.arange(T) // self.rebalance if self.rebalance else np.zeros(T, dtype=np.int64)
+            seg_start = np.r_[True, seg[1:] != seg[:-1]]
+            mix = np.full(T, 1.0 - weights.sum())  # cash part
+
+        self.symbol_stats = {}
+        for b in range(0, N, self.block_size):
+            cols = slice(b, min(b + self.block_size, N))
+            sim = simulate(close[:, cols].astype(np.float64), signal[:, cols], fee=self.fee,
+                           slippage=self.slippage, initial_balance=INITIAL_BALANCE)
+            for sym, stats in zip(symbols[cols], summarize(sim, interval=self.interval, metrics=BASE_METRICS)):
+                self.symbol_stats[sym] = stats
+            growth = sim["equity"] / INITIAL_BALANCE
+            growth[-1] = sim["final"] / INITIAL_BALANCE  # positions are closed on the last candle
+            if self.allocation == "active":
+                prev = np.vstack([np.ones((1, growth.shape[1])), growth[:-1]])
+                sleeve_return = growth / prev - 1
+                port_return += (sleeve_return * _active(_positions(signal[:, cols]))).sum(axis=1) / denom
+            else:
+                # Growth relative to the start of each segment
+                base = np.vstack([np.ones((1, growth.shape[1])), growth[:-1]])[seg_start]
+                mix += (growth / base[seg] * weights[cols]).sum(axis=1)
+            del sim, growth
+
+        if self.allocation == "active":
+            curve = self.initial_balance * np.cumprod(1 + port_return)
+        else:
+            seg_end_mix = mix[np.r_[seg_start[1:], True]]
+            carry = np.r_[1.0, np.cumprod(seg_end_mix)[:-1]]
+            curve = self.initial_balance * carry[seg] * mix
+        self.index = index
+        self.equity = pd.Series(curve, index=index, name="equity")
+        return self.equity
+
+    def run(self):
+        frames = self.fetch_data()
+        symbols = list(frames)
+        index, close, signal = align(frames, start=self.start)
+        # Symbols with no candles in the range after warm-up are dropped as well
+        traded = ~np.isnan(close).all(axis=0)
+        for sym in np.array(symbols)[~traded]:
+            print(f"⚠️ No data for {sym} in range, skipping.")
+        if not traded.all():
+            symbols = [sym for sym, keep in zip(symbols, traded) if keep]
+            close, signal = close[:, traded], signal[:, traded]
+        if not symbols:
+            raise ValueError("No data in the requested range.")
+        self.run_aligned(index, close, signal, symbols=symbols)
+        self.save_logs()
+        self.print_summary()
+        return self.equity
+
+    # --- RESULTS ---
+    def calculate_stats(self) -> dict:
+        metrics = BASE_METRICS + ("Sortino Ratio", "Calmar Ratio", "Max Drawdown Duration (bars)")
+        if self.equity is None or self.equity.empty:
+            return {**{m: 0 for m in metrics}, "Final Balance": self.initial_balance}
+        # The curve starts from the initial capital, so drawdowns are measured against it too
+        stats = equity_stats(np.r_[self.initial_balance, self.equity.to_numpy()],
+                             initial_balance=self.initial_balance, interval=self.interval, metrics=metrics)
+        traded = [s for s in self.symbol_stats.values() if s["Total Return (%)"] != 0 or s["Win Rate (%)"] != 0]
+        stats["Win Rate (%)"] = float(np.mean([s["Win Rate (%)"] for s in traded])) if traded else 0
+        return stats
+
+    def save_logs(self):
+        os.makedirs(self.logs_dir, exist_ok=True)
+        self.equity.rename_axis("time").to_csv(f"{self.logs_dir}/equity.csv")
+        pd.DataFrame.from_dict(self.symbol_stats, orient="index").rename_axis("symbol").to_csv(
+            f"{self.logs_dir}/symbols.csv")
+
+    def print_summary(self):
+        print(f"\n📊 Portfolio backtest: {self.strategy_class.__name__} on {len(self.symbol_stats)} symbols "
+              f"({self.allocation} allocation)")
+        for key, value in self.calculate_stats().items():
+            print(f"{key}: {value:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-symbol portfolio backtester")
+    parser.add_argument("--symbols", type=str, required=True, help="Comma-separated, e.g. BTCUSDT,ETHUSDT")
+    parser.add_argument("--interval", type=str, default="15m")
+    parser.add_argument("--strategy", type=str, required=True)
+    parser.add_argument("--start", type=str, required=True)
+    parser.add_argument("--end", type=str, required=True)
+    parser.add_argument("--allocation", type=str, default="equal", choices=ALLOCATIONS)
+    parser.add_argument("--weights", type=str, default=None, help="SYMBOL=weight,... for --allocation weights")
+    parser.add_argument("--rebalance", type=int, default=None, help="Rebalance every N candles")
+    parser.add_argument("--max-weight", type=float, default=None)
+    parser.add_argument("--fee", type=float, default=TRADING_FEE)
+    parser.add_argument("--slippage", type=float, default=SLIPPAGE)
+    args = parser.parse_args()
+
+    weights = None
+    if args.weights:
+        weights = {k.strip().upper(): float(v) for k, v in (item.split("=") for item in args.weights.split(","))}
+    backtester = PortfolioBacktester(args.symbols.split(","), args.interval, load_strategy_class(args.strategy),
+                                     args.start, args.end, allocation=args.allocation, weights=weights,
+                                     rebalance=args.rebalance, max_weight=args.max_weight,
+                                     fee=args.fee, slippage=args.slippage)
+    backtester.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# query_plans.py
+"""Check that the API's hot queries are answered from indexes.
+
+Each query below is built the way api.py builds it and EXPLAINed on the
+app's database (DATABASE_URL) or, with --scratch, on a fresh migrated SQLite
+file. A query fails when its plan scans a whole table, sorts in a temporary
+b-tree for ORDER BY, or does not use the index it is meant to use.
+
+On Postgres sequential scans are switched off for the EXPLAIN, so the check
+shows the index is usable whatever the table sizes (the planner rightly
+prefers a scan of a small table).
+
+    python query_plans.py --scratch
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+
+STRATEGY, SYMBOL = "RSI_EMA", "BTCUSDT"
+
+
+def queries(api) -> list:
+    """(name, statement, index it should use) for the API's queries on the trading tables."""
+    Trade, Position, EquitySnapshot, PnlSummary = api.Trade, api.Position, api.EquitySnapshot, api.PnlSummary
+    EquityRollup = api.EquityRollup
+    snaps = EquitySnapshot.query.filter_by(strategy=STRATEGY)
+    hourly = EquityRollup.query.filter_by(strategy=STRATEGY, resolution="1h")
+    first, last = dt.datetime(2024, 1, 1), dt.datetime(2025, 1, 1)
+    return [
+        ("equity: strategy's snapshots by time",
+         snaps.order_by(EquitySnapshot.time.asc()).statement, "ix_equity_snapshot_strategy_time"),
+        ("equity: snapshots in a range",
+         snaps.filter(EquitySnapshot.time >= first, EquitySnapshot.time <= last)
+         .order_by(EquitySnapshot.time.asc()).statement, "ix_equity_snapshot_strategy_time"),
+        ("equity: rollup buckets in a range",
+         hourly.filter(EquityRollup.bucket >= first, EquityRollup.bucket <= last)
+         .order_by(EquityRollup.bucket.asc()).statement, "sqlite_autoindex_equity_rollup_1"),
+        ("equity: points per tier in a range",
+         hourly.filter(EquityRollup.bucket > first, EquityRollup.bucket <= last).statement.with_only_columns(
+             api.db.func.count(), api.db.func.sum(EquityRollup.points)), "sqlite_autoindex_equity_rollup_1"),
+        ("pnl: summary row", PnlSummary.query.filter_by(strategy=STRATEGY).statement, "sqlite_autoindex_pnl_summary_1"),
+        ("pnl summary: first snapshot",
+         snaps.order_by(EquitySnapshot.time.asc(), EquitySnapshot.id.asc()).limit(1).statement,
+         "ix_equity_snapshot_strategy_time"),
+        ("pnl summary: last snapshot",
+         snaps.order_by(EquitySnapshot.time.desc(), EquitySnapshot.id.desc()).limit(1).statement,
+         "ix_equity_snapshot_strategy_time"),
+        ("pnl summary: snapshot 24h before the last",
+         snaps.filter(EquitySnapshot.time <= last - api.PNL_WINDOW)
+         .order_by(EquitySnapshot.time.desc(), EquitySnapshot.id.desc()).limit(1).statement,
+         "ix_equity_snapshot_strategy_time"),
+        ("pnl summary: trade count", Trade.query.filter_by(strategy=STRATEGY).statement.with_only_columns(
+            api.db.func.count()), "ix_trade_strategy_time"),
+        ("pnl summary: open positions", Position.query.filter_by(strategy=STRATEGY).statement.with_only_columns(
+            api.db.func.count()), "ix_position_strategy_symbol_opened_at"),
+        ("trades: strategy's latest",
+         Trade.query.filter_by(strategy=STRATEGY).order_by(Trade.time.desc()).limit(200).statement,
+         "ix_trade_strategy_time"),
+        ("trades: strategy and symbol's latest",
+         Trade.query.filter_by(strategy=STRATEGY).filter_by(symbol=SYMBOL).order_by(Trade.time.desc())
+         .limit(200).statement, "ix_trade_strategy_symbol_time"),
+        ("backtest results: strategy's latest",
+         api.db.session.query(Trade).filter(Trade.strategy == STRATEGY).order_by(Trade.time.desc())
+         .limit(1000).statement, "ix_trade_strategy_time"),
+        ("backtest results: latest of all", api.db.session.query(Trade).order_by(Trade.time.desc())
+         .limit(1000).statement, "ix_trade_time"),
+        ("positions: latest", Position.query.order_by(Position.opened_at.desc()).limit(100).statement,
+         "ix_position_opened_at"),
+        ("ingest: delete strategy's snapshots",
+         api.db.delete(EquitySnapshot).where(EquitySnapshot.strategy == STRATEGY), "ix_equity_snapshot_strategy_time"),
+        ("ingest: delete strategy's rollups",
+         api.db.delete(EquityRollup).where(EquityRollup.strategy == STRATEGY), "sqlite_autoindex_equity_rollup_1"),
+        ("ingest: delete strategy's trades",
+         api.db.delete(Trade).where(Trade.strategy == STRATEGY), "ix_trade_strategy_time"),
+    ]
+
+
+def explain(connection, statement) -> list[str]:
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        return [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    return [row[0] for row in connection.exec_driver_sql("EXPLAIN " + sql)]
+
+
+def problems(plan: list[str], index: str, dialect: str) -> list[str]:
+    text = "\n".join(plan)
+    found = []
+    if dialect == "sqlite":
+        if index.startswith("sqlite_autoindex"):
+            # Primary-key lookups show as the table's own index or its rowid
+            index_used = "USING INDEX" in text or "PRIMARY KEY" in text
+        else:
+            index_used = index in text
+        if any(line.startswith("SCAN") and "INDEX" not in line for line in plan):
+            found.append("full table scan")
+        if "TEMP B-TREE" in text:
+            found.append("sorts in a temporary b-tree")
+    else:
+        index_used = index in text or ("pkey" in text and index.startswith("sqlite_autoindex"))
+        if "Seq Scan" in text:
+            found.append("sequential scan")
+        if "Sort" in text.replace("Sort Key", ""):
+            found.append("sorts")
+    if not index_used:
+        found.append(f"does not use {index}")
+    return found
+
+
+def check(api) -> bool:
+    """Print every plan; True when all queries use their indexes."""
+    ok = True
+    with api.app.app_context():
+        with api.db.engine.connect() as connection:
+            dialect = connection.dialect.name
+            for name, statement, index in queries(api):
+                with connection.begin():
+                    plan = explain(connection, statement)
+                issues = problems(plan, index, dialect)
+                ok &= not issues
+                print(f"{'✅' if not issues else '❌'} {name}" + (f": {', '.join(issues)}" if issues else ""))
+                for line in plan:
+                    print(f"     {line}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the API's queries use indexes (EXPLAIN)")
+    parser.add_argument("--scratch", action="store_true",
+                        help="Check a fresh migrated SQLite database instead of DATABASE_URL")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="query-plans-") as workdir:
+        if args.scratch:
+            os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "plans.db")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        import api
+        api.init_db()
+        ok = check(api)
+    print("\n✅ All queries use their indexes" if ok else "\n❌ Some queries do not use their indexes")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# robustness.py
+"""Monte Carlo robustness of a backtest's trade sequence.
+
+A backtest is one path through its trades. Resampling the trade PnLs
+(bootstrap, with replacement) or reordering them (shuffle) gives thousands of
+alternative paths; the spread of their returns and drawdowns shows how much
+of the result is luck of the ordering.
+
+All paths are simulated as one (simulations x trades) NumPy matrix, processed
+in row blocks to bound memory. Each trade compounds the balance by
+(1 + pnl - fee), exactly as Backtester.run does.
+
+Note that shuffling never changes the final return (compounding is
+order-independent), only the path: use it for drawdown and ruin, and the
+bootstrap for return intervals.
+"""
+import numpy as np
+from evaluator import INITIAL_BALANCE, TRADING_FEE
+
+DEFAULT_SIMULATIONS = 10_000
+# Request limits for the API (paths simulated, bootstrap path length)
+MAX_SIMULATIONS = 100_000
+MAX_TRADES = 10_000
+# Ruin = losing this fraction of the starting balance
+DEFAULT_RUIN_LEVEL = 0.5
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+# Upper bound on the matrix cells simulated at once (~16 MB of float64)
+BLOCK_CELLS = 2_000_000
+METHODS = ("bootstrap", "shuffle")
+
+
+def trade_pnls(trades) -> np.ndarray:
+    """PnL fractions from Backtester._consolidate_trades() output (or any iterable)."""
+    if hasattr(trades, "columns"):
+        trades = trades["pnl"] if "pnl" in trades.columns else []
+    pnl = np.asarray(trades, dtype=np.float64).ravel()
+    return pnl[~np.isnan(pnl)]
+
+
+def _paths(pnl, rows, method, rng, n_trades):
+    if method == "bootstrap":
+        return pnl[rng.integers(0, len(pnl), size=(rows, n_trades))]
+    return rng.permuted(np.broadcast_to(pnl, (rows, len(pnl))), axis=1)
+
+
+def simulate_paths(pnl, n_sims=DEFAULT_SIMULATIONS, method="bootstrap", fee=TRADING_FEE,
+                   initial_balance=INITIAL_BALANCE, n_trades=None, seed=None):
+    """Final balance, max drawdown (%) and lowest equity for each simulated path.
+
+    `n_trades` sets the bootstrap path length (default: as many trades as the backtest).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}.")
+    pnl = trade_pnls(pnl)
+    n_sims = int(n_sims)
+    n_trades = int(n_trades or len(pnl)) if method == "bootstrap" else len(pnl)
+    final = np.full(n_sims, float(initial_balance))
+    max_dd = np.zeros(n_sims)
+    lowest = np.full(n_sims, float(initial_balance))
+    if len(pnl) == 0 or n_trades == 0 or n_sims <= 0:
+        return final, max_dd, lowest
+
+    rng = np.random.default_rng(seed)
+    block = max(1, BLOCK_CELLS // n_trades)
+    for r0 in range(0, n_sims, block):
+        rows = min(block, n_sims - r0)
+        equity = 1 + _paths(pnl, rows, method, rng, n_trades) - fee
+        np.cumprod(equity, axis=1, out=equity)
+        equity *= initial_balance
+        # Peak includes the starting balance, so an immediate loss counts as drawdown
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, initial_balance, out=peak)
+        final[r0:r0 + rows] = equity[:, -1]
+        max_dd[r0:r0 + rows] = (equity / peak - 1).min(axis=1) * 100
+        lowest[r0:r0 + rows] = np.minimum(equity.min(axis=1), initial_balance)
+    return final, max_dd, lowest
+
+
+def _distribution(values, percentiles) -> dict:
+    out = {f"p{p:g}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+    out["mean"] = float(values.mean())
+    out["std"] = float(values.std())
+    return out
+
+
+def monte_carlo(pnl, n_sims=DEFAULT_SIMULATIONS, method="bootstrap", fee=TRADING_FEE,
+                initial_balance=INITIAL_BALANCE, ruin_level=DEFAULT_RUIN_LEVEL, confidence=0.95,
+                percentiles=DEFAULT_PERCENTILES, n_trades=None, seed=None) -> dict:
+    """Return/drawdown distributions, confidence intervals and risk of ruin.
+
+    `ruin_level` is the fraction of the starting balance treated as ruin
+    (0.5 = losing half); `confidence` sets the two-sided interval width.
+    """
+    pnl = trade_pnls(pnl)
+    final, max_dd, lowest = simulate_paths(pnl, n_sims=n_sims, method=method, fee=fee,
+                                           initial_balance=initial_balance, n_trades=n_trades, seed=seed)
+    total_return = (final - initial_balance) / initial_balance * 100
+    # The backtest's own path, for comparison with the distribution
+    actual = initial_balance * np.cumprod(1 + pnl - fee) if len(pnl) else np.array([float(initial_balance)])
+    actual_peak = np.maximum(np.maximum.accumulate(actual), initial_balance)
+    tail = (1 - confidence) / 2 * 100
+    ci = lambda v: [float(x) for x in np.percentile(v, [tail, 100 - tail])]
+    return {
+        "method": method,
+        "simulations": int(n_sims),
+        "trades": int(len(pnl)),
+        "path_length": int(n_trades or len(pnl)) if method == "bootstrap" else int(len(pnl)),
+        "actual": {
+            "Total Return (%)": float((actual[-1] - initial_balance) / initial_balance * 100),
+            "Max Drawdown (%)": float(min((actual / actual_peak - 1).min() * 100, 0.0)),
+        },
+        "total_return": {**_distribution(total_return, percentiles), "ci": ci(total_return)},
+        "max_drawdown": {**_distribution(max_dd, percentiles), "ci": ci(max_dd)},
+        "confidence": float(confidence),
+        "prob_loss": float(np.mean(final < initial_balance)),
+        "risk_of_ruin": float(np.mean(lowest <= initial_balance * (1 - ruin_level))),
+        "ruin_level": float(ruin_level),
+    }
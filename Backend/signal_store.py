@@ -0,0 +1,183 @@
+# signal_store.py
+"""Persistent cache of strategy signal arrays.
+
+Signals depend only on the strategy code, its parameters and the candles, so
+re-running a backtest over the same data (or only changing fees/slippage)
+can reuse them instead of calling generate_signals() again.
+
+Entries are keyed by (strategy, params, symbol, interval, data hash), stored
+run-length encoded as int8 values + int32 run lengths, and evicted
+least-recently-used once the directory exceeds its disk budget (down to
+EVICT_TO of it). Writes keep a running size total, so the directory is only
+scanned when the total crosses the budget or every RESCAN_PUTS writes (other
+processes share it).
+"""
+from __future__ import annotations
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import numpy as np
+
+SIGNAL_CACHE_DIR = os.getenv("SIGNAL_CACHE_DIR", os.path.join("logs", "cache", "signals"))
+SIGNAL_CACHE_MB = float(os.getenv("SIGNAL_CACHE_MB", "256"))
+SIGNAL_CACHE_ENABLED = os.getenv("SIGNAL_CACHE_ENABLED", "1") not in ("0", "false", "False")
+RESCAN_PUTS = 64
+EVICT_TO = 0.9  # eviction frees space down to this fraction of the budget
+
+_fingerprints: dict[type, str] = {}
+
+
+# --- KEYS ---
+def data_hash(df) -> str:
+    """Content hash of the candles (timestamps + OHLCV) a signal was computed on."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(df.index.asi8 if hasattr(df.index, "asi8") else df.index.to_numpy()).tobytes())
+    for col in ("open", "high", "low", "close", "volume"):
+        if col in df.columns:
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def _module_source(module) -> str:
+    try:
+        return inspect.getsource(module)
+    except (OSError, TypeError):
+        return ""
+
+
+def strategy_fingerprint(strategy_class) -> str:
+    """Class name plus a hash of its module and the shared indicator code,
+    so code edits invalidate entries."""
+    fp = _fingerprints.get(strategy_class)
+    if fp is None:
+        from strategy import indicators
+        source = _module_source(inspect.getmodule(strategy_class)) + _module_source(indicators)
+        digest = hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+        fp = f"{strategy_class.__module__}.{strategy_class.__qualname__}:{digest}"
+        _fingerprints[strategy_class] = fp
+    return fp
+
+
+def resolved_params(strategy_class, params: dict | None) -> dict:
+    """Params merged over the constructor defaults, so {} and explicit defaults share a key."""
+    resolved = {}
+    try:
+        for name, p in inspect.signature(strategy_class.__init__).parameters.items():
+            if name in ("self", "df") or p.default is inspect.Parameter.empty:
+                continue
+            resolved[name] = p.default
+    except (TypeError, ValueError):
+        pass
+    resolved.update(params or {})
+    return resolved
+
+
+def signal_key(strategy_class, params, symbol, interval, digest) -> str:
+    raw = json.dumps(
+        [strategy_fingerprint(strategy_class), resolved_params(strategy_class, params), symbol.upper(), interval, digest],
+        sort_keys=True, default=str,
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=20).hexdigest()
+
+
+# --- RUN-LENGTH ENCODING ---
+def rle_encode(signal):
+    signal = np.asarray(signal, dtype=np.int8)
+    if len(signal) == 0:
+        return np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int32)
+    starts = np.flatnonzero(np.r_[True, signal[1:] != signal[:-1]])
+    lengths = np.diff(np.r_[starts, len(signal)]).astype(np.int32)
+    return signal[starts], lengths
+
+
+def rle_decode(values, lengths) -> np.ndarray:
+    return np.repeat(np.asarray(values, dtype=np.int8), lengths)
+
+
+# --- STORE ---
+class SignalStore:
+    def __init__(self, root: str = SIGNAL_CACHE_DIR, budget_mb: float = SIGNAL_CACHE_MB):
+        self.root = root
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._size = None  # bytes in the directory as of the last scan, plus this process's writes since
+        self._puts = 0     # writes since the last scan
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.npz")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                signal = rle_decode(data["values"], data["lengths"])
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return signal
+
+    def put(self, key: str, signal):
+        values, lengths = rle_encode(signal)
+        path = self._path(key)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, values=values, lengths=lengths)
+                f.flush()
+                size = os.fstat(f.fileno()).st_size
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._puts += 1
+        if self._size is not None:
+            self._size += size - replaced
+        if self._size is None or self._size > self.budget_bytes or self._puts >= RESCAN_PUTS:
+            self.evict()
+
+    def evict(self):
+        """Scan the directory and drop least-recently-used entries until the store fits its budget."""
+        entries = []
+        total = 0
+        for e in os.scandir(self.root):
+            if not e.name.endswith(".npz"):
+                continue
+            st = e.stat()
+            entries.append((st.st_mtime, st.st_size, e.path))
+            total += st.st_size
+        if total > self.budget_bytes:
+            target = self.budget_bytes * EVICT_TO
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= target:
+                    break
+        self._size, self._puts = total, 0
+
+
+_default_store = None
+
+
+def default_store():
+    """Process-wide store, or None when SIGNAL_CACHE_ENABLED is off."""
+    global _default_store
+    if not SIGNAL_CACHE_ENABLED:
+        return None
+    if _default_store is None:
+        _default_store = SignalStore()
+    return _default_store
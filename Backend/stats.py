@@ -0,0 +1,220 @@
+# stats.py
+"""Performance statistics of backtest equity curves and trades.
+
+Each equity column is reduced in one vectorized pass to a few sums (return
+moments, drawdown depth and length, trade pnl totals, bars in a position)
+and the requested metrics are finished from those sums, so the evaluator
+can summarize many simulated columns at once and RunningStats can do the
+same for a curve fed in chunks.
+
+Ratios are annualized with the number of candles per year of the interval
+(markets trade around the clock); without an interval 252 periods are
+assumed, as the stats did before.
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from binance_data import INTERVAL_MS
+
+BASE_METRICS = ("Final Balance", "Total Return (%)", "Win Rate (%)", "Sharpe Ratio", "Max Drawdown (%)")
+METRICS = BASE_METRICS + ("Sortino Ratio", "Calmar Ratio", "Profit Factor", "Exposure (%)",
+                          "Average Trade (%)", "Max Drawdown Duration (bars)", "Trades")
+# Bump when a metric's definition changes, so stored results (optimizer ledger) are recomputed
+STATS_VERSION = 2
+YEAR_MS = 365 * 24 * 3600 * 1000
+DEFAULT_PERIODS = 252
+
+
+def periods_per_year(interval: str | None = None) -> float:
+    return YEAR_MS / INTERVAL_MS[interval] if interval in INTERVAL_MS else DEFAULT_PERIODS
+
+
+def infer_interval(index) -> str | None:
+    """Interval whose length matches the most common candle spacing of `index`."""
+    if len(index) < 2:
+        return None
+    steps = np.diff(pd.DatetimeIndex(index).asi8) // 1_000_000
+    values, counts = np.unique(steps, return_counts=True)
+    step = int(values[np.argmax(counts)])
+    return next((name for name, ms in INTERVAL_MS.items() if ms == step), None)
+
+
+def _needs(metrics):
+    metrics = METRICS if metrics is None else tuple(metrics)
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics {sorted(unknown)}, expected some of {list(METRICS)}.")
+    return metrics
+
+
+# --- REDUCTION ---
+def reduce_columns(curve, pnl=None, position=None, metrics=None) -> dict:
+    """Per-column sums of a (T x K) equity curve (NaN = no point), trade pnls (NaN = no trade)
+    and positions; parts only some metrics need are skipped when not requested."""
+    metrics = _needs(metrics)
+    curve = np.asarray(curve, dtype=np.float64)
+    if curve.ndim == 1:
+        curve = curve[:, None]
+    T, K = curve.shape
+    valid = ~np.isnan(curve)
+    rows = np.arange(T)[:, None]
+    last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)[-1]
+    sums = {"final": np.where(last >= 0, curve[np.maximum(last, 0), np.arange(K)], np.nan)}
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = curve[1:] / curve[:-1] - 1
+        ok = ~np.isnan(returns)
+        n = ok.sum(axis=0)
+        mean = np.where(n > 0, np.where(ok, returns, 0).sum(axis=0) / np.maximum(n, 1), 0.0)
+        dev = np.where(ok, returns - mean, 0)
+        sums.update(n=n, mean=mean, m2=(dev * dev).sum(axis=0))
+        if "Sortino Ratio" in metrics:
+            down = np.where(ok, np.minimum(returns, 0), 0)
+            sums["down2"] = (down * down).sum(axis=0)
+
+        peak = np.fmax.accumulate(np.where(valid, curve, -np.inf), axis=0)
+        drawdown = np.where(valid, curve / peak - 1, np.nan)
+    sums["max_dd"] = np.where(last >= 0, np.nanmin(np.where(valid, drawdown, 0), axis=0), 0.0)
+    if "Max Drawdown Duration (bars)" in metrics:
+        under = np.nan_to_num(drawdown) < 0
+        top = np.maximum.accumulate(np.where(under, -1, rows), axis=0)
+        sums["dd_bars"] = (rows - np.maximum(top, 0)).max(axis=0) if T else np.zeros(K, dtype=np.int64)
+
+    if pnl is not None:
+        pnl = np.asarray(pnl, dtype=np.float64).reshape(-1, K)
+        closed = ~np.isnan(pnl)
+        sums.update(closed=closed.sum(axis=0), wins=(pnl > 0).sum(axis=0),
+                    gross_profit=np.where(pnl > 0, pnl, 0).sum(axis=0),
+                    gross_loss=-np.where(pnl < 0, pnl, 0).sum(axis=0),
+                    pnl_sum=np.where(closed, pnl, 0).sum(axis=0))
+    if position is not None and "Exposure (%)" in metrics:
+        position = np.asarray(position).reshape(-1, K)
+        sums.update(held=(position != 0).sum(axis=0), bars=np.full(K, len(position)))
+    return sums
+
+
+# --- METRICS ---
+def finish(sums: dict, initial_balance, interval=None, metrics=None) -> list[dict]:
+    """Requested metrics for every column of `reduce_columns` output."""
+    metrics = _needs(metrics)
+    ppy = periods_per_year(interval)
+    n, mean = sums["n"], sums["mean"]
+    final = np.nan_to_num(sums["final"], nan=initial_balance)
+    max_dd = sums["max_dd"]
+    traded = sums["closed"] > 0 if "closed" in sums else np.ones(len(n), dtype=bool)
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        std = np.sqrt(sums["m2"] / np.maximum(n - 1, 1))
+        values = {
+            "Final Balance": final,
+            "Total Return (%)": (final - initial_balance) / initial_balance * 100,
+            "Sharpe Ratio": np.where((n > 1) & (std != 0), np.sqrt(ppy) * mean / std, 0.0),
+            "Max Drawdown (%)": max_dd * 100,
+        }
+        if "down2" in sums:
+            downside = np.sqrt(sums["down2"] / np.maximum(n, 1))
+            values["Sortino Ratio"] = np.where(downside > 0, np.sqrt(ppy) * mean / downside, 0.0)
+        if "Calmar Ratio" in metrics:
+            years = n / ppy
+            cagr = np.where((years > 0) & (final > 0),
+                            (final / initial_balance) ** (1 / np.where(years > 0, years, 1)) - 1, -1.0)
+            values["Calmar Ratio"] = np.where(max_dd < 0, cagr / -max_dd, 0.0)
+        if "closed" in sums:
+            closed = sums["closed"]
+            values["Win Rate (%)"] = np.where(closed > 0, sums["wins"] / np.maximum(closed, 1) * 100, 0.0)
+            values["Profit Factor"] = np.where(
+                sums["gross_loss"] > 0, sums["gross_profit"] / sums["gross_loss"],
+                np.where(sums["gross_profit"] > 0, np.inf, 0.0))
+            values["Average Trade (%)"] = np.where(closed > 0, sums["pnl_sum"] / np.maximum(closed, 1) * 100, 0.0)
+            values["Trades"] = closed
+        if "held" in sums:
+            values["Exposure (%)"] = sums["held"] / np.maximum(sums["bars"], 1) * 100
+        if "dd_bars" in sums:
+            values["Max Drawdown Duration (bars)"] = sums["dd_bars"]
+
+    out = []
+    for k in range(len(n)):
+        row = {}
+        for m in metrics:
+            if m == "Final Balance":
+                row[m] = float(final[k]) if traded[k] else float(initial_balance)
+            elif m in ("Trades", "Max Drawdown Duration (bars)"):
+                row[m] = int(values[m][k]) if traded[k] and m in values else 0
+            else:
+                row[m] = float(values[m][k]) if traded[k] and m in values else 0
+        out.append(row)
+    return out
+
+
+def compute_stats(curve, pnl=None, position=None, initial_balance=1000, interval=None, metrics=None) -> list[dict]:
+    """Metrics for every column of a (T x K) equity curve; see reduce_columns for the inputs."""
+    return finish(reduce_columns(curve, pnl, position, metrics), initial_balance, interval, metrics)
+
+
+def equity_stats(curve, pnl=None, position=None, initial_balance=1000, interval=None, metrics=None) -> dict:
+    """compute_stats for a single equity curve."""
+    pnl = None if pnl is None else np.asarray(pnl, dtype=np.float64).reshape(-1, 1)
+    position = None if position is None else np.asarray(position).reshape(-1, 1)
+    return compute_stats(np.asarray(curve, dtype=np.float64).reshape(-1, 1), pnl, position,
+                         initial_balance, interval, metrics)[0]
+
+
+class RunningStats:
+    """equity_stats over an equity curve and trades fed in pieces."""
+
+    def __init__(self, initial_balance=1000, interval=None):
+        self.initial_balance = initial_balance
+        self.interval = interval
+        self.last = None          # last equity point seen
+        self.peak = -np.inf
+        self.since_peak = 0       # bars since the last point at the peak
+        self.sums = {"final": np.array([np.nan]), "n": np.zeros(1, dtype=np.int64), "mean": np.zeros(1),
+                     "m2": np.zeros(1), "down2": np.zeros(1), "max_dd": np.zeros(1),
+                     "dd_bars": np.zeros(1, dtype=np.int64), "closed": np.zeros(1, dtype=np.int64),
+                     "wins": np.zeros(1, dtype=np.int64), "gross_profit": np.zeros(1), "gross_loss": np.zeros(1),
+                     "pnl_sum": np.zeros(1), "held": np.zeros(1, dtype=np.int64), "bars": np.zeros(1, dtype=np.int64)}
+
+    def add_equity(self, equity, position=None):
+        equity = np.asarray(equity, dtype=np.float64)
+        if len(equity) == 0:
+            return
+        s = self.sums
+        points = equity if self.last is None else np.r_[self.last, equity]
+        returns = points[1:] / points[:-1] - 1
+        if len(returns):
+            # Chan et al. pairwise update of mean and sum of squared deviations
+            n_b, mean_b = len(returns), returns.mean()
+            n = s["n"] + n_b
+            delta = mean_b - s["mean"]
+            s["m2"] = s["m2"] + ((returns - mean_b) ** 2).sum() + delta ** 2 * s["n"] * n_b / n
+            s["mean"] = s["mean"] + delta * n_b / n
+            s["n"] = n
+            s["down2"] = s["down2"] + (np.minimum(returns, 0) ** 2).sum()
+        peak = np.maximum.accumulate(np.r_[self.peak, equity])[1:]
+        under = equity < peak
+        s["max_dd"] = np.minimum(s["max_dd"], (equity / peak - 1).min())
+        # Bars since the peak, continuing the run carried in from the previous piece
+        rows = np.arange(1, len(equity) + 1)
+        top = np.maximum.accumulate(np.where(under, 0, rows))
+        since = np.where(top > 0, rows - top, rows + self.since_peak)
+        s["dd_bars"] = np.maximum(s["dd_bars"], since.max())
+        self.since_peak = int(since[-1])
+        self.peak = float(peak[-1])
+        self.last = float(equity[-1])
+        s["final"] = np.array([self.last])
+        if position is not None:
+            position = np.asarray(position)
+            s["held"] = s["held"] + int(np.sum(position != 0))
+            s["bars"] = s["bars"] + len(position)
+
+    def add_trades(self, pnl):
+        pnl = np.asarray(pnl, dtype=np.float64)
+        s = self.sums
+        s["closed"] = s["closed"] + int(np.sum(~np.isnan(pnl)))
+        s["wins"] = s["wins"] + int(np.sum(pnl > 0))
+        s["gross_profit"] = s["gross_profit"] + pnl[pnl > 0].sum()
+        s["gross_loss"] = s["gross_loss"] - pnl[pnl < 0].sum()
+        s["pnl_sum"] = s["pnl_sum"] + np.nansum(pnl)
+
+    def result(self, metrics=None) -> dict:
+        return finish(self.sums, self.initial_balance, self.interval, metrics)[0]
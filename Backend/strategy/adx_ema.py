@@ -1,20 +1,24 @@
 import pandas as pd
-import ta
+from strategy.base_strategy import Strategy, ema_warmup, wilder_warmup, signal_from_masks
 
+ADX_WINDOW = 14  # ta's ADXIndicator default
 
-class AdxEmaStrategy:
+
+class AdxEmaStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, ema_span: int = 20, adx_threshold: float = 25.0):
-        self.df = df.copy()
+        self.df = df
         self.ema_span = int(ema_span)
         self.adx_threshold = float(adx_threshold)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        ema = df['close'].ewm(span=self.ema_span).mean()
-        adx = ta.trend.ADXIndicator(df['high'], df['low'], df['close']).adx()
-        df['ema'] = ema
-        df['adx'] = adx
-        df['signal'] = 0
-        df.loc[(df['close'] > df['ema']) & (df['adx'] > self.adx_threshold), 'signal'] = 1
-        df.loc[(df['close'] < df['ema']) & (df['adx'] > self.adx_threshold), 'signal'] = -1
-        return df
+    @property
+    def warmup(self) -> int:
+        # ADX smooths twice with Wilder's average over ADX_WINDOW candles
+        return max(ema_warmup(self.ema_span), ADX_WINDOW + wilder_warmup(ADX_WINDOW))
+
+    def compute(self, ind):
+        close = ind['close']
+        ema = ind.ema(self.ema_span)
+        adx = ind.adx(ADX_WINDOW)
+        trending = adx > self.adx_threshold
+        signal = signal_from_masks((close > ema) & trending, (close < ema) & trending)
+        return signal, {'ema': ema, 'adx': adx}
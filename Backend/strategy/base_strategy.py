@@ -1,7 +1,111 @@
+from __future__ import annotations
+import math
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
+from strategy.indicators import Indicators
+
+# An EMA still carries (1 - 2/(span+1))**n of its seed after n candles;
+# three spans brings that below 0.25%, which is close enough to converged.
+EMA_CONVERGENCE_SPANS = 3
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def ema_warmup(span) -> int:
+    """Candles an EMA of `span` needs before it stops depending on its seed."""
+    return int(math.ceil(EMA_CONVERGENCE_SPANS * float(span)))
+
+
+def wilder_warmup(window) -> int:
+    """Warm-up for Wilder smoothing (RSI, ATR, ADX), an EMA of span 2*window - 1."""
+    return ema_warmup(2 * int(window) - 1)
+
+
+def signal_from_masks(long_mask, short_mask=None) -> np.ndarray:
+    """int8 signal: 1 where `long_mask`, -1 where `short_mask` (short wins ties), else 0.
+
+    NaN comparisons are already False, so warm-up candles come out as 0.
+    """
+    signal = np.zeros(len(long_mask), dtype=np.int8)
+    signal[np.asarray(long_mask, dtype=bool)] = 1
+    if short_mask is not None:
+        signal[np.asarray(short_mask, dtype=bool)] = -1
+    return signal
+
+
+def forward_fill_signal(signal) -> np.ndarray:
+    """Replace zeros with the last non-zero signal (hold until the opposite signal)."""
+    signal = np.asarray(signal)
+    last = np.where(signal != 0, np.arange(len(signal)), 0)
+    np.maximum.accumulate(last, out=last)
+    return signal[last]
+
 
 class Strategy(ABC):
+    """Base class for signal strategies.
+
+    Subclasses keep the candles in `self.df` untouched and implement `compute`.
+    `generate_signals()` returns a copy of the candles with the indicator and
+    `signal` columns (for charts and logs); `signals()` is the copy-free path
+    used by the optimizer and returns only an int8 array.
+
+    Indicators are requested through an `Indicators` cache so several
+    strategies evaluated on the same candles share them. Indicator libraries
+    such as `ta` are only imported when an indicator is first computed, so the
+    strategy registry can read parameters and warm-up without loading them.
+    """
+
     @abstractmethod
-    def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
-        pass
+    def compute(self, ind: Indicators):
+        """Return `(signal, indicators)` using the indicator cache `ind`.
+
+        `signal` is an int8 array (1 long, -1 short, 0 hold) and `indicators`
+        maps column names to the intermediate series worth charting.
+        """
+
+    def generate_signals(self) -> pd.DataFrame:
+        signal, indicators = self.compute(Indicators(self.df))
+        df = self.df.copy()
+        for name, values in indicators.items():
+            df[name] = values
+        df['signal'] = signal
+        return df
+
+    def signals(self, indicators: Indicators | None = None) -> np.ndarray:
+        """int8 signals only; pass a shared `Indicators` built on the same candles to reuse work."""
+        signal, _ = self.compute(indicators if indicators is not None else Indicators(self.df))
+        return np.asarray(signal, dtype=np.int8)
+
+    def signal_events(self, indicators: Indicators | None = None) -> np.ndarray:
+        """Signals reduced to entry/exit events (0 = keep the current position).
+
+        Strategies that forward-fill their signal ("hold until opposite")
+        override this to skip the fill; a chunked backtest that carries the
+        position across chunks uses it so a held value never comes from
+        unconverged warm-up candles. Position-wise it is equivalent to signals().
+        """
+        return self.signals(indicators)
+
+    @property
+    def warmup(self) -> int:
+        """Leading candles consumed before this instance's signals are reliable.
+
+        Computed from the instance parameters; EMA-based indicators include
+        the convergence padding from `ema_warmup`.
+        """
+        return 0
+
+    @classmethod
+    def warmup_for(cls, **params) -> int:
+        """Warm-up for the given parameters, without needing market data."""
+        try:
+            strategy = cls(pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float), **params)
+        except TypeError:
+            strategy = cls(pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float))
+        return int(strategy.warmup)
+
+    @classmethod
+    def required_candles(cls, **params) -> int:
+        """History a live runner must fetch to produce a signal on the latest candle."""
+        return cls.warmup_for(**params) + 1
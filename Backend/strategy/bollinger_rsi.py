@@ -1,7 +1,6 @@
-import pandas as pd
-import numpy as np
+from strategy.base_strategy import Strategy, signal_from_masks
 
-class BollingerRSIStrategy:
+class BollingerRSIStrategy(Strategy):
     def __init__(self, df, bb_window: int = 20, bb_std: float = 2.0, rsi_window: int = 14, rsi_buy: int = 30, rsi_sell: int = 70):
         self.df = df
         self.bb_window = int(bb_window)
@@ -10,27 +9,38 @@ class BollingerRSIStrategy:
         self.rsi_buy = int(rsi_buy)
         self.rsi_sell = int(rsi_sell)
 
-    def generate_signals(self):
-        df = self.df.copy()
-        
+    @property
+    def warmup(self) -> int:
+        return max(self.bb_window, self.rsi_window + 1)
+
+    def compute(self, ind):
+        close = ind['close']
+
         # --- Bollinger Bands ---
-        df['middle_band'] = df['close'].rolling(window=self.bb_window).mean()
-        df['std_dev'] = df['close'].rolling(window=self.bb_window).std()
-        df['upper_band'] = df['middle_band'] + (self.bb_std * df['std_dev'])
-        df['lower_band'] = df['middle_band'] - (self.bb_std * df['std_dev'])
-        
-        # --- RSI Calculation ---
-        delta = df['close'].diff()
-        gain = np.where(delta > 0, delta, 0)
-        loss = np.where(delta < 0, -delta, 0)
-        avg_gain = pd.Series(gain).rolling(window=self.rsi_window).mean()
-        avg_loss = pd.Series(loss).rolling(window=self.rsi_window).mean()
-        rs = avg_gain / avg_loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
+        middle_band = ind.sma(self.bb_window)
+        std_dev = ind.rolling_std(self.bb_window)
+        upper_band = middle_band + (self.bb_std * std_dev)
+        lower_band = middle_band - (self.bb_std * std_dev)
+
+        # --- RSI Calculation (simple moving average of gains/losses) ---
+        rsi = ind.cached(("sma_rsi", self.rsi_window), lambda: self._sma_rsi(ind))
+
         # --- Signal Logic ---
-        df['signal'] = 0
-        df.loc[(df['close'] < df['lower_band']) & (df['rsi'] < self.rsi_buy), 'signal'] = 1
-        df.loc[(df['close'] > df['upper_band']) & (df['rsi'] > self.rsi_sell), 'signal'] = -1
-        
-        return df
+        signal = signal_from_masks(
+            (close < lower_band) & (rsi < self.rsi_buy),
+            (close > upper_band) & (rsi > self.rsi_sell),
+        )
+        return signal, {
+            'middle_band': middle_band,
+            'std_dev': std_dev,
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'rsi': rsi,
+        }
+
+    def _sma_rsi(self, ind):
+        delta = ind.diff()
+        avg_gain = delta.clip(lower=0).rolling(window=self.rsi_window).mean()
+        avg_loss = (-delta).clip(lower=0).rolling(window=self.rsi_window).mean()
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
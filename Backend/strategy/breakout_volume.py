@@ -1,16 +1,20 @@
 import pandas as pd
+from strategy.base_strategy import Strategy, signal_from_masks
 
 
-class BreakoutVolumeStrategy:
+class BreakoutVolumeStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, breakout_window: int = 20, min_vol_mult: float = 1.0):
-        self.df = df.copy()
+        self.df = df
         self.breakout_window = int(breakout_window)
         self.min_vol_mult = float(min_vol_mult)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        df['HighBreakout'] = df['high'] > df['high'].rolling(self.breakout_window).max().shift(1)
-        df['VolumeSpike'] = df['volume'] > (self.min_vol_mult * df['volume'].rolling(self.breakout_window).mean())
-        df['signal'] = 0
-        df.loc[df['HighBreakout'] & df['VolumeSpike'], 'signal'] = 1
-        return df
+    @property
+    def warmup(self) -> int:
+        # rolling max is shifted by one candle
+        return self.breakout_window + 1
+
+    def compute(self, ind):
+        high_breakout = ind['high'] > ind.rolling_max(self.breakout_window, 'high').shift(1)
+        volume_spike = ind['volume'] > (self.min_vol_mult * ind.sma(self.breakout_window, 'volume'))
+        signal = signal_from_masks(high_breakout & volume_spike)
+        return signal, {'HighBreakout': high_breakout, 'VolumeSpike': volume_spike}
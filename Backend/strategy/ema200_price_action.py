@@ -1,17 +1,18 @@
 import pandas as pd
+from strategy.base_strategy import Strategy, ema_warmup, signal_from_masks
 
 
-class Ema200PriceActionStrategy:
+class Ema200PriceActionStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, ema_span: int = 200):
-        self.df = df.copy()
+        self.df = df
         self.ema_span = int(ema_span)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        ema = df['close'].ewm(span=self.ema_span).mean()
-        df['ema_200'] = ema
-        df['signal'] = 0
-        df.loc[df['close'] > df['ema_200'], 'signal'] = 1
-        df.loc[df['close'] < df['ema_200'], 'signal'] = -1
-        return df
-    
\ No newline at end of file
+    @property
+    def warmup(self) -> int:
+        return ema_warmup(self.ema_span)
+
+    def compute(self, ind):
+        close = ind['close']
+        ema = ind.ema(self.ema_span)
+        signal = signal_from_masks(close > ema, close < ema)
+        return signal, {'ema_200': ema}
@@ -1,17 +1,19 @@
 import pandas as pd
+from strategy.base_strategy import Strategy, signal_from_masks
 
 
-class FibonacciReversalStrategy:
+class FibonacciReversalStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, lookback: int = 50, retrace: float = 0.618):
-        self.df = df.copy()
+        self.df = df
         self.lookback = int(lookback)
         self.retrace = float(retrace)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        recent_high = df['high'].rolling(self.lookback).max()
-        recent_low = df['low'].rolling(self.lookback).min()
+    @property
+    def warmup(self) -> int:
+        return self.lookback
+
+    def compute(self, ind):
+        recent_high = ind.rolling_max(self.lookback, 'high')
+        recent_low = ind.rolling_min(self.lookback, 'low')
         retracement = recent_high - (recent_high - recent_low) * self.retrace
-        df['signal'] = 0
-        df.loc[df['close'] < retracement, 'signal'] = 1
-        return df
+        return signal_from_masks(ind['close'] < retracement), {}
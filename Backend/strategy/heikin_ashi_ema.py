@@ -1,21 +1,19 @@
 import pandas as pd
+from strategy.base_strategy import Strategy, ema_warmup, signal_from_masks
 
 
-class HeikinAshiEmaStrategy:
+class HeikinAshiEmaStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, ema_span: int = 20):
-        self.df = df.copy()
+        self.df = df
         self.ema_span = int(ema_span)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        ha_df = pd.DataFrame(index=df.index)
-        ha_df['close'] = (df['open'] + df['high'] + df['low'] + df['close']) / 4
-        ha_df['open'] = (df['open'] + df['close']) / 2
-        ha_df['high'] = df[['high', 'open', 'close']].max(axis=1)
-        ha_df['low'] = df[['low', 'open', 'close']].min(axis=1)
+    @property
+    def warmup(self) -> int:
+        return ema_warmup(self.ema_span)
 
-        df['ema'] = df['close'].ewm(span=self.ema_span).mean()
-        df['signal'] = 0
-        df.loc[ha_df['close'] > df['ema'], 'signal'] = 1
-        df.loc[ha_df['close'] < df['ema'], 'signal'] = -1
-        return df
+    def compute(self, ind):
+        # Only the Heikin-Ashi close takes part in the signal
+        ha_close = ind.cached("ha_close", lambda: (ind['open'] + ind['high'] + ind['low'] + ind['close']) / 4)
+        ema = ind.ema(self.ema_span)
+        signal = signal_from_masks(ha_close > ema, ha_close < ema)
+        return signal, {'ema': ema}
@@ -1,19 +1,18 @@
 import pandas as pd
-import ta
+from strategy.base_strategy import Strategy, signal_from_masks
 
 
-class IchimokuStrategy:
+class IchimokuStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, window1: int = 9, window2: int = 26):
-        self.df = df.copy()
+        self.df = df
         self.window1 = int(window1)
         self.window2 = int(window2)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        ichimoku = ta.trend.IchimokuIndicator(df['high'], df['low'], window1=self.window1, window2=self.window2)
-        df['base_line'] = ichimoku.ichimoku_base_line()
-        df['conversion_line'] = ichimoku.ichimoku_conversion_line()
-        df['signal'] = 0
-        df.loc[df['conversion_line'] > df['base_line'], 'signal'] = 1
-        df.loc[df['conversion_line'] < df['base_line'], 'signal'] = -1
-        return df
+    @property
+    def warmup(self) -> int:
+        return max(self.window1, self.window2)
+
+    def compute(self, ind):
+        base_line, conversion_line = ind.ichimoku(self.window1, self.window2)
+        signal = signal_from_masks(conversion_line > base_line, conversion_line < base_line)
+        return signal, {'base_line': base_line, 'conversion_line': conversion_line}
@@ -0,0 +1,117 @@
+import pandas as pd
+
+
+class Indicators:
+    """Memoized indicators over one OHLCV frame.
+
+    Strategies ask for indicators through this object instead of computing
+    them on the frame directly, so when several strategies (or parameter sets
+    of one strategy) run over the same candles, each distinct indicator is
+    computed once and shared. The frame itself is never modified.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.df)
+
+    def __getitem__(self, column) -> pd.Series:
+        return self.df[column]
+
+    @property
+    def index(self):
+        return self.df.index
+
+    def cached(self, key, fn):
+        """Return the value stored under `key`, computing it with `fn()` on first use."""
+        try:
+            value = self._cache[key]
+            self.hits += 1
+        except KeyError:
+            value = self._cache[key] = fn()
+            self.misses += 1
+        return value
+
+    # --- Price transforms ---
+    def ema(self, span, adjust=True, column="close"):
+        return self.cached(("ema", column, span, adjust),
+                           lambda: self.df[column].ewm(span=span, adjust=adjust).mean())
+
+    def sma(self, window, column="close"):
+        return self.cached(("sma", column, window), lambda: self.df[column].rolling(window=window).mean())
+
+    def rolling_std(self, window, column="close"):
+        return self.cached(("std", column, window), lambda: self.df[column].rolling(window=window).std())
+
+    def rolling_max(self, window, column="high"):
+        return self.cached(("max", column, window), lambda: self.df[column].rolling(window).max())
+
+    def rolling_min(self, window, column="low"):
+        return self.cached(("min", column, window), lambda: self.df[column].rolling(window).min())
+
+    def pct_change(self, column="close"):
+        return self.cached(("pct_change", column), lambda: self.df[column].pct_change())
+
+    def diff(self, column="close"):
+        return self.cached(("diff", column), lambda: self.df[column].diff())
+
+    # --- ta-based indicators ---
+    def rsi(self, window):
+        def build():
+            import ta
+            return ta.momentum.RSIIndicator(self.df['close'], window=window).rsi()
+        return self.cached(("rsi", window), build)
+
+    def macd(self, window_fast, window_slow, window_sign):
+        """(macd line, signal line)"""
+        def build():
+            import ta
+            macd = ta.trend.MACD(close=self.df['close'], window_slow=window_slow, window_fast=window_fast, window_sign=window_sign)
+            return macd.macd(), macd.macd_signal()
+        return self.cached(("macd", window_fast, window_slow, window_sign), build)
+
+    def adx(self, window):
+        def build():
+            import ta
+            return ta.trend.ADXIndicator(self.df['high'], self.df['low'], self.df['close'], window=window).adx()
+        return self.cached(("adx", window), build)
+
+    def psar(self, step, max_step):
+        def build():
+            import ta
+            return ta.trend.PSARIndicator(self.df['high'], self.df['low'], self.df['close'], step=step, max_step=max_step).psar()
+        return self.cached(("psar", step, max_step), build)
+
+    def ichimoku(self, window1, window2):
+        """(base line, conversion line)"""
+        def build():
+            import ta
+            ichimoku = ta.trend.IchimokuIndicator(self.df['high'], self.df['low'], window1=window1, window2=window2)
+            return ichimoku.ichimoku_base_line(), ichimoku.ichimoku_conversion_line()
+        return self.cached(("ichimoku", window1, window2), build)
+
+    def keltner(self, window, window_atr, original):
+        """(upper band, lower band)"""
+        def build():
+            import ta
+            kc = ta.volatility.KeltnerChannel(self.df['high'], self.df['low'], self.df['close'], window=window,
+                                              window_atr=window_atr, original_version=original)
+            return kc.keltner_channel_hband(), kc.keltner_channel_lband()
+        return self.cached(("keltner", window, window_atr, original), build)
+
+    def stc(self, window_fast, window_slow, cycle):
+        def build():
+            import ta
+            return ta.trend.STCIndicator(close=self.df['close'], window_slow=window_slow, window_fast=window_fast,
+                                         cycle=cycle, fillna=True).stc()
+        return self.cached(("stc", window_fast, window_slow, cycle), build)
+
+    def trix(self, window):
+        def build():
+            import ta
+            return ta.trend.TRIXIndicator(self.df['close'], window=window).trix()
+        return self.cached(("trix", window), build)
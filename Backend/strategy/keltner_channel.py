@@ -1,20 +1,20 @@
 import pandas as pd
-import ta
+from strategy.base_strategy import Strategy, ema_warmup, wilder_warmup, signal_from_masks
 
 
-class KeltnerBreakoutStrategy:
+class KeltnerBreakoutStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, window: int = 20, window_atr: int = 10, original: bool = False):
-        self.df = df.copy()
+        self.df = df
         self.window = int(window)
         self.window_atr = int(window_atr)
         self.original = bool(original)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        kc = ta.volatility.KeltnerChannel(df['high'], df['low'], df['close'], window=self.window, window_atr=self.window_atr, original=self.original)
-        df['upper'] = kc.keltner_channel_hband()
-        df['lower'] = kc.keltner_channel_lband()
-        df['signal'] = 0
-        df.loc[df['close'] > df['upper'], 'signal'] = 1
-        df.loc[df['close'] < df['lower'], 'signal'] = -1
-        return df
+    @property
+    def warmup(self) -> int:
+        return max(ema_warmup(self.window), wilder_warmup(self.window_atr))
+
+    def compute(self, ind):
+        close = ind['close']
+        upper, lower = ind.keltner(self.window, self.window_atr, self.original)
+        signal = signal_from_masks(close > upper, close < lower)
+        return signal, {'upper': upper, 'lower': lower}
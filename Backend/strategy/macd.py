@@ -1,8 +1,10 @@
 # strategy/macd.py
+import numpy as np
 import pandas as pd
-import ta
+from strategy.base_strategy import Strategy, ema_warmup, signal_from_masks, forward_fill_signal
+from strategy.indicators import Indicators
 
-class MACDStrategy:
+class MACDStrategy(Strategy):
     """
     Smoothed MACD + EMA200 Trend Filter Strategy
     - Buy when MACD crosses above signal & price > EMA200
@@ -17,38 +19,52 @@ class MACDStrategy:
         self.window_sign = int(window_sign)
         self.ema200_span = int(ema200_span)
 
-    def generate_signals(self):
-        df = self.df.copy()
+    @property
+    def warmup(self) -> int:
+        macd = ema_warmup(self.window_slow) + ema_warmup(self.window_sign)
+        # compute() also blanks the first 200 candles unconditionally
+        return max(macd, ema_warmup(self.ema200_span), 200)
+
+    def _events(self, ind):
+        close = ind['close']
 
         # --- MACD Calculation ---
-        macd = ta.trend.MACD(close=df['close'], window_slow=self.window_slow, window_fast=self.window_fast, window_sign=self.window_sign)
-        df['macd'] = macd.macd()
-        df['signal_line'] = macd.macd_signal()
-        df['macd_diff'] = df['macd'] - df['signal_line']
+        macd_line, signal_line = ind.macd(self.window_fast, self.window_slow, self.window_sign)
+        macd_diff = macd_line - signal_line
 
         # --- EMA200 Trend Filter ---
-        df['ema200'] = df['close'].ewm(span=self.ema200_span, adjust=False).mean()
+        ema200 = ind.ema(self.ema200_span, adjust=False)
 
         # --- Raw MACD Crossovers ---
-        df['raw_signal'] = 0
-        df.loc[(df['macd_diff'] > 0) & (df['macd_diff'].shift(1) <= 0), 'raw_signal'] = 1
-        df.loc[(df['macd_diff'] < 0) & (df['macd_diff'].shift(1) >= 0), 'raw_signal'] = -1
+        prev_diff = macd_diff.shift(1)
+        raw_signal = signal_from_masks((macd_diff > 0) & (prev_diff <= 0), (macd_diff < 0) & (prev_diff >= 0))
 
         # --- Apply Trend Filter ---
-        df['signal'] = 0
-        df.loc[(df['raw_signal'] == 1) & (df['close'] > df['ema200']), 'signal'] = 1
-        df.loc[(df['raw_signal'] == -1) & (df['close'] < df['ema200']), 'signal'] = -1
+        signal = signal_from_masks(
+            (raw_signal == 1) & (close > ema200).to_numpy(),
+            (raw_signal == -1) & (close < ema200).to_numpy(),
+        )
 
-        # --- Hold until opposite signal ---
-        df['signal'] = df['signal'].replace(0, method='ffill')
+        return signal, {
+            'macd': macd_line,
+            'signal_line': signal_line,
+            'macd_diff': macd_diff,
+            'ema200': ema200,
+            'raw_signal': raw_signal,
+        }
 
+    @staticmethod
+    def _blank_warmup(signal):
         # --- Ignore first 200 candles for EMA warm-up safely ---
-        if len(df) > 200:
-            df.loc[df.index[:200], 'signal'] = 0
+        if len(signal) > 200:
+            signal[:200] = 0
+        return signal
 
-        df['signal'] = df['signal'].fillna(0)
-
-        print("Signal counts:")
-        print(df['signal'].value_counts())
+    def compute(self, ind):
+        signal, indicators = self._events(ind)
+        # --- Hold until opposite signal ---
+        return self._blank_warmup(forward_fill_signal(signal)), indicators
 
-        return df
+    def signal_events(self, indicators=None):
+        signal, _ = self._events(indicators if indicators is not None else Indicators(self.df))
+        return self._blank_warmup(np.asarray(signal, dtype=np.int8))
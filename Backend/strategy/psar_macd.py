@@ -1,24 +1,26 @@
 import pandas as pd
-import ta
+from strategy.base_strategy import Strategy, ema_warmup, signal_from_masks
 
 
-class PsarMacdStrategy:
+class PsarMacdStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, psar_step: float = 0.02, psar_max: float = 0.2, window_fast: int = 12, window_slow: int = 26, window_sign: int = 9):
-        self.df = df.copy()
+        self.df = df
         self.psar_step = float(psar_step)
         self.psar_max = float(psar_max)
         self.window_fast = int(window_fast)
         self.window_slow = int(window_slow)
         self.window_sign = int(window_sign)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        psar = ta.trend.PSARIndicator(df['high'], df['low'], df['close'], step=self.psar_step, max_step=self.psar_max)
-        df['psar'] = psar.psar()
-        macd = ta.trend.MACD(df['close'], window_slow=self.window_slow, window_fast=self.window_fast, window_sign=self.window_sign)
-        df['macd'] = macd.macd()
-        df['macd_signal'] = macd.macd_signal()
-        df['signal'] = 0
-        df.loc[(df['close'] < df['psar']) & (df['macd'] > df['macd_signal']), 'signal'] = 1
-        df.loc[(df['close'] > df['psar']) & (df['macd'] < df['macd_signal']), 'signal'] = -1
-        return df
+    @property
+    def warmup(self) -> int:
+        return ema_warmup(self.window_slow) + ema_warmup(self.window_sign)
+
+    def compute(self, ind):
+        close = ind['close']
+        psar = ind.psar(self.psar_step, self.psar_max)
+        macd_line, macd_signal = ind.macd(self.window_fast, self.window_slow, self.window_sign)
+        signal = signal_from_masks(
+            (close < psar) & (macd_line > macd_signal),
+            (close > psar) & (macd_line < macd_signal),
+        )
+        return signal, {'psar': psar, 'macd': macd_line, 'macd_signal': macd_signal}
@@ -1,8 +1,8 @@
 # strategy/rsi_ema.py
 import pandas as pd
-import ta  # pip install ta
+from strategy.base_strategy import Strategy, ema_warmup, wilder_warmup, signal_from_masks
 
-class RSIEMAStrategy:
+class RSIEMAStrategy(Strategy):
     """
     RSI + EMA Strategy for multi-coin paper trading.
     Generates numeric signals: 1 = BUY/long, -1 = SELL/short, 0 = HOLD
@@ -16,33 +16,26 @@ class RSIEMAStrategy:
         rsi_buy: RSI threshold to buy
         rsi_sell: RSI threshold to sell
         """
-        self.df = df.copy()
+        self.df = df
         self.rsi_period = rsi_period
         self.ema_period = ema_period
         self.rsi_buy = rsi_buy
         self.rsi_sell = rsi_sell
 
-    def generate_signals(self):
-        # Compute EMA
-        self.df['ema'] = self.df['close'].ewm(span=self.ema_period, adjust=False).mean()
-
-        # Compute RSI
-        self.df['rsi'] = ta.momentum.RSIIndicator(self.df['close'], window=self.rsi_period).rsi()
-
-        # Initialize signals
-        self.df['signal'] = 0
-
-        # Long signal: RSI below rsi_buy and price above EMA
-        self.df.loc[(self.df['rsi'] < self.rsi_buy) & (self.df['close'] > self.df['ema']), 'signal'] = 1
-
-        # Short signal: RSI above rsi_sell and price below EMA
-        self.df.loc[(self.df['rsi'] > self.rsi_sell) & (self.df['close'] < self.df['ema']), 'signal'] = -1
-
-        # Ensure numeric 0 for HOLD
-        self.df['signal'] = self.df['signal'].fillna(0).astype(int)
-
-        # Debug: print signal counts
-        print("Signal counts:")
-        print(self.df['signal'].value_counts())
-
-        return self.df
+    @property
+    def warmup(self) -> int:
+        # RSI uses Wilder smoothing on close-to-close changes
+        return max(ema_warmup(self.ema_period), wilder_warmup(self.rsi_period) + 1)
+
+    def compute(self, ind):
+        close = ind['close']
+        ema = ind.ema(self.ema_period, adjust=False)
+        rsi = ind.rsi(self.rsi_period)
+
+        # Long: RSI below rsi_buy and price above EMA
+        # Short: RSI above rsi_sell and price below EMA
+        signal = signal_from_masks(
+            (rsi < self.rsi_buy) & (close > ema),
+            (rsi > self.rsi_sell) & (close < ema),
+        )
+        return signal, {'ema': ema, 'rsi': rsi}
@@ -1,19 +1,19 @@
 import pandas as pd
+from strategy.base_strategy import Strategy, signal_from_masks
 
 
-class SMACrossStrategy:
+class SMACrossStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, short_window: int = 50, long_window: int = 200):
-        self.df = df.copy()
+        self.df = df
         self.short_window = int(short_window)
         self.long_window = int(long_window)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        df['SMA50'] = df['close'].rolling(window=self.short_window).mean()
-        df['SMA200'] = df['close'].rolling(window=self.long_window).mean()
+    @property
+    def warmup(self) -> int:
+        return max(self.short_window, self.long_window)
 
-        df['signal'] = 0
-        df.loc[df['SMA50'] > df['SMA200'], 'signal'] = 1
-        df.loc[df['SMA50'] < df['SMA200'], 'signal'] = -1
-
-        return df
+    def compute(self, ind):
+        sma_short = ind.sma(self.short_window)
+        sma_long = ind.sma(self.long_window)
+        signal = signal_from_masks(sma_short > sma_long, sma_short < sma_long)
+        return signal, {'SMA50': sma_short, 'SMA200': sma_long}
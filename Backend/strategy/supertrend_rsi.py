@@ -1,10 +1,10 @@
 import pandas as pd
-import ta
+from strategy.base_strategy import Strategy, ema_warmup, wilder_warmup, signal_from_masks
 
 
-class SupertrendRsiStrategy:
+class SupertrendRsiStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, stc_fast: int = 23, stc_slow: int = 50, stc_cycle: int = 10, stc_buy: float = 50.0, stc_sell: float = 50.0, rsi_window: int = 14, rsi_buy: float = 30.0, rsi_sell: float = 70.0):
-        self.df = df.copy()
+        self.df = df
         self.stc_fast = int(stc_fast)
         self.stc_slow = int(stc_slow)
         self.stc_cycle = int(stc_cycle)
@@ -14,13 +14,17 @@ class SupertrendRsiStrategy:
         self.rsi_buy = float(rsi_buy)
         self.rsi_sell = float(rsi_sell)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        supertrend = ta.trend.STCIndicator(close=df['close'], window_slow=self.stc_slow, window_fast=self.stc_fast, cycle=self.stc_cycle, fillna=True)
-        df['supertrend'] = supertrend.stc()
-        rsi = ta.momentum.RSIIndicator(close=df['close'], window=self.rsi_window).rsi()
-        df['rsi'] = rsi
-        df['signal'] = 0
-        df.loc[(df['supertrend'] > self.stc_buy) & (df['rsi'] < self.rsi_buy), 'signal'] = 1
-        df.loc[(df['supertrend'] < self.stc_sell) & (df['rsi'] > self.rsi_sell), 'signal'] = -1
-        return df
+    @property
+    def warmup(self) -> int:
+        # STC runs two stochastic passes of `stc_cycle` over a MACD line
+        stc = ema_warmup(self.stc_slow) + 2 * self.stc_cycle
+        return max(stc, wilder_warmup(self.rsi_window) + 1)
+
+    def compute(self, ind):
+        supertrend = ind.stc(self.stc_fast, self.stc_slow, self.stc_cycle)
+        rsi = ind.rsi(self.rsi_window)
+        signal = signal_from_masks(
+            (supertrend > self.stc_buy) & (rsi < self.rsi_buy),
+            (supertrend < self.stc_sell) & (rsi > self.rsi_sell),
+        )
+        return signal, {'supertrend': supertrend, 'rsi': rsi}
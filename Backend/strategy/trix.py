@@ -1,18 +1,22 @@
 import pandas as pd
-import ta
+from strategy.base_strategy import Strategy, ema_warmup, signal_from_masks
 
+TRIX_WINDOW = 15  # ta's TRIXIndicator default
 
-class TrixStrategy:
+
+class TrixStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, signal_window: int = 9):
-        self.df = df.copy()
+        self.df = df
         self.signal_window = int(signal_window)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        trix = ta.trend.TRIXIndicator(df['close'])
-        df['trix'] = trix.trix()
-        df['trix_signal'] = df['trix'].rolling(self.signal_window).mean()
-        df['signal'] = 0
-        df.loc[df['trix'] > df['trix_signal'], 'signal'] = 1
-        df.loc[df['trix'] < df['trix_signal'], 'signal'] = -1
-        return df
+    @property
+    def warmup(self) -> int:
+        # TRIX is a triple-smoothed EMA followed by a rolling signal line
+        return 3 * ema_warmup(TRIX_WINDOW) + self.signal_window
+
+    def compute(self, ind):
+        trix = ind.trix(TRIX_WINDOW)
+        trix_signal = ind.cached(("trix_signal", TRIX_WINDOW, self.signal_window),
+                                 lambda: trix.rolling(self.signal_window).mean())
+        signal = signal_from_masks(trix > trix_signal, trix < trix_signal)
+        return signal, {'trix': trix, 'trix_signal': trix_signal}
@@ -1,21 +1,25 @@
 import pandas as pd
+from strategy.base_strategy import Strategy, signal_from_masks
 
 
-class VolumeBreakoutStrategy:
+class VolumeBreakoutStrategy(Strategy):
     def __init__(self, df: pd.DataFrame, avg_window: int = 20, min_change: float = 0.0, min_vol_mult: float = 1.0):
-        self.df = df.copy()
+        self.df = df
         self.avg_window = int(avg_window)
         self.min_change = float(min_change)
         self.min_vol_mult = float(min_vol_mult)
 
-    def generate_signals(self) -> pd.DataFrame:
-        df = self.df
-        df['AvgVolume'] = df['volume'].rolling(window=self.avg_window).mean()
+    @property
+    def warmup(self) -> int:
+        # pct_change needs the previous close on top of the volume average
+        return self.avg_window + 1
 
-        df['signal'] = 0
-        up = (df['close'].pct_change() > self.min_change) & (df['volume'] > self.min_vol_mult * df['AvgVolume'])
-        down = (df['close'].pct_change() < -self.min_change) & (df['volume'] > self.min_vol_mult * df['AvgVolume'])
-        df.loc[up, 'signal'] = 1
-        df.loc[down, 'signal'] = -1
-
-        return df
+    def compute(self, ind):
+        avg_volume = ind.sma(self.avg_window, 'volume')
+        change = ind.pct_change()
+        high_volume = ind['volume'] > self.min_vol_mult * avg_volume
+        signal = signal_from_masks(
+            (change > self.min_change) & high_volume,
+            (change < -self.min_change) & high_volume,
+        )
+        return signal, {'AvgVolume': avg_volume}
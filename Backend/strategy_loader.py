@@ -1,30 +1,163 @@
-def _strategy_map():
-    return {
-        "RSI_EMA": ("rsi_ema", "RSIEMAStrategy"),
-        "MACD": ("macd", "MACDStrategy"),
-        "BOLLINGER_RSI": ("bollinger_rsi", "BollingerRSIStrategy"),
-        "SMA_CROSS": ("sma_cross", "SMACrossStrategy"),
-        "VOLUME_BREAKOUT": ("volume_breakout", "VolumeBreakoutStrategy"),
-        "BREAKOUT_VOLUME": ("breakout_volume", "BreakoutVolumeStrategy"),
-        "PSAR_MACD": ("psar_macd", "PsarMacdStrategy"),
-        "FIBONACCI_REVERSAL": ("fibonacci_reversal", "FibonacciReversalStrategy"),
-        "TRIX": ("trix", "TrixStrategy"),
-        "HEIKIN_ASHI_EMA": ("heikin_ashi_ema", "HeikinAshiEmaStrategy"),
-        "SUPERTREND_RSI": ("supertrend_rsi", "SupertrendRsiStrategy"),
-        "ADX_EMA": ("adx_ema", "AdxEmaStrategy"),
-        "ICHIMOKU": ("ichimoku", "IchimokuStrategy"),
-        "EMA200_PRICE_ACTION": ("ema200_price_action", "Ema200PriceActionStrategy"),
-        "KELTNER_BREAKOUT": ("keltner_channel", "KeltnerBreakoutStrategy"),
-    }
+from __future__ import annotations
+import importlib
+import inspect
+import itertools
+from importlib import metadata
+
+# Third-party packages can ship strategies by declaring
+#   [project.entry-points."ai_trader.strategies"]
+#   MY_STRATEGY = "my_package.module:MyStrategy"
+ENTRY_POINT_GROUP = "ai_trader.strategies"
+
+# Built-in strategies as "module:Class" targets; nothing is imported until a
+# strategy is first requested.
+_BUILTIN_STRATEGIES = {
+    "RSI_EMA": "strategy.rsi_ema:RSIEMAStrategy",
+    "MACD": "strategy.macd:MACDStrategy",
+    "BOLLINGER_RSI": "strategy.bollinger_rsi:BollingerRSIStrategy",
+    "SMA_CROSS": "strategy.sma_cross:SMACrossStrategy",
+    "VOLUME_BREAKOUT": "strategy.volume_breakout:VolumeBreakoutStrategy",
+    "BREAKOUT_VOLUME": "strategy.breakout_volume:BreakoutVolumeStrategy",
+    "PSAR_MACD": "strategy.psar_macd:PsarMacdStrategy",
+    "FIBONACCI_REVERSAL": "strategy.fibonacci_reversal:FibonacciReversalStrategy",
+    "TRIX": "strategy.trix:TrixStrategy",
+    "HEIKIN_ASHI_EMA": "strategy.heikin_ashi_ema:HeikinAshiEmaStrategy",
+    "SUPERTREND_RSI": "strategy.supertrend_rsi:SupertrendRsiStrategy",
+    "ADX_EMA": "strategy.adx_ema:AdxEmaStrategy",
+    "ICHIMOKU": "strategy.ichimoku:IchimokuStrategy",
+    "EMA200_PRICE_ACTION": "strategy.ema200_price_action:Ema200PriceActionStrategy",
+    "KELTNER_BREAKOUT": "strategy.keltner_channel:KeltnerBreakoutStrategy",
+}
+
+# --- Optimizer grids: candidate values per parameter (kept small to control runtime) ---
+_PARAM_GRIDS = {
+    "RSI_EMA": {"rsi_period": [7, 14], "ema_period": [20, 50], "rsi_buy": [30, 40, 45], "rsi_sell": [55, 60, 70]},
+    "MACD": {"window_fast": [8, 12], "window_slow": [24, 26, 35], "window_sign": [9, 12], "ema200_span": [100, 200]},
+    "SMA_CROSS": {"short_window": [20, 50], "long_window": [100, 200]},
+    "EMA200_PRICE_ACTION": {"ema_span": [100, 200]},
+    "TRIX": {"signal_window": [5, 9, 14]},
+    "BOLLINGER_RSI": {"bb_window": [14, 20], "bb_std": [1.5, 2.0], "rsi_window": [14], "rsi_buy": [25, 30], "rsi_sell": [70, 75]},
+    "VOLUME_BREAKOUT": {"avg_window": [20, 30], "min_change": [0.0, 0.005], "min_vol_mult": [1.0, 1.5]},
+    "BREAKOUT_VOLUME": {"breakout_window": [20, 50], "min_vol_mult": [1.0, 1.5]},
+    "PSAR_MACD": {"psar_step": [0.02, 0.03], "psar_max": [0.2], "window_fast": [8, 12], "window_slow": [24, 26], "window_sign": [9]},
+    "FIBONACCI_REVERSAL": {"lookback": [50, 100], "retrace": [0.5, 0.618]},
+    "HEIKIN_ASHI_EMA": {"ema_span": [20, 50]},
+    "SUPERTREND_RSI": {"stc_fast": [23], "stc_slow": [50], "stc_cycle": [10], "stc_buy": [50], "stc_sell": [50],
+                       "rsi_window": [14], "rsi_buy": [25, 30], "rsi_sell": [70, 75]},
+    "ADX_EMA": {"ema_span": [20, 50], "adx_threshold": [20, 25, 30]},
+    "ICHIMOKU": {"window1": [9], "window2": [26, 34]},
+    "KELTNER_BREAKOUT": {"window": [20, 30], "window_atr": [10, 20], "original": [False, True]},
+}
+
+# Combinations that make no sense (fast window must be below the slow one)
+_GRID_CONSTRAINTS = {
+    "MACD": lambda p: p["window_fast"] < p["window_slow"],
+    "SMA_CROSS": lambda p: p["short_window"] < p["long_window"],
+}
+
+_targets: dict[str, str] = {}   # name -> "module:Class"
+_classes: dict[str, type] = {}  # name -> resolved class
+_metadata: dict[str, dict] = {}
+_discovered = False
+
+
+def _discover():
+    """Collect built-ins and entry points once; entry points are read, not loaded."""
+    global _discovered
+    if _discovered:
+        return
+    targets = dict(_BUILTIN_STRATEGIES)
+    try:
+        eps = metadata.entry_points()
+        group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, "select") else eps.get(ENTRY_POINT_GROUP, [])
+        for ep in group:
+            targets.setdefault(ep.name, ep.value)
+    except Exception:
+        pass
+    for name, target in targets.items():
+        _targets.setdefault(name, target)
+    _discovered = True
+
+
+def register_strategy(name, grid: dict | None = None, constraint=None):
+    """Class decorator registering a strategy under `name` (for plugins and scripts)."""
+    def decorator(cls):
+        _classes[name] = cls
+        _targets[name] = f"{cls.__module__}:{cls.__qualname__}"
+        _metadata.pop(name, None)
+        if grid is not None:
+            _PARAM_GRIDS[name] = grid
+        if constraint is not None:
+            _GRID_CONSTRAINTS[name] = constraint
+        return cls
+    return decorator
+
 
 def list_strategy_names():
-    return list(_strategy_map().keys())
+    _discover()
+    return list(_targets.keys())
 
-def load_strategy_class(strategy_name):
-    strategy_map = _strategy_map()
 
-    if strategy_name not in strategy_map:
+def load_strategy_class(strategy_name):
+    cls = _classes.get(strategy_name)
+    if cls is not None:
+        return cls
+    _discover()
+    if strategy_name not in _targets:
         raise ValueError(f"❌ Strategy '{strategy_name}' not found.")
-    module_name, class_name = strategy_map[strategy_name]
-    module = __import__(f"strategy.{module_name}", fromlist=[class_name])
-    return getattr(module, class_name)
+    module_name, class_name = _targets[strategy_name].split(":")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    _classes[strategy_name] = cls
+    return cls
+
+
+def strategy_name(strategy_class) -> str:
+    """Registry name of a loaded class (falls back to the class name)."""
+    for name, cls in _classes.items():
+        if cls is strategy_class:
+            return name
+    return strategy_class.__name__
+
+
+def grid_spec(strategy_name):
+    """(candidate values per parameter, constraint or None) for the optimizer."""
+    return _PARAM_GRIDS.get(strategy_name, {}), _GRID_CONSTRAINTS.get(strategy_name)
+
+
+def param_grid(strategy_name) -> list[dict]:
+    """Expand the strategy's grid spec into parameter dicts ([{}] = defaults only)."""
+    spec = _PARAM_GRIDS.get(strategy_name)
+    if not spec:
+        return [{}]
+    keys = list(spec.keys())
+    constraint = _GRID_CONSTRAINTS.get(strategy_name)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(spec[k] for k in keys))]
+    return [p for p in grid if constraint is None or constraint(p)]
+
+
+def strategy_metadata(strategy_name) -> dict:
+    """Parameters with defaults, grid spec and default warm-up for one strategy.
+
+    Strategy modules only import indicator libraries inside compute(), so this
+    stays cheap even for strategies built on `ta`.
+    """
+    meta = _metadata.get(strategy_name)
+    if meta is not None:
+        return meta
+    cls = load_strategy_class(strategy_name)
+    params = {}
+    for name, p in inspect.signature(cls.__init__).parameters.items():
+        if name in ("self", "df") or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD):
+            continue
+        params[name] = None if p.default is inspect.Parameter.empty else p.default
+    warmup_for = getattr(cls, "warmup_for", None)
+    meta = {
+        "name": strategy_name,
+        "class": cls.__name__,
+        "params": params,
+        "grid": _PARAM_GRIDS.get(strategy_name, {}),
+        "warmup": warmup_for() if warmup_for else 0,
+        "doc": inspect.cleandoc(cls.__doc__ or ""),
+    }
+    _metadata[strategy_name] = meta
+    return meta
@@ -1,5 +1,6 @@
 import pandas as pd
-from backtester import Backtester
+from evaluator import evaluate_symbol
+from optimizer_ledger import default_ledger
 from strategy_loader import load_strategy_class
 
 COINS = ["BTCUSDT","ETHUSDT"]
@@ -10,12 +11,12 @@ STRATEGIES = ["RSI_EMA","MACD","BOLLINGER_RSI"]
 
 results = []
 
-for strat_name in STRATEGIES:
-    strategy_class = load_strategy_class(strat_name)
-    for coin in COINS:
-        bt = Backtester(coin, INTERVAL, strategy_class, START, END)
-        bt.run()
-        stats = bt.calculate_stats()
+# Every strategy is scored in one pass over each coin's candles; results are
+# recorded in the optimizer ledger, so a re-run only computes what is missing
+specs = [(load_strategy_class(strat_name), {}) for strat_name in STRATEGIES]
+ledger = default_ledger()
+for coin in COINS:
+    for strat_name, stats in zip(STRATEGIES, evaluate_symbol(coin, INTERVAL, START, END, specs, ledger=ledger)):
         stats['strategy'] = strat_name
         stats['coin'] = coin
         results.append(stats)
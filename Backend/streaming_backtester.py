@@ -0,0 +1,193 @@
+# streaming_backtester.py
+"""Chunked backtest for long, fine-grained histories (e.g. years of 1m candles).
+
+Candles are read from the kline cache in chunks. Each chunk is prefixed
+with the last `overlap` candles of the previous one (twice the strategy
+warm-up by default), so indicators start converged. Signals are computed
+on that window and the Backtester rules are replayed on the chunk with
+evaluator.simulate, carrying position, entry price and balance into the
+next chunk. Equity points and consolidated trades are appended to the same
+CSVs the Backtester writes, and the stats are accumulated as running sums,
+so memory depends on the chunk size only.
+
+After the first chunk only entry/exit events are taken from the strategy
+(Strategy.signal_events), so a "hold until opposite" signal cannot carry a
+value produced from the unconverged head of the overlap.
+
+Signals match a single-pass Backtester except where an indicator's value
+still depends on its seed after `overlap` candles: an EMA is within ~0.25%
+after one warm-up (see strategy.base_strategy.ema_warmup) and within
+~0.001% after two, so only near-exact ties can flip.
+"""
+from __future__ import annotations
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from evaluator import instantiate, simulate, INITIAL_BALANCE, TRADING_FEE, SLIPPAGE
+from kline_cache import default_cache, DEFAULT_CHUNK_SIZE
+from binance_data import interval_to_timedelta
+from strategy_loader import load_strategy_class
+from stats import RunningStats
+from instrumentation import timed
+
+# Overlap between chunks, in strategy warm-ups
+OVERLAP_WARMUPS = 2
+
+
+class StreamingBacktester:
+    def __init__(self, symbol, interval, strategy_class, start, end, strategy_params: dict | None = None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, fee=TRADING_FEE, slippage=SLIPPAGE, cache=None,
+                 overlap: int | None = None):
+        self.symbol = symbol
+        self.interval = interval
+        self.strategy_class = strategy_class
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.strategy_params = strategy_params or {}
+        self.chunk_size = int(chunk_size)
+        self.fee = fee
+        self.slippage = slippage
+        self.cache = cache if cache is not None else default_cache()
+        self.overlap = int(overlap) if overlap is not None else OVERLAP_WARMUPS * self.warmup
+        self.logs_dir = f"logs/{strategy_class.__name__}"
+        self.state = None        # simulate() carry: position, entry, balance
+        self.open_trade = None   # (entry time, entry price) of the carried position
+        self.candles = 0
+        self.trade_count = 0
+        self.stats = RunningStats(INITIAL_BALANCE, interval=interval)
+
+    @property
+    def warmup(self):
+        warmup_for = getattr(self.strategy_class, "warmup_for", None)
+        return warmup_for(**self.strategy_params) if warmup_for else 0
+
+    # --- OUTPUT ---
+    def _reset_logs(self):
+        os.makedirs(self.logs_dir, exist_ok=True)
+        self.equity_path = f"{self.logs_dir}/equity.csv"
+        self.trades_path = f"{self.logs_dir}/backtester.csv"
+        pd.DataFrame(columns=["time", "equity"]).to_csv(self.equity_path, index=False)
+        pd.DataFrame(columns=["time", "symbol", "side", "entry", "exit", "pnl", "strategy"]).to_csv(
+            self.trades_path, index=False)
+
+    def _append_equity(self, times, equity, position=None):
+        pd.DataFrame({"time": times, "equity": equity}).to_csv(self.equity_path, mode="a", header=False, index=False)
+        self.stats.add_equity(equity, position)
+
+    def _append_trades(self, rows):
+        if not rows:
+            return
+        self.trade_count += len(rows)
+        pd.DataFrame(rows).to_csv(self.trades_path, mode="a", header=False, index=False)
+
+    def _trade_row(self, entry_time, entry, exit_price, pnl, side):
+        return {"time": str(entry_time), "symbol": self.symbol, "side": side, "entry": entry, "exit": exit_price,
+                "pnl": pnl, "strategy": self.strategy_class.__name__}
+
+    # --- CHUNKS ---
+    def _signals(self, frame, continuing):
+        """int8 signals for `frame`; after the first chunk only entry/exit events are
+        used, since the position itself is carried across the boundary."""
+        strategy = instantiate(self.strategy_class, frame, self.strategy_params)
+        if continuing and hasattr(strategy, "signal_events"):
+            return strategy.signal_events()
+        if hasattr(strategy, "signals"):
+            return strategy.signals()
+        return strategy.generate_signals()['signal'].to_numpy(dtype=np.int8)
+
+    def _process(self, times, close, signal, last_chunk):
+        sim = simulate(close, signal[:, None], fee=self.fee, slippage=self.slippage,
+                       initial_balance=INITIAL_BALANCE, state=self.state, close_end=last_chunk)
+        position, entry = sim["position"][:, 0], sim["entry"][:, 0]
+        prev = np.r_[0 if self.state is None else self.state["position"][0], position[:-1]]
+        exit_pnl = sim["exit_pnl"][:, 0]
+
+        # Pair each exit with the entry before it (or the position carried in)
+        rows = []
+        entries = np.flatnonzero((position != prev) & (position != 0))
+        for r in np.flatnonzero(~np.isnan(exit_pnl)):
+            k = np.searchsorted(entries, r) - 1
+            entry_time, entry_price = (times[entries[k]], entry[entries[k]]) if k >= 0 else self.open_trade
+            rows.append(self._trade_row(entry_time, entry_price, close[r] * (1 - self.slippage), exit_pnl[r],
+                                        "Long" if prev[r] == 1 else "Short"))
+        if position[-1] != 0:
+            k = len(entries) - 1
+            self.open_trade = (times[entries[k]], entry[entries[k]]) if k >= 0 else self.open_trade
+        else:
+            self.open_trade = None
+        self.stats.add_trades(exit_pnl)
+        self._append_equity(times, sim["equity"][:, 0], position)
+
+        if last_chunk and sim["open_end"][0]:
+            # Force-close on the last candle, recorded like Backtester.run
+            side = "Long" if position[-1] == 1 else "Short"
+            exit_price = close[-1] * (1 - self.slippage * position[-1])
+            rows.append(self._trade_row(self.open_trade[0], self.open_trade[1], exit_price,
+                                        sim["final_pnl"][0], side))
+            self.stats.add_trades(sim["final_pnl"])
+            self._append_equity(times[-1:], sim["final"])
+            self.open_trade = None
+        self._append_trades(rows)
+        self.state = sim["state"]
+        self.candles += len(times)
+
+    @timed("backtest.streaming_run")
+    def run(self):
+        self._reset_logs()
+        warmup = self.warmup
+        fetch_start = self.start - warmup * interval_to_timedelta(self.interval)
+        print(f"🚀 Streaming backtest: {self.symbol} | Strategy: {self.strategy_class.__name__} "
+              f"| chunks of {self.chunk_size} candles\n")
+
+        overlap = max(self.overlap, warmup)
+        tail = None
+        pending = None  # (times, close, signal) held back one chunk to know which is last
+        for chunk in self.cache.iter_klines(self.symbol, self.interval, fetch_start, self.end,
+                                            chunk_size=self.chunk_size):
+            frame = chunk if tail is None else pd.concat([tail, chunk])
+            signal = self._signals(frame, continuing=pending is not None)
+            tail = frame.iloc[-overlap:] if overlap else None
+            trade = frame.index >= self.start
+            trade[:len(frame) - len(chunk)] = False  # overlap rows were traded with the previous chunk
+            if not trade.any():
+                continue
+            if pending is not None:
+                self._process(*pending, last_chunk=False)
+            pending = (frame.index[trade], frame["close"].to_numpy(dtype=np.float64)[trade], signal[trade])
+        if pending is None:
+            raise ValueError("No data in the requested range after strategy warm-up.")
+        self._process(*pending, last_chunk=True)
+        self.print_summary()
+
+    # --- RESULTS ---
+    def calculate_stats(self, metrics=None) -> dict:
+        return self.stats.result(metrics)
+
+    def print_summary(self):
+        print(f"\n📊 Backtest Summary ({self.candles} candles, {self.trade_count} trades):")
+        for key, value in self.calculate_stats().items():
+            print(f"{key}: {value:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked backtester for long histories")
+    parser.add_argument("--symbol", type=str, required=True)
+    parser.add_argument("--interval", type=str, default="1m")
+    parser.add_argument("--strategy", type=str, required=True)
+    parser.add_argument("--start", type=str, required=True)
+    parser.add_argument("--end", type=str, required=True)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=None, help="Candles shared between chunks")
+    parser.add_argument("--fee", type=float, default=TRADING_FEE)
+    parser.add_argument("--slippage", type=float, default=SLIPPAGE)
+    args = parser.parse_args()
+
+    backtester = StreamingBacktester(args.symbol, args.interval, load_strategy_class(args.strategy),
+                                     args.start, args.end, chunk_size=args.chunk_size,
+                                     overlap=args.overlap, fee=args.fee, slippage=args.slippage)
+    backtester.run()
+
+
+if __name__ == "__main__":
+    main()
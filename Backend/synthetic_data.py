@@ -0,0 +1,300 @@
+# synthetic_data.py
+"""Seeded synthetic klines for offline development, load tests and benchmarks.
+
+With DATA_PROVIDER=synthetic the binance_data fetch functions serve these
+candles instead of calling Binance, so backtests, the optimizer, portfolio
+runs and the API work without network access and give the same numbers on
+every machine.
+
+Each (seed, model, symbol, interval) is one endless path starting at
+SYNTHETIC_EPOCH, generated in blocks of BLOCK_SIZE candles. A block depends
+only on its own seeded random stream and the state the previous block ended
+in (log price, volatility factor, regime), so any date range returns the
+same candles however the history is requested (whole, paged, extended).
+Block start states are kept per process, so later requests only generate
+the blocks they return.
+
+Models (MODELS; all prices are log-returns, annualized drift/vol):
+
+  gbm        geometric Brownian motion
+  jump       GBM plus Poisson jumps (Merton)
+  regime     Markov switching between bull, bear and quiet regimes,
+             each with its own drift, vol and mean duration
+  clustered  stochastic volatility: log-vol is an AR(1) with a half-life
+             of days, giving volatility clustering and fat tails
+  mixed      regimes, jumps and clustering together
+
+Returns of every symbol share a market factor (`market_corr`), volume is
+lognormal, higher on large moves and follows a daily cycle, and high/low
+extend past open/close by a fraction of the bar's volatility. Different
+intervals are independent paths, not resamples of each other.
+"""
+from __future__ import annotations
+import argparse
+import os
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from binance_data import INTERVAL_MS, OHLCV_COLUMNS, klines_frame
+
+SYNTHETIC_MODEL = os.getenv("SYNTHETIC_MODEL", "mixed")
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+SYNTHETIC_EPOCH = pd.Timestamp(os.getenv("SYNTHETIC_EPOCH", "2020-01-01"))
+BLOCK_SIZE = 1 << 16
+
+YEAR_MS = 365 * 24 * 3600 * 1000
+DAY_MS = 24 * 3600 * 1000
+MARKET_KEY = 0  # random stream of the shared market factor
+
+DEFAULTS = {
+    "drift": 0.1,              # annual
+    "vol": 0.6,                # annual
+    "regimes": None,           # ((drift, vol, mean duration in days), ...)
+    "jumps_per_year": 0.0,
+    "jump_mean": 0.0,
+    "jump_std": 0.05,
+    "vol_of_vol": 0.0,         # stationary std of the log-vol factor
+    "vol_half_life_days": 3.0,
+    "market_corr": 0.5,
+    "intrabar": 0.5,           # high/low extension, in bar volatilities
+}
+REGIMES = ((0.8, 0.5, 60.0), (-0.7, 0.9, 30.0), (0.0, 0.35, 45.0))
+MODELS = {
+    "gbm": {},
+    "jump": {"jumps_per_year": 20.0},
+    "regime": {"regimes": REGIMES},
+    "clustered": {"vol_of_vol": 0.5},
+    "mixed": {"regimes": REGIMES, "jumps_per_year": 20.0, "vol_of_vol": 0.5},
+}
+
+
+def model_params(model: str | None = None) -> dict:
+    model = model or SYNTHETIC_MODEL
+    if model not in MODELS:
+        raise ValueError(f"Unknown synthetic model '{model}', expected one of {list(MODELS)}.")
+    return dict(DEFAULTS, **MODELS[model])
+
+
+def cache_tag(model=None, seed=None) -> str:
+    """Name identifying the candles of a model/seed/epoch (e.g. for on-disk caches)."""
+    seed = SYNTHETIC_SEED if seed is None else int(seed)
+    return f"synthetic-{model or SYNTHETIC_MODEL}-{seed}-{SYNTHETIC_EPOCH:%Y%m%d}"
+
+
+def _symbol_key(symbol: str) -> int:
+    return zlib.crc32(symbol.upper().encode()) + 1  # never MARKET_KEY
+
+
+# --- PATHS ---
+class SyntheticPath:
+    """One (seed, model, symbol, interval) path; `block(k)` is candles
+    [k * BLOCK_SIZE, (k + 1) * BLOCK_SIZE) after SYNTHETIC_EPOCH."""
+
+    def __init__(self, symbol, interval, model=None, seed=None):
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported interval '{interval}'")
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.model = model or SYNTHETIC_MODEL
+        self.params = model_params(self.model)
+        self.seed = SYNTHETIC_SEED if seed is None else int(seed)
+        self.bar_ms = INTERVAL_MS[interval]
+        self.key = _symbol_key(self.symbol)
+        # Per-symbol character: price level, vol multiplier, volume scale
+        rng = np.random.default_rng([self.seed, self.key])
+        self.price0 = 10 ** rng.uniform(-1, 4.5)
+        self.vol_scale = rng.uniform(0.6, 1.3)
+        self.volume0 = 10 ** rng.uniform(2, 6) * (self.bar_ms / 60_000)
+        self.states = [self._initial_state(rng)]  # state at the start of each block
+
+    def _initial_state(self, rng) -> dict:
+        regimes = self.params["regimes"]
+        return {"log_price": float(np.log(self.price0)), "log_vol": 0.0,
+                "regime": int(rng.integers(len(regimes))) if regimes else 0, "left": 0}
+
+    def _rng(self, key, k):
+        return np.random.default_rng([self.seed, key, self.bar_ms, k])
+
+    def _regime_path(self, rng, n, state):
+        """Per-bar (drift, vol) arrays from the regime chain, advancing `state`."""
+        regimes = self.params["regimes"]
+        if not regimes:
+            return np.full(n, self.params["drift"]), np.full(n, self.params["vol"])
+        codes, lengths = [], []
+        filled = 0
+        regime, left = state["regime"], state["left"]
+        while filled < n:
+            if left == 0:
+                # Held a geometric number of bars (mean: the regime's duration)
+                mean_bars = max(regimes[regime][2] * DAY_MS / self.bar_ms, 1.0)
+                left = int(rng.geometric(1.0 / mean_bars))
+            take = min(left, n - filled)
+            codes.append(regime)
+            lengths.append(take)
+            filled += take
+            left -= take
+            if left == 0:
+                others = [i for i in range(len(regimes)) if i != regime]
+                regime = others[int(rng.integers(len(others)))]
+        state["regime"], state["left"] = regime, left
+        table = np.asarray(regimes, dtype=np.float64)
+        per_bar = np.repeat(np.asarray(codes), lengths)
+        return table[per_bar, 0], table[per_bar, 1]
+
+    def _log_vol(self, rng, n, state):
+        """AR(1) log-vol factor (stationary std vol_of_vol), advancing `state`."""
+        s = self.params["vol_of_vol"]
+        if s <= 0:
+            return np.zeros(n)
+        phi = 0.5 ** (self.bar_ms / (self.params["vol_half_life_days"] * DAY_MS))
+        shocks = rng.standard_normal(n) * (s * np.sqrt(1 - phi * phi) / (1 - phi))
+        # ewm(adjust=False): y_t = phi * y_(t-1) + (1 - phi) * x_t, seeded with the carried value
+        x = pd.Series(np.r_[state["log_vol"], shocks]).ewm(alpha=1 - phi, adjust=False).mean().to_numpy()[1:]
+        state["log_vol"] = float(x[-1])
+        return x
+
+    def _generate(self, k, state) -> tuple[np.ndarray, dict]:
+        """(BLOCK_SIZE x 5) OHLCV of block `k` from `state`, and the state after it."""
+        p, n = self.params, BLOCK_SIZE
+        state = dict(state)
+        rng = self._rng(self.key, k)
+        dt = self.bar_ms / YEAR_MS
+
+        drift, vol = self._regime_path(rng, n, state)
+        factor = np.exp(self._log_vol(rng, n, state) - p["vol_of_vol"] ** 2)
+        sigma = vol * self.vol_scale * factor * np.sqrt(dt)
+        rho = p["market_corr"]
+        market = self._rng(MARKET_KEY, k).standard_normal(n)
+        z = rho * market + np.sqrt(1 - rho * rho) * rng.standard_normal(n)
+        returns = (drift * dt - 0.5 * sigma * sigma) + sigma * z
+        if p["jumps_per_year"] > 0:
+            counts = rng.poisson(p["jumps_per_year"] * dt, n)
+            hit = np.flatnonzero(counts)
+            jumps = rng.standard_normal(len(hit))
+            returns[hit] += counts[hit] * p["jump_mean"] + np.sqrt(counts[hit]) * p["jump_std"] * jumps
+
+        log_close = state["log_price"] + np.cumsum(returns)
+        log_open = np.r_[state["log_price"], log_close[:-1]]
+        state["log_price"] = float(log_close[-1])
+        extend = p["intrabar"] * sigma
+        high = np.maximum(log_open, log_close) + extend * np.abs(rng.standard_normal(n))
+        low = np.minimum(log_open, log_close) - extend * np.abs(rng.standard_normal(n))
+
+        # Volume: lognormal noise, more on large moves, daily cycle
+        hours = ((k * n + np.arange(n)) * self.bar_ms + SYNTHETIC_EPOCH.value // 1_000_000) % DAY_MS / 3_600_000
+        activity = 1 + 0.3 * np.sin(2 * np.pi * (hours - 8) / 24)
+        surprise = np.abs(returns) / np.maximum(vol * self.vol_scale * np.sqrt(dt), 1e-12)
+        volume = self.volume0 * activity * (1 + surprise) * np.exp(0.5 * rng.standard_normal(n) - 0.125)
+
+        out = np.empty((n, 5))
+        out[:, 0], out[:, 1], out[:, 2], out[:, 3] = np.exp(log_open), np.exp(high), np.exp(low), np.exp(log_close)
+        out[:, 4] = volume
+        return out, state
+
+    def block(self, k: int) -> np.ndarray:
+        while len(self.states) <= k:
+            _, state = self._generate(len(self.states) - 1, self.states[-1])
+            self.states.append(state)
+        values, state = self._generate(k, self.states[k])
+        if len(self.states) == k + 1:
+            self.states.append(state)
+        return values
+
+    def candles(self, first: int, last: int) -> pd.DataFrame:
+        """Candles number `first`..`last` (inclusive) after the epoch."""
+        first = max(first, 0)
+        if last < first:
+            return klines_frame([])
+        blocks = [self.block(k) for k in range(first // BLOCK_SIZE, last // BLOCK_SIZE + 1)]
+        values = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+        offset = (first // BLOCK_SIZE) * BLOCK_SIZE
+        values = values[first - offset:last - offset + 1]
+        times = SYNTHETIC_EPOCH.value + np.arange(first, last + 1, dtype=np.int64) * (self.bar_ms * 1_000_000)
+        return pd.DataFrame(values, columns=OHLCV_COLUMNS, index=pd.DatetimeIndex(times, name="timestamp"))
+
+    def bar_range(self, start, end) -> tuple[int, int]:
+        """Candle numbers of the first and last candle opening in [start, end]."""
+        step = self.bar_ms * 1_000_000
+        first = -(-(pd.Timestamp(start).value - SYNTHETIC_EPOCH.value) // step)
+        last = (pd.Timestamp(end).value - SYNTHETIC_EPOCH.value) // step
+        return int(first), int(last)
+
+
+_paths: dict = {}
+
+
+def synthetic_path(symbol, interval, model=None, seed=None) -> SyntheticPath:
+    key = (symbol.upper(), interval, model or SYNTHETIC_MODEL, SYNTHETIC_SEED if seed is None else int(seed))
+    if key not in _paths:
+        _paths[key] = SyntheticPath(*key)
+    return _paths[key]
+
+
+# --- PROVIDER ---
+def synthetic_klines(symbol, interval="15m", start=None, end=None, model=None, seed=None) -> pd.DataFrame:
+    """Candles opening between start and end (inclusive), like get_historical_klines_df.
+    Nothing exists before SYNTHETIC_EPOCH."""
+    path = synthetic_path(symbol, interval, model, seed)
+    return path.candles(*path.bar_range(start, end))
+
+
+def iter_synthetic_pages(symbol, interval="15m", start=None, end=None, model=None, seed=None, page_size=BLOCK_SIZE):
+    """synthetic_klines in frames of at most `page_size` candles, like iter_klines_pages."""
+    path = synthetic_path(symbol, interval, model, seed)
+    first, last = path.bar_range(start, end)
+    first = max(first, 0)
+    for page_start in range(first, last + 1, page_size):
+        yield path.candles(page_start, min(page_start + page_size - 1, last))
+
+
+def latest_synthetic_klines(symbol, interval="1m", limit=100, model=None, seed=None) -> pd.DataFrame:
+    """The last `limit` candles up to the one open now, like get_klines."""
+    path = synthetic_path(symbol, interval, model, seed)
+    _, last = path.bar_range(SYNTHETIC_EPOCH, pd.Timestamp.now(tz="UTC").tz_localize(None))
+    return path.candles(last - limit + 1, last)
+
+
+def synthetic_ohlcv(n: int, symbol="SYNTHUSDT", interval="1m", start=None, model=None, seed=None) -> pd.DataFrame:
+    """`n` consecutive candles from `start` (default: the epoch)."""
+    path = synthetic_path(symbol, interval, model, seed)
+    first, _ = path.bar_range(start if start is not None else SYNTHETIC_EPOCH, SYNTHETIC_EPOCH)
+    first = max(first, 0)
+    return path.candles(first, first + n - 1)
+
+
+def synthetic_universe(symbols, interval="15m", start=None, end=None, model=None, seed=None) -> dict:
+    """{symbol: synthetic_klines(...)} for many symbols sharing the market factor."""
+    return {s.upper(): synthetic_klines(s, interval, start, end, model, seed) for s in symbols}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic klines")
+    parser.add_argument("--symbols", type=str, default="BTCUSDT", help="Comma-separated symbols")
+    parser.add_argument("--interval", type=str, default="15m")
+    parser.add_argument("--start", type=str, required=True)
+    parser.add_argument("--end", type=str, required=True)
+    parser.add_argument("--model", type=str, default=SYNTHETIC_MODEL, choices=list(MODELS))
+    parser.add_argument("--seed", type=int, default=SYNTHETIC_SEED)
+    parser.add_argument("--out", type=str, default=None, help="Directory for one <SYMBOL>_<interval>.csv per symbol")
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    frames = synthetic_universe(args.symbols.split(","), args.interval, args.start, args.end, args.model, args.seed)
+    elapsed = time.perf_counter() - t
+    bars = sum(len(df) for df in frames.values())
+    print(f"🧪 {bars} {args.interval} candles for {len(frames)} symbols ({args.model}, seed {args.seed}) "
+          f"in {elapsed:.2f}s ({bars / max(elapsed, 1e-9) / 1e6:.1f}M bars/s)")
+    for symbol, df in frames.items():
+        if df.empty:
+            print(f"{symbol}: no candles (synthetic history starts {SYNTHETIC_EPOCH})")
+            continue
+        print(f"{symbol}: {df['close'].iloc[0]:.4f} -> {df['close'].iloc[-1]:.4f}, "
+              f"range {df['low'].min():.4f}-{df['high'].max():.4f}")
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            df.to_csv(os.path.join(args.out, f"{symbol}_{args.interval}.csv"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# tasks.py
+"""CPU-heavy parts of the API handlers, run in the job pool (see jobs.py).
+
+Each task takes and returns plain data; the handlers keep request parsing,
+validation, DB writes and response formatting.
+"""
+import json
+import logging
+import os
+from typing import List, Dict, Any
+
+logger = logging.getLogger("tasks")
+
+
+def backtest(symbol, interval, strategy_name, start, end, fee=None, slippage=None) -> dict:
+    """Backtester run: {"equity_points", "stats", "trades_rows"}."""
+    import pandas as pd  # type: ignore
+    from strategy_loader import load_strategy_class  # type: ignore
+    from backtester import Backtester, TRADING_FEE, SLIPPAGE  # type: ignore
+
+    strategy_class = load_strategy_class(strategy_name)
+    backtester = Backtester(symbol, interval, strategy_class, start, end,
+                            fee=TRADING_FEE if fee is None else fee, slippage=SLIPPAGE if slippage is None else slippage)
+    backtester.run()
+    logs_dir = f"logs/{strategy_class.__name__}"
+
+    # Build equity points directly from in-memory results first
+    equity_points = []
+    try:
+        for ts, eq in zip(backtester.timestamps, backtester.equity_curve):
+            equity_points.append({"t": str(ts), "v": float(eq)})
+    except Exception as e:
+        logger.warning("Failed to build in-memory equity points: %s", e)
+
+    # If empty, fall back to logs
+    if not equity_points:
+        try:
+            eq_df = pd.read_csv(f"{logs_dir}/equity.csv")
+            for _, row in eq_df.iterrows():
+                equity_points.append({"t": str(row["time"]), "v": float(row["equity"])})
+        except Exception as e:
+            logger.warning("Failed to read equity.csv: %s", e)
+
+    # Compute stats from backtester
+    stats = backtester.calculate_stats()
+
+    # Build trades directly from in-memory results first
+    trades_rows: List[Dict[str, Any]] = []
+    try:
+        trades_rows = backtester.trade_events()
+        logger.info(f"Found {len(trades_rows)} trades from backtester.trades")
+        # enrich with symbol and strategy
+        for tr in trades_rows:
+            tr.setdefault("symbol", symbol)
+            tr.setdefault("strategy", strategy_name)
+    except Exception as e:
+        logger.warning(f"Failed to get trades from backtester: {e}")
+        trades_rows = []
+
+    # If empty, fall back to logs
+    if not trades_rows:
+        try:
+            tr_df = pd.read_csv(f"{logs_dir}/backtester.csv")
+            rows = tr_df.to_dict(orient="records")  # type: ignore
+            logger.info(f"Loaded {len(rows)} trades from CSV file")
+            # enrich with symbol and strategy
+            for r in rows:
+                r.setdefault("symbol", symbol)
+                r.setdefault("strategy", strategy_name)
+            trades_rows = rows
+        except Exception as e:
+            logger.warning(f"Failed to load trades from CSV: {e}")
+
+    return {"equity_points": equity_points, "stats": stats, "trades_rows": trades_rows}
+
+
+def robustness(path, **kwargs) -> dict:
+    """robustness.monte_carlo over the trades CSV at `path`."""
+    import pandas as pd  # type: ignore
+    from robustness import monte_carlo  # type: ignore
+    from instrumentation import timer
+
+    trades = pd.read_csv(path)
+    with timer("robustness.monte_carlo"):
+        return monte_carlo(trades, **kwargs)
+
+
+def optimize(payload: dict) -> dict:
+    """Optimizer run of a validated /api/optimizer payload (search seed pinned); writes
+    logs/optimizer/optimizer_results.csv and meta.json. Returns {"run_id", "reused"}."""
+    from strategy_loader import load_strategy_class, list_strategy_names, param_grid, grid_spec  # type: ignore
+    from evaluator import fetch_candles, max_warmup  # type: ignore
+    from param_search import SearchSpace, objective_fn, search, space_warmup  # type: ignore
+    from optimizer_ledger import default_ledger  # type: ignore
+    import pandas as pd  # type: ignore
+
+    ledger = default_ledger()
+    symbols = payload.get("symbols") or ["BTCUSDT", "ETHUSDT"]
+    strategies = payload.get("strategies") or list_strategy_names()
+    # Accept both interval or timeframe
+    interval = payload.get("interval") or payload.get("timeframe") or "1h"
+    # Accept direct start/end or {range:{from,to}}
+    if isinstance(payload.get("range"), dict):
+        start = payload["range"].get("from") or "2025-01-01"
+        end = payload["range"].get("to") or "2025-02-01"
+    else:
+        start = payload.get("start") or "2025-01-01"
+        end = payload.get("end") or "2025-02-01"
+
+    search_cfg = payload.get("search") or {}
+    method = search_cfg.get("method", "grid")
+    objective = search_cfg.get("objective", "return")
+    budget = search_cfg.get("budget")
+    seed = search_cfg.get("seed")
+    spaces = payload.get("spaces") or {}
+    run_id = ledger.start_run(payload)
+    reused = 0
+    score_fn = objective_fn(objective)
+    best_rows: dict[str, dict] = {}
+
+    def keep_best(strat, sym, params, stats, evaluations):
+        row = {
+            "strategy": strat,
+            "symbol": sym,
+            "totalReturn": float(stats.get("Total Return (%)", 0)),
+            "maxDD": float(stats.get("Max Drawdown (%)", 0)),
+            "winRate": float(stats.get("Win Rate (%)", 0)),
+            "sharpe": float(stats.get("Sharpe Ratio", 0)),
+            "score": float(score_fn(stats)),
+            "evaluations": int(evaluations),
+            "params": params,
+        }
+        # Keep the best per-strategy over both params and symbols
+        best = best_rows.get(strat)
+        if best is None or row["score"] > best["score"]:
+            best_rows[strat] = row
+
+    try:
+        if method == "grid" and not spaces and budget is None:
+            # One fetch per symbol; every strategy/param combination is scored on it in one pass
+            specs = [(strat, load_strategy_class(strat), params) for strat in strategies for params in param_grid(strat)]
+            counts = {strat: sum(1 for s, _, _ in specs if s == strat) for strat in strategies}
+            for sym in symbols:
+                candles = fetch_candles(sym, interval, start, end, max_warmup([(cls, p) for _, cls, p in specs]))
+                results, n = ledger.evaluate(candles, [(cls, params) for _, cls, params in specs], sym, interval,
+                                             start, run_id=run_id)
+                reused += n
+                for (strat, _, params), stats in zip(specs, results):
+                    keep_best(strat, sym, params, stats, counts[strat])
+        else:
+            search_spaces = {}
+            for strat in strategies:
+                spec, constraint = grid_spec(strat)
+                search_spaces[strat] = SearchSpace(spaces.get(strat) or spec, constraint)
+            warmup = max(space_warmup(load_strategy_class(strat), space) for strat, space in search_spaces.items())
+            for sym in symbols:
+                candles = fetch_candles(sym, interval, start, end, warmup)
+                for strat, space in search_spaces.items():
+                    result = search(load_strategy_class(strat), candles, space, method=method, budget=budget,
+                                    objective=objective, start=start, seed=seed,
+                                    ledger=ledger, symbol=sym, interval=interval, run_id=run_id)
+                    reused += result["reused"]
+                    keep_best(strat, sym, result["params"], result["stats"], result["evaluations"])
+    except Exception as e:
+        ledger.finish_run(run_id, error=str(e))
+        raise
+    ledger.finish_run(run_id)
+    rows = [best_rows[s] for s in strategies if s in best_rows]
+    df = pd.DataFrame(rows)
+    # Already one row per strategy (best over params and symbols)
+    os.makedirs("logs/optimizer", exist_ok=True)
+    out_path = "logs/optimizer/optimizer_results.csv"
+    try:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+    except Exception:
+        pass
+    df.to_csv(out_path, index=False)
+    # Persist meta used for this run
+    try:
+        meta_path = "logs/optimizer/meta.json"
+        used_params = {"interval": interval, "start": start, "end": end, "symbols": symbols, "strategies": strategies,
+                       "search": {"method": method, "objective": objective, "budget": budget, "seed": seed},
+                       "run_id": run_id}
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(used_params, f)
+    except Exception:
+        pass
+    return {"run_id": run_id, "reused": reused}
+
+
+def walkforward(symbol, interval, strategy_name, start, end, max_points=5000, **kwargs) -> dict:
+    """walk_forward.walk_forward with logs saved and the OOS curve thinned to ~max_points
+    "points". Folds always run in this process, so one request holds one pool worker."""
+    from walk_forward import walk_forward, save_logs  # type: ignore
+
+    kwargs["workers"] = 1
+    result = walk_forward(symbol, interval, strategy_name, start, end, **kwargs)
+    save_logs(result, os.path.join("logs", "walkforward", strategy_name))
+    # Thin the curve for the chart; the full curve is in logs/walkforward/<strategy>/equity.csv
+    equity = result.pop("equity")
+    stride = max(1, len(equity) // max(1, int(max_points)))
+    sampled = equity.iloc[::stride]
+    if len(equity) and sampled.index[-1] != equity.index[-1]:
+        sampled = equity.iloc[list(range(0, len(equity), stride)) + [len(equity) - 1]]
+    result["points"] = [{"t": str(t), "v": float(v)} for t, v in sampled.items()]
+    return result
@@ -0,0 +1,26 @@
+# conftest.py
+"""Tests run offline on the seeded synthetic candles, in a scratch directory."""
+import os
+import sys
+
+os.environ["DATA_PROVIDER"] = "synthetic"
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import backtest_checkpoint  # noqa: E402
+import kline_cache  # noqa: E402
+import signal_store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    """Logs, caches and checkpoints (relative paths) go to a fresh directory per test,
+    with fresh process-wide stores."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(kline_cache, "_default_cache", None)
+    monkeypatch.setattr(signal_store, "_default_store", None)
+    monkeypatch.setattr(backtest_checkpoint, "_default_checkpoints", None)
+    return tmp_path
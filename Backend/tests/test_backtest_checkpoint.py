@@ -0,0 +1,33 @@
+# test_backtest_checkpoint.py
+"""Backtests resumed from a checkpoint match a fresh run."""
+import pytest
+
+import backtest_checkpoint
+import tasks
+
+START, END, LATER = "2025-01-01", "2025-01-15", "2025-01-17"
+
+
+def _backtest(strategy, end):
+    return tasks.backtest("BTCUSDT", "15m", strategy, START, end)
+
+
+def _fresh(monkeypatch, strategy, end):
+    with monkeypatch.context() as m:
+        m.setattr(backtest_checkpoint, "CHECKPOINT_ENABLED", False)
+        return _backtest(strategy, end)
+
+
+@pytest.mark.parametrize("strategy", ["RSI_EMA", "BOLLINGER_RSI", "BREAKOUT_VOLUME", "FIBONACCI_REVERSAL",
+                                      "KELTNER_BREAKOUT", "MACD"])
+def test_rerun_and_extension_match_fresh_run(monkeypatch, strategy):
+    first = _backtest(strategy, END)
+    again = _backtest(strategy, END)      # resumes with no new candles
+    extended = _backtest(strategy, LATER)  # resumes with two more days
+
+    assert again["stats"] == pytest.approx(first["stats"])
+    assert again["equity_points"] == first["equity_points"]
+    fresh = _fresh(monkeypatch, strategy, LATER)
+    assert extended["stats"] == pytest.approx(fresh["stats"])
+    assert extended["equity_points"] == fresh["equity_points"]
+    assert extended["trades_rows"] == fresh["trades_rows"]
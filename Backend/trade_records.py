@@ -0,0 +1,56 @@
+# trade_records.py
+"""Compact trade and equity records for the Backtester.
+
+Trade events are (time int64 ns, type code, price, pnl) rows of a NumPy
+structured array, equity points are (time int64 ns, equity) rows; pnl is NaN
+on entries. `Records` is an append-only buffer over such an array that the
+Backtester preallocates once per replay and writes in place.
+"""
+import numpy as np
+import pandas as pd
+
+TRADE_TYPES = ("LONG_ENTRY", "LONG_EXIT", "SHORT_ENTRY", "SHORT_EXIT")
+LONG_ENTRY, LONG_EXIT, SHORT_ENTRY, SHORT_EXIT = range(len(TRADE_TYPES))
+TRADE_DTYPE = np.dtype([("time", "<i8"), ("type", "i1"), ("price", "<f8"), ("pnl", "<f8")])
+EQUITY_DTYPE = np.dtype([("time", "<i8"), ("equity", "<f8")])
+
+
+class Records:
+    def __init__(self, dtype, data=None):
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(0, dtype=self.dtype) if data is None else np.array(data, dtype=self.dtype)
+        self.size = len(self._data)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def array(self) -> np.ndarray:
+        """View of the rows written so far."""
+        return self._data[:self.size]
+
+    def reserve(self, extra: int) -> np.ndarray:
+        """Grow to hold `extra` more rows; returns the backing array to write at
+        [size:size + extra] (set `size` after writing)."""
+        need = self.size + extra
+        if need > len(self._data):
+            data = np.empty(max(need, 2 * len(self._data)), dtype=self.dtype)
+            data[:self.size] = self._data[:self.size]
+            self._data = data
+        return self._data
+
+    def append(self, *row):
+        self.reserve(1)[self.size] = row
+        self.size += 1
+
+
+def trade_dicts(trades: np.ndarray) -> list:
+    """TRADE_DTYPE rows as {"type", "price", "time"[, "pnl"]} dicts (exits carry pnl)."""
+    rows = []
+    for ts, typ, price, pnl in zip(pd.to_datetime(trades["time"]), trades["type"].tolist(),
+                                   trades["price"].tolist(), trades["pnl"].tolist()):
+        row = {"type": TRADE_TYPES[typ], "price": price, "time": ts}
+        if not np.isnan(pnl):
+            row["pnl"] = pnl
+        rows.append(row)
+    return rows
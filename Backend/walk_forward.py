@@ -0,0 +1,225 @@
+# walk_forward.py
+"""Walk-forward analysis: optimize on a train window, trade the next test window.
+
+The date range is split into consecutive folds. Rolling folds slide a
+fixed-length train window; anchored folds always train from the start of the
+range. Each fold searches parameters on its train window (param_search) and
+scores the winner on the following test window, which it has never seen.
+Test windows are chained into one out-of-sample equity curve.
+
+Candles are fetched once and handed to the worker processes through the pool
+initializer, so each worker receives the dataset once rather than per fold.
+Folds only slice the candles they need (plus strategy warm-up).
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from evaluator import (build_signals, simulate, summarize, fetch_candles,
+                       INITIAL_BALANCE, TRADING_FEE, SLIPPAGE)
+from param_search import SearchSpace, search, space_warmup
+from stats import equity_stats, BASE_METRICS
+from strategy_loader import load_strategy_class, grid_spec
+from instrumentation import timer
+
+DEFAULT_TRAIN = "90D"
+DEFAULT_TEST = "30D"
+
+# Per-process dataset, set by _init_worker (or directly for in-process runs)
+_DATA = {}
+
+
+# --- FOLDS ---
+def make_folds(start, end, train, test, step=None, anchored=False) -> list[dict]:
+    """Train/test windows over [start, end); train/test/step are pandas offsets ("90D", "4W")."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    train, test = pd.Timedelta(train), pd.Timedelta(test)
+    step = pd.Timedelta(step) if step else test
+    if train <= pd.Timedelta(0) or test <= pd.Timedelta(0) or step <= pd.Timedelta(0):
+        raise ValueError("train, test and step must be positive.")
+    folds = []
+    train_end = start + train
+    while train_end < end:
+        folds.append({
+            "fold": len(folds),
+            "train_start": start if anchored else train_end - train,
+            "train_end": train_end,
+            "test_start": train_end,
+            "test_end": min(train_end + test, end),
+        })
+        train_end += step
+    return folds
+
+
+# --- WORKER ---
+def _init_worker(df, strategy_name, spec, settings):
+    _DATA.update(df=df, strategy_name=strategy_name, spec=spec, settings=settings)
+
+
+def _window(df, t0, t1, warmup):
+    """Candles in [t0, t1) plus `warmup` earlier candles."""
+    idx = df.index.values
+    a = int(np.searchsorted(idx, np.datetime64(t0)))
+    b = int(np.searchsorted(idx, np.datetime64(t1)))
+    return df.iloc[max(0, a - warmup):b], b - a
+
+
+def _run_fold(fold) -> dict:
+    df, settings = _DATA["df"], _DATA["settings"]
+    strategy_class = load_strategy_class(_DATA["strategy_name"])
+    space = SearchSpace(_DATA["spec"], grid_spec(_DATA["strategy_name"])[1])
+    warmup, fee, slippage = settings["warmup"], settings["fee"], settings["slippage"]
+
+    train_df, n_train = _window(df, fold["train_start"], fold["train_end"], warmup)
+    test_df, n_test = _window(df, fold["test_start"], fold["test_end"], warmup)
+    out = {**{k: str(v) for k, v in fold.items() if k != "fold"}, "fold": fold["fold"]}
+    if n_train < 2 or n_test < 2:
+        return {**out, "skipped": "not enough candles"}
+
+    result = search(strategy_class, train_df, space, method=settings["method"], budget=settings["budget"],
+                    objective=settings["objective"], start=fold["train_start"], fee=fee, slippage=slippage,
+                    seed=settings["seed"], interval=settings["interval"])
+
+    # Out-of-sample: the chosen params on the test window, starting flat
+    signals = build_signals(test_df, [(strategy_class, result["params"])])[-n_test:]
+    close = test_df["close"].to_numpy(dtype=np.float64)[-n_test:]
+    sim = simulate(close, signals, fee=fee, slippage=slippage)
+    equity = sim["equity"][:, 0].copy()
+    equity[-1] = sim["final"][0]  # open position is closed at the end of the fold
+    pnl = np.r_[sim["exit_pnl"][:, 0], sim["final_pnl"]]
+    return {
+        **out,
+        "params": result["params"],
+        "evaluations": result["evaluations"],
+        "train_score": result["score"],
+        "train_stats": result["stats"],
+        "test_stats": summarize(sim, interval=settings["interval"], metrics=BASE_METRICS)[0],
+        "trades": int(np.sum(~np.isnan(pnl))),
+        "wins": int(np.sum(pnl > 0)),
+        "time": test_df.index[-n_test:],
+        "equity": equity,
+    }
+
+
+# --- STITCHING ---
+def stitch(fold_results, initial_balance=INITIAL_BALANCE):
+    """Chain the test-window equity curves: each fold starts with the previous fold's final capital."""
+    times, curves = [], []
+    capital = float(initial_balance)
+    for r in fold_results:
+        if "equity" not in r:
+            continue
+        curve = r.pop("equity") / INITIAL_BALANCE * capital
+        times.append(r.pop("time"))
+        curves.append(curve)
+        capital = float(curve[-1])
+    if not curves:
+        return pd.Series(dtype=float)
+    return pd.Series(np.concatenate(curves), index=pd.DatetimeIndex(np.concatenate([t.values for t in times])))
+
+
+def oos_stats(equity: pd.Series, fold_results, initial_balance=INITIAL_BALANCE, interval=None) -> dict:
+    """Backtester-style stats of the stitched out-of-sample curve (trade counts come from the folds)."""
+    metrics = BASE_METRICS + ("Sortino Ratio", "Calmar Ratio", "Max Drawdown Duration (bars)")
+    if equity.empty:
+        return {**{m: 0 for m in metrics}, "Final Balance": float(initial_balance), "Trades": 0}
+    stats = equity_stats(equity.to_numpy(), initial_balance=initial_balance, interval=interval, metrics=metrics)
+    trades = sum(r.get("trades", 0) for r in fold_results)
+    wins = sum(r.get("wins", 0) for r in fold_results)
+    stats["Win Rate (%)"] = float(wins / trades * 100) if trades else 0
+    stats["Trades"] = int(trades)
+    return stats
+
+
+def save_logs(result, logs_dir):
+    """equity.csv (stitched out-of-sample curve) and folds.csv (params and test stats per fold)."""
+    os.makedirs(logs_dir, exist_ok=True)
+    result["equity"].rename("equity").rename_axis("time").to_csv(os.path.join(logs_dir, "equity.csv"))
+    rows = []
+    for f in result["folds"]:
+        row = {k: v for k, v in f.items() if k not in ("train_stats", "test_stats")}
+        row.update({f"test {k}": v for k, v in f.get("test_stats", {}).items()})
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(os.path.join(logs_dir, "folds.csv"), index=False)
+
+
+# --- ENGINE ---
+def walk_forward(symbol, interval, strategy_name, start, end, train=DEFAULT_TRAIN, test=DEFAULT_TEST,
+                 step=None, anchored=False, method="grid", budget=None, objective="sharpe", seed=0,
+                 space=None, fee=TRADING_FEE, slippage=SLIPPAGE, workers=None, df=None) -> dict:
+    """Run every fold and return per-fold results, stitched OOS equity and its stats.
+
+    `space` overrides the strategy's grid spec; `df` skips the fetch (it must
+    cover [start, end) plus warm-up). `workers` defaults to the CPU count;
+    1 runs the folds in this process.
+    """
+    spec = space if space is not None else grid_spec(strategy_name)[0]
+    strategy_class = load_strategy_class(strategy_name)
+    warmup = space_warmup(strategy_class, SearchSpace(spec, grid_spec(strategy_name)[1]))
+    folds = make_folds(start, end, train, test, step=step, anchored=anchored)
+    if not folds:
+        raise ValueError("Range is shorter than one train window plus a test window.")
+    if df is None:
+        df = fetch_candles(symbol, interval, folds[0]["train_start"], end, warmup)
+    settings = {"warmup": warmup, "interval": interval, "fee": fee, "slippage": slippage, "method": method,
+                "budget": budget, "objective": objective, "seed": seed}
+
+    workers = min(workers or os.cpu_count() or 1, len(folds))
+    # Phases inside pool workers are recorded in those processes; here the folds are timed as a whole
+    with timer("walkforward.folds"):
+        if workers <= 1:
+            _init_worker(df, strategy_name, spec, settings)
+            results = [_run_fold(f) for f in folds]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(df, strategy_name, spec, settings)) as pool:
+                results = list(pool.map(_run_fold, folds))
+
+    equity = stitch(results)
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "strategy": strategy_name,
+        "anchored": bool(anchored),
+        "search": {"method": method, "budget": budget, "objective": objective, "seed": seed},
+        "folds": results,
+        "equity": equity,
+        "stats": oos_stats(equity, results, interval=interval),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward optimization")
+    parser.add_argument("--symbol", type=str, required=True)
+    parser.add_argument("--interval", type=str, default="15m")
+    parser.add_argument("--strategy", type=str, required=True)
+    parser.add_argument("--start", type=str, required=True)
+    parser.add_argument("--end", type=str, required=True)
+    parser.add_argument("--train", type=str, default=DEFAULT_TRAIN)
+    parser.add_argument("--test", type=str, default=DEFAULT_TEST)
+    parser.add_argument("--step", type=str, default=None)
+    parser.add_argument("--anchored", action="store_true")
+    parser.add_argument("--method", type=str, default="grid")
+    parser.add_argument("--budget", type=int, default=None)
+    parser.add_argument("--objective", type=str, default="sharpe")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--fee", type=float, default=TRADING_FEE)
+    parser.add_argument("--slippage", type=float, default=SLIPPAGE)
+    args = parser.parse_args()
+
+    result = walk_forward(args.symbol, args.interval, args.strategy, args.start, args.end, train=args.train,
+                          test=args.test, step=args.step, anchored=args.anchored, method=args.method,
+                          budget=args.budget, objective=args.objective, seed=args.seed, workers=args.workers,
+                          fee=args.fee, slippage=args.slippage)
+
+    save_logs(result, os.path.join("logs", "walkforward", args.strategy))
+
+    print(f"📊 Walk-forward {args.strategy} on {args.symbol} ({len(result['folds'])} folds)")
+    for key, value in result["stats"].items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,15 @@ const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:5000"
 export async function GET(req: Request) {
   try {
     const { searchParams } = new URL(req.url)
-    const strategy = searchParams.get("strategy") || "RSI_EMA"
+    const params = new URLSearchParams({ strategy: searchParams.get("strategy") || "RSI_EMA" })
+    // Optional: resolution (auto | raw | 1h | 1d) and the from/to range
+    for (const key of ["resolution", "from", "to"]) {
+      const value = searchParams.get(key)
+      if (value) params.set(key, value)
+    }
     const authHeader = req.headers.get("authorization")
     
-    const response = await fetch(`${BACKEND_URL}/api/equity?strategy=${strategy}`, {
+    const response = await fetch(`${BACKEND_URL}/api/equity?${params}`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",